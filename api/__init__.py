@@ -22,6 +22,10 @@ from .vehicle import vehicles_ns
 from .work import works_ns
 from .task import tasks_ns
 from .invoice_item import invoice_items_ns
+from .metrics import metrics_ns
+from .changes import changes_ns
+from .events import events_ns
+from .backup import backups_ns
 
 
 # Add namespaces to the Swagger documentation and API
@@ -32,4 +36,8 @@ api.add_namespace(invoices_ns, path='/invoice')  # Routes for invoice operations
 api.add_namespace(vehicles_ns, path='/vehicle')  # Routes for vehicle operations
 api.add_namespace(works_ns, path='/work')  # Routes for work operations
 api.add_namespace(tasks_ns, path='/task')  # Routes for task operations
-api.add_namespace(invoice_items_ns, path='/invoice_item')  # Routes for invoice_item operations
\ No newline at end of file
+api.add_namespace(invoice_items_ns, path='/invoice_item')  # Routes for invoice_item operations
+api.add_namespace(metrics_ns, path='/metrics')  # Routes for runtime metrics
+api.add_namespace(changes_ns, path='/changes')  # Routes for incremental synchronization
+api.add_namespace(events_ns, path='/events')  # Routes for server-sent events
+api.add_namespace(backups_ns, path='/backup')  # Routes for database snapshots
\ No newline at end of file
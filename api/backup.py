@@ -0,0 +1,86 @@
+import logging
+from flask import current_app
+from flask_restx import Namespace, Resource, fields
+from werkzeug.exceptions import HTTPException
+from services.backup_service import create_snapshot, list_snapshots, snapshot_directory
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Namespace for database snapshots
+backups_ns = Namespace("backup", description="Online snapshots of the database")
+
+# Snapshot stored in the backup directory
+snapshot_model = backups_ns.model("Snapshot", {
+    "snapshot": fields.String(description="File name of the snapshot in the backup directory"),
+    "size": fields.Integer(description="Size of the compressed snapshot in bytes"),
+    "created_at": fields.DateTime(description="Creation time of the snapshot"),
+    "sha256": fields.String(description="SHA-256 of the compressed snapshot"),
+})
+
+# Report of a snapshot just created
+snapshot_report_model = backups_ns.model("SnapshotReport", {
+    "snapshot": fields.String(description="File name of the snapshot in the backup directory"),
+    "size": fields.Integer(description="Size of the compressed snapshot in bytes"),
+    "sha256": fields.String(description="SHA-256 of the compressed snapshot"),
+    "pages": fields.Integer(description="Number of database pages copied"),
+    "steps": fields.Integer(description="Number of backup steps that copied pages"),
+    "busy_steps": fields.Integer(description="Number of backup steps retried because a writer held the database"),
+    "restarts": fields.Integer(description="Times the copy restarted because another connection wrote to the database"),
+    "single_step": fields.Boolean(description="Whether the copy restarted more than BACKUP_MAX_RESTARTS times and was finished in one step, blocking writers meanwhile"),
+    "journal_mode": fields.String(description="Journal mode of the database"),
+    "duration_ms": fields.Float(description="Duration of the snapshot in milliseconds"),
+    "writer_stall_ms": fields.Float(description="Total time writers were blocked by the backup steps"),
+    "max_writer_stall_ms": fields.Float(description="Longest time writers were blocked by a backup step"),
+})
+
+
+@backups_ns.route("/")
+class SnapshotList(Resource):
+    """
+    Handles the database snapshots.
+    Supports listing the snapshots (GET) and taking a new one (POST).
+    Restoring a snapshot is done offline, with `flask --app app restore`.
+    """
+
+    @backups_ns.doc("get_snapshots")
+    @backups_ns.marshal_list_with(snapshot_model)
+    def get(self):
+        """
+        List the snapshots of the backup directory, newest first.
+        :return: List of snapshots
+        """
+        try:
+            return list_snapshots(snapshot_directory())
+        except HTTPException as http_err:
+            logger.error("HTTP error while listing snapshots: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error listing snapshots: %s", e)
+            backups_ns.abort(500, "An error occurred while listing the snapshots.")
+
+    @backups_ns.doc("create_snapshot")
+    @backups_ns.response(400, "The database cannot be snapshotted")
+    @backups_ns.marshal_with(snapshot_report_model, code=201)
+    def post(self):
+        """
+        Take a compressed, checksummed snapshot of the database while the API keeps serving writes.
+        The request returns once the snapshot is written.
+        :return: The snapshot, with the duration and the time writers were stalled
+        """
+        try:
+            report = create_snapshot(
+                snapshot_directory(),
+                current_app.config["BACKUP_PAGES_PER_STEP"],
+                current_app.config["BACKUP_STEP_SLEEP_MS"],
+                current_app.config["BACKUP_MAX_RESTARTS"],
+            )
+            return report, 201
+        except ValueError as ve:
+            backups_ns.abort(400, str(ve))
+        except HTTPException as http_err:
+            logger.error("HTTP error while creating a snapshot: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error creating a snapshot: %s", e)
+            backups_ns.abort(500, "An error occurred while creating the snapshot.")
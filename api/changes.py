@@ -0,0 +1,80 @@
+import logging
+from flask import current_app
+from flask_restx import Namespace, Resource, inputs, marshal
+from werkzeug.exceptions import HTTPException
+from services.change_service import compact_change_log_if_due, get_changes
+from errors.errors import CursorExpiredError
+from api.client import client_model
+from api.employee import employee_model
+from api.setting import setting_model
+from api.invoice import invoice_model
+from api.vehicle import vehicle_model
+from api.work import work_model
+from api.task import task_model
+from api.invoice_item import invoice_item_model
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Namespace for incremental synchronization
+changes_ns = Namespace("changes", description="Incremental synchronization of all resources")
+
+# Swagger model used to serialize the current row of each changed table
+ROW_MODELS = {
+    "client": client_model,
+    "employee": employee_model,
+    "setting": setting_model,
+    "invoice": invoice_model,
+    "vehicle": vehicle_model,
+    "work": work_model,
+    "task": task_model,
+    "invoice_item": invoice_item_model,
+}
+
+# Upper bound on the change log entries read per request
+MAX_CHANGES_PAGE = 1000
+
+# Parser for the sync cursor and page size
+changes_parser = changes_ns.parser()
+changes_parser.add_argument("since", type=inputs.natural, default=0, location="args", help="The next cursor of the previous response, 0 for a full history")
+changes_parser.add_argument("limit", type=inputs.int_range(1, MAX_CHANGES_PAGE), default=500, location="args", help=f"Maximum number of changes to read (1-{MAX_CHANGES_PAGE})")
+
+
+@changes_ns.route("/")
+class Changes(Resource):
+    """
+    Handles reading the change log of all resources.
+    """
+
+    @changes_ns.doc("get_changes")
+    @changes_ns.expect(changes_parser)
+    @changes_ns.response(200, "Changes after the cursor, in commit order")
+    @changes_ns.response(410, "Cursor older than the retained history; resync and resume from the returned cursor")
+    def get(self):
+        """
+        Retrieve the inserts, updates and deletes committed after a cursor.
+        Inserts and updates carry the current row, deletes only the ID; clients should upsert
+        on insert and update. Keep requesting with the returned `next` cursor while `has_more` is true.
+        :return: The changes, the `next` cursor and `has_more`
+        """
+        args = changes_parser.parse_args()
+        try:
+            result = get_changes(args["since"], args["limit"])
+            for change in result["changes"]:
+                if change["data"] is not None:
+                    change["data"] = marshal(change["data"], ROW_MODELS[change["table"]])
+        except CursorExpiredError as expired:
+            return {"message": str(expired), "cursor": expired.cursor}, 410
+        except HTTPException as http_err:
+            logger.error("HTTP error while retrieving changes: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error retrieving changes: %s", e)
+            changes_ns.abort(500, "An error occurred while retrieving the changes.")
+
+        try:
+            compact_change_log_if_due(current_app.config["CHANGE_LOG_RETENTION"], current_app.config["CHANGE_LOG_COMPACT_INTERVAL"])
+        except Exception as e:
+            # Compaction is housekeeping; the changes are still returned
+            logger.error("Error compacting the change log: %s", e)
+        return result, 200
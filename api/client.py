@@ -1,19 +1,28 @@
 import logging
-from flask_restx import Namespace, Resource
+from flask import current_app
+from flask_restx import Namespace, Resource, inputs
+from werkzeug.datastructures import FileStorage
 from werkzeug.exceptions import HTTPException
 from services.client_service import (
     get_all_clients,
+    count_clients,
     get_client,
     create_client,
     update_client,
-    delete_client
+    delete_client,
+    import_clients,
+    delete_client_cascade,
+    patch_client,
+    delete_clients
 )
-from utils.utils import generate_swagger_model
+from utils.utils import generate_swagger_model, id_list
+from utils.fieldsets import marshal_with_fields, requested_fields
+from utils.idempotency import idempotent
+from utils.cache import cached_response
 from models.client import Client
 
 
 # Initialize logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for managing clients
@@ -27,16 +36,41 @@ client_model = generate_swagger_model(
     readonly_fields=['client_id']  # Fields that cannot be modified
 )
 
+# Parser for the IDs accepted by the bulk delete endpoint
+ids_parser = clients_ns.parser()
+ids_parser.add_argument('ids', type=id_list, required=True, location='args', help='Comma-separated IDs of the clients to delete')
+
+# Parser for the options of the single client delete endpoint
+delete_parser = clients_ns.parser()
+delete_parser.add_argument(
+    'cascade',
+    type=inputs.boolean,
+    default=False,
+    location='args',
+    help='Also delete the vehicles, works, tasks, invoices and invoice items of the client'
+)
+
+# Parser for the CSV file uploaded to the import endpoint
+import_parser = clients_ns.parser()
+import_parser.add_argument(
+    'file',
+    location='files',
+    type=FileStorage,
+    required=True,
+    help='CSV file with name, email, phone and address columns'
+)
+
 
 @clients_ns.route('/')
 class ClientList(Resource):
     """
     Handles operations on the collection of clients.
-    Supports retrieving all clients (GET) and creating new clients (POST).
+    Supports retrieving all clients (GET), counting them (HEAD), creating new clients (POST) and deleting several clients by ID (DELETE).
     """
 
+    @cached_response("client")
     @clients_ns.doc('get_all_clients')
-    @clients_ns.marshal_list_with(client_model)
+    @marshal_with_fields(clients_ns, client_model, as_list=True)
     def get(self):
         """
         Retrieve all clients.
@@ -44,16 +78,34 @@ class ClientList(Resource):
         """
         try:
             # Fetch all clients from the service layer
-            return get_all_clients()
+            clients = get_all_clients(requested_fields(client_model))
+            return clients, 200, {'X-Total-Count': len(clients)}
         except HTTPException as http_err:
             # Allow HTTP exceptions to propagate their status codes and messages
-            logger.error(f"HTTP error while retrieving clients: {http_err}")
+            logger.error("HTTP error while retrieving clients: %s", http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error retrieving clients: {e}")
+            logger.error("Error retrieving clients: %s", e)
             clients_ns.abort(500, "An error occurred while retrieving the clients.")
 
+    @clients_ns.doc('count_clients')
+    @clients_ns.response(200, 'Success', headers={'X-Total-Count': 'Number of clients'})
+    def head(self):
+        """
+        Count the clients without transferring them.
+        :return: Empty response with the number of clients in the X-Total-Count header
+        """
+        try:
+            return '', 200, {'X-Total-Count': count_clients()}
+        except HTTPException as http_err:
+            logger.error("HTTP error while counting clients: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error counting clients: %s", e)
+            clients_ns.abort(500, "An error occurred while counting the clients.")
+
+    @idempotent
     @clients_ns.doc('create_client')
     @clients_ns.expect(client_model, validate=True)
     @clients_ns.marshal_with(client_model, code=201)
@@ -67,13 +119,64 @@ class ClientList(Resource):
             # Call the service to create a new client
             return create_client(data["name"],data["email"],data["phone"],data["address"]), 201
         except HTTPException as http_err:
-            logger.error(f"HTTP error while creating client: {http_err}")
+            logger.error("HTTP error while creating client: %s", http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error creating client: {e}")
+            logger.error("Error creating client: %s", e)
             clients_ns.abort(500, "An error occurred while creating the client.")
 
+    @clients_ns.doc('delete_clients')
+    @clients_ns.expect(ids_parser)
+    @clients_ns.response(200, 'Number of deleted clients')
+    @clients_ns.response(400, 'Invalid list of IDs')
+    def delete(self):
+        """
+        Delete several clients by ID in a single statement.
+        :return: The number of deleted clients
+        """
+        args = ids_parser.parse_args()
+        try:
+            return {"deleted": delete_clients(args["ids"])}, 200
+        except HTTPException as http_err:
+            logger.error("HTTP error while deleting clients: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error deleting clients: %s", e)
+            clients_ns.abort(500, "An error occurred while deleting the clients.")
+
+
+@clients_ns.route('/import')
+class ClientImport(Resource):
+    """
+    Handles bulk import of clients from a CSV file.
+    Existing clients are matched by name and updated, new names are inserted.
+    """
+
+    @idempotent
+    @clients_ns.doc('import_clients')
+    @clients_ns.expect(import_parser)
+    @clients_ns.response(200, 'Import finished, possibly with per-row errors')
+    @clients_ns.response(400, 'Invalid CSV file')
+    def post(self):
+        """
+        Import clients from an uploaded CSV file.
+        :return: The number of imported rows and the errors of the rejected rows
+        """
+        args = import_parser.parse_args()
+        try:
+            # Stream the upload to the service, which writes it in batches
+            return import_clients(args['file'].stream, current_app.config['CLIENT_IMPORT_BATCH_SIZE'])
+        except ValueError as ve:
+            clients_ns.abort(400, str(ve))
+        except HTTPException as http_err:
+            logger.error("HTTP error while importing clients: %s", http_err)
+            raise http_err
+        except Exception as e:
+            # Log error and return a 500 status code
+            logger.error("Error importing clients: %s", e)
+            clients_ns.abort(500, "An error occurred while importing the clients.")
+
 
 @clients_ns.route('/<int:client_id>')
 @clients_ns.param('client_id', 'The ID of the client')
@@ -84,7 +187,7 @@ class Client(Resource):
     """
 
     @clients_ns.doc('get_client')
-    @clients_ns.marshal_with(client_model)
+    @marshal_with_fields(clients_ns, client_model)
     def get(self, client_id):
         """
         Retrieve a client by ID.
@@ -93,17 +196,17 @@ class Client(Resource):
         """
         try:
             # Fetch client by ID
-            client = get_client(client_id)
+            client = get_client(client_id, requested_fields(client_model))
             if not client:
                 # Return a 404 error if client does not exist
                 clients_ns.abort(404, f"Client with ID {client_id} not found.")
             return client
         except HTTPException as http_err:
-            logger.error(f"HTTP error while retrieving client with ID {client_id}: {http_err}")
+            logger.error("HTTP error while retrieving client with ID %s: %s", client_id, http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error retrieving client with ID {client_id}: {e}")
+            logger.error("Error retrieving client with ID %s: %s", client_id, e)
             clients_ns.abort(500, "An error occurred while retrieving the client.")
 
     @clients_ns.doc('update_client')
@@ -124,22 +227,57 @@ class Client(Resource):
                 clients_ns.abort(404, f"Client with ID {client_id} not found.")
             return client
         except HTTPException as http_err:
-            logger.error(f"HTTP error while updating client with ID {client_id}: {http_err}")
+            logger.error("HTTP error while updating client with ID %s: %s", client_id, http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error updating client with ID {client_id}: {e}")
+            logger.error("Error updating client with ID %s: %s", client_id, e)
+            clients_ns.abort(500, "An error occurred while updating the client.")
+
+    @clients_ns.doc('patch_client')
+    @clients_ns.response(400, 'No updatable fields or invalid values')
+    @clients_ns.expect(client_model, validate=True)
+    @clients_ns.marshal_with(client_model)
+    def patch(self, client_id):
+        """
+        Partially update a client by ID.
+        Only the fields present in the payload are changed.
+        :param client_id: The ID of the client to update.
+        :return: The updated client.
+        """
+        try:
+            client = patch_client(client_id, clients_ns.payload)
+            if not client:
+                clients_ns.abort(404, f"Client with ID {client_id} not found.")
+            return client
+        except ValueError as ve:
+            clients_ns.abort(400, str(ve))
+        except HTTPException as http_err:
+            logger.error("HTTP error while patching client %s: %s", client_id, http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error patching client %s: %s", client_id, e)
             clients_ns.abort(500, "An error occurred while updating the client.")
 
     @clients_ns.doc('delete_client')
+    @clients_ns.expect(delete_parser)
     @clients_ns.response(204, 'Client successfully deleted')
+    @clients_ns.response(200, 'Client and related records deleted, with the number of deleted rows per table')
     def delete(self, client_id):
         """
         Delete a client by ID.
+        With ?cascade=true the vehicles, works, tasks, invoices and invoice items of the client are deleted too.
         :param client_id: The ID of the client
-        :return: HTTP 204 status code if deleted successfully or 404 if not found
+        :return: HTTP 204 status code if deleted successfully, the deleted row counts for a cascade, or 404 if not found
         """
+        args = delete_parser.parse_args()
         try:
+            if args['cascade']:
+                deleted = delete_client_cascade(client_id)
+                if not deleted:
+                    clients_ns.abort(404, f"Client with ID {client_id} not found.")
+                return {"deleted": deleted}, 200
+
             # Call the service to delete the client
             client = delete_client(client_id)
             if not client:
@@ -147,9 +285,9 @@ class Client(Resource):
                 clients_ns.abort(404, f"Client with ID {client_id} not found.")
             return '', 204  # Return no content with status code 204
         except HTTPException as http_err:
-            logger.error(f"HTTP error while deleting client with ID {client_id}: {http_err}")
+            logger.error("HTTP error while deleting client with ID %s: %s", client_id, http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error deleting client with ID {client_id}: {e}")
+            logger.error("Error deleting client with ID %s: %s", client_id, e)
             clients_ns.abort(500, "An error occurred while deleting the client.")
\ No newline at end of file
@@ -1,12 +1,14 @@
 import logging
-from flask_restx import Namespace, Resource, abort
+from flask_restx import Namespace, Resource, abort, inputs
 from models.employee import Employee
-from services.employee_service import get_all_employees, get_employee, create_employee, update_employee, delete_employee
-from utils.utils import generate_swagger_model
+from services.employee_service import get_all_employees, count_employees, get_employee, create_employee, update_employee, delete_employee, patch_employee, delete_employees, get_available_employees
+from utils.utils import generate_swagger_model, id_list
+from utils.fieldsets import marshal_with_fields, requested_fields
+from utils.idempotency import idempotent
+from utils.cache import cached_response
 from werkzeug.exceptions import HTTPException, BadRequest, NotFound
 
 # Initialize logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for employees
@@ -20,31 +22,58 @@ employee_model = generate_swagger_model(
     readonly_fields=['employee_id', 'created_at']
 )
 
+# Parser for the IDs accepted by the bulk delete endpoint
+ids_parser = employees_ns.parser()
+ids_parser.add_argument('ids', type=id_list, required=True, location='args', help='Comma-separated IDs of the employees to delete')
+
+# Parser for the date range of the availability endpoint
+availability_parser = employees_ns.parser()
+availability_parser.add_argument('from', type=inputs.date, required=True, location='args', help='First day of the range (YYYY-MM-DD)')
+availability_parser.add_argument('to', type=inputs.date, location='args', help='Last day of the range (YYYY-MM-DD), the first day when omitted')
+
 # Routes for managing employees
 @employees_ns.route('/')
 @employees_ns.response(500, 'Internal Server Error')
 class EmployeeList(Resource):
     """
-    Resource for operations on the collection of employees (GET all, POST new).
+    Resource for operations on the collection of employees (GET all, HEAD count, POST new, DELETE by IDs).
     """
+    @cached_response("employee")
     @employees_ns.doc('get_all_employees')
-    @employees_ns.marshal_list_with(employee_model)
+    @marshal_with_fields(employees_ns, employee_model, as_list=True)
     def get(self):
         """
         Retrieve all employees.
         :return: List of all employees in dictionary format
         """
         try:
-            employees = get_all_employees()
-            return employees
+            employees = get_all_employees(requested_fields(employee_model))
+            return employees, 200, {'X-Total-Count': len(employees)}
         except HTTPException as http_err:
             # Allow HTTP exceptions to propagate as they are
             raise http_err
         except Exception as e:
             # Log and handle unexpected exceptions with a 500 status code
-            logger.error(f"Error fetching all employees: {e}")
+            logger.error("Error fetching all employees: %s", e)
             employees_ns.abort(500, "Internal Server Error")
 
+    @employees_ns.doc('count_employees')
+    @employees_ns.response(200, 'Success', headers={'X-Total-Count': 'Number of employees'})
+    def head(self):
+        """
+        Count the employees without transferring them.
+        :return: Empty response with the number of employees in the X-Total-Count header
+        """
+        try:
+            return '', 200, {'X-Total-Count': count_employees()}
+        except HTTPException as http_err:
+            logger.error("HTTP error while counting employees: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error counting employees: %s", e)
+            employees_ns.abort(500, "An error occurred while counting the employees.")
+
+    @idempotent
     @employees_ns.doc('create_employee')
     @employees_ns.expect(employee_model)
     @employees_ns.marshal_with(employee_model, code=201)
@@ -63,9 +92,59 @@ class EmployeeList(Resource):
             raise http_err
         except Exception as e:
             # Log and handle unexpected exceptions with a 400 status code
-            logger.error(f"Error creating employee: {e}")
+            logger.error("Error creating employee: %s", e)
             employees_ns.abort(400, "Bad Request")
 
+    @employees_ns.doc('delete_employees')
+    @employees_ns.expect(ids_parser)
+    @employees_ns.response(200, 'Number of deleted employees')
+    @employees_ns.response(400, 'Invalid list of IDs')
+    def delete(self):
+        """
+        Delete several employees by ID in a single statement.
+        :return: The number of deleted employees
+        """
+        args = ids_parser.parse_args()
+        try:
+            return {"deleted": delete_employees(args["ids"])}, 200
+        except HTTPException as http_err:
+            logger.error("HTTP error while deleting employees: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error deleting employees: %s", e)
+            employees_ns.abort(500, "An error occurred while deleting the employees.")
+
+
+@employees_ns.route('/available')
+@employees_ns.response(500, 'Internal Server Error')
+class AvailableEmployeeList(Resource):
+    """
+    Resource for the employees free over a range of days (GET).
+    """
+    @employees_ns.doc('get_available_employees')
+    @employees_ns.expect(availability_parser)
+    @employees_ns.response(400, 'Invalid or out of horizon date range')
+    @marshal_with_fields(employees_ns, employee_model, as_list=True)
+    def get(self):
+        """
+        Retrieve the employees without a pending or in-progress task on any day of the range.
+        :return: List of the available employees in dictionary format
+        """
+        args = availability_parser.parse_args()
+        start = args['from'].date()
+        end = args['to'].date() if args['to'] else start
+        try:
+            employees = get_available_employees(start, end, requested_fields(employee_model))
+            return employees, 200, {'X-Total-Count': len(employees)}
+        except ValueError as ve:
+            employees_ns.abort(400, str(ve))
+        except HTTPException as http_err:
+            logger.error("HTTP error while fetching available employees: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error fetching available employees: %s", e)
+            employees_ns.abort(500, "An error occurred while fetching the available employees.")
+
 
 @employees_ns.route('/<int:employee_id>')
 @employees_ns.response(404, 'Employee ID not found')
@@ -78,14 +157,14 @@ class Employee(Resource):
     @employees_ns.route('/<int:employee_id>')
     class EmployeeResource(Resource):
         @employees_ns.doc('get_employee')
-        @employees_ns.marshal_with(employee_model)
+        @marshal_with_fields(employees_ns, employee_model)
         def get(self, employee_id):
             """
             Retrieve a specific employee by ID.
             """
             try:
                 # Fetch the employee by ID
-                employee = get_employee(employee_id)
+                employee = get_employee(employee_id, requested_fields(employee_model))
                 if not employee:
                     # Abort with a 404 status and custom message
                     raise NotFound('My custom message')
@@ -95,7 +174,7 @@ class Employee(Resource):
             #     raise http_err
             except Exception as e:
                 # Log and handle unexpected exceptions with a 500 status code
-                logger.error(f"Error fetching employee {employee_id}: {e}")
+                logger.error("Error fetching employee %s: %s", employee_id, e)
                 abort(500, description="Internal Server Error")
 
     @employees_ns.doc('update_employee')
@@ -119,9 +198,34 @@ class Employee(Resource):
             raise http_err
         except Exception as e:
             # Log and handle unexpected exceptions with a 400 status code
-            logger.error(f"Error updating employee {employee_id}: {e}")
+            logger.error("Error updating employee %s: %s", employee_id, e)
             employees_ns.abort(400, "Bad Request")
 
+    @employees_ns.doc('patch_employee')
+    @employees_ns.response(400, 'No updatable fields or invalid values')
+    @employees_ns.expect(employee_model, validate=True)
+    @employees_ns.marshal_with(employee_model)
+    def patch(self, employee_id):
+        """
+        Partially update an employee by ID.
+        Only the fields present in the payload are changed.
+        :param employee_id: The ID of the employee to update.
+        :return: The updated employee.
+        """
+        try:
+            employee = patch_employee(employee_id, employees_ns.payload)
+            if not employee:
+                employees_ns.abort(404, f"Employee with ID {employee_id} not found.")
+            return employee
+        except ValueError as ve:
+            employees_ns.abort(400, str(ve))
+        except HTTPException as http_err:
+            logger.error("HTTP error while patching employee %s: %s", employee_id, http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error patching employee %s: %s", employee_id, e)
+            employees_ns.abort(500, "An error occurred while updating the employee.")
+
     @employees_ns.doc('delete_employee')
     def delete(self, employee_id):
         """
@@ -139,5 +243,5 @@ class Employee(Resource):
             raise http_err
         except Exception as e:
             # Log and handle unexpected exceptions with a 500 status code
-            logger.error(f"Error deleting employee {employee_id}: {e}")
+            logger.error("Error deleting employee %s: %s", employee_id, e)
             employees_ns.abort(500, "Internal Server Error")
\ No newline at end of file
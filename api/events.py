@@ -0,0 +1,65 @@
+import logging
+import queue
+from flask import Response, jsonify, stream_with_context
+from flask_restx import Namespace, Resource
+from utils.events import KEEPALIVE_MESSAGE, RESYNC_MESSAGE, event_hub
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Namespace for server-sent events
+events_ns = Namespace("events", description="Server-sent events for task and work status changes")
+
+# Body of the 503 response when every thread allowed to stream events is taken, in the format of the other error responses
+STREAMS_EXHAUSTED = {
+    "status": "error",
+    "message": "Too many event streams for this server, retry later or use the ASGI entry point (uvicorn asgi:app).",
+}
+
+
+@events_ns.route("/")
+class Events(Resource):
+    """
+    Handles the server-sent event stream of task and work status changes.
+    """
+
+    @events_ns.doc("get_events")
+    @events_ns.produces(["text/event-stream"])
+    @events_ns.response(200, "Stream of 'task' and 'work' events with the id, status and version of the row")
+    @events_ns.response(503, "EVENT_MAX_THREAD_SUBSCRIBERS streams are already open in this worker")
+    def get(self):
+        """
+        Subscribe to task and work status changes.
+        Each event is sent once its update is committed. A "resync" event means events were dropped
+        because the client fell behind, and the current state should be fetched again.
+        Under the development server or gunicorn every connection holds a thread, so at most
+        EVENT_MAX_THREAD_SUBSCRIBERS streams are served per process and the next ones get 503;
+        the ASGI entry point (asgi.py) serves this endpoint from its event loop without a limit.
+        :return: A text/event-stream response that stays open until the client disconnects
+        """
+        subscription = event_hub.subscribe()
+        if subscription is None:
+            logger.warning("Refused an event stream, %s threads already stream events", event_hub.max_thread_subscribers)
+            response = jsonify(STREAMS_EXHAUSTED)
+            response.status_code = 503
+            response.headers["Retry-After"] = str(event_hub.keepalive)
+            return response
+
+        def generate():
+            while True:
+                try:
+                    message = subscription.queue.get(timeout=event_hub.keepalive)
+                except queue.Empty:
+                    yield KEEPALIVE_MESSAGE
+                    continue
+                yield RESYNC_MESSAGE if subscription.take_overflow() else message
+
+        response = Response(
+            stream_with_context(generate()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        # Runs when the client disconnects and the server closes the response, even if the
+        # stream never started, so the thread's slot is always given back
+        response.call_on_close(lambda: event_hub.unsubscribe(subscription))
+        return response
@@ -1,18 +1,25 @@
 import logging
-from flask_restx import Namespace, Resource
+from flask import current_app, request
+from flask_restx import Namespace, Resource, fields, inputs
 from werkzeug.exceptions import HTTPException
 from services.invoice_service import (
     get_all_invoices,
+    count_invoices,
     get_invoice,
     create_invoice,
     update_invoice,
-    delete_invoice
+    delete_invoice,
+    patch_invoice,
+    delete_invoices,
+    apply_iva_rate
 )
-from utils.utils import generate_swagger_model
+from utils.utils import generate_swagger_model, parse_if_match, version_etag, id_list
+from utils.fieldsets import marshal_with_fields, requested_fields
+from utils.idempotency import idempotent
+from errors.errors import VersionConflictError
 from models.invoice import Invoice
 
 # Initialize logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for Invoice
@@ -23,32 +30,67 @@ invoice_model = generate_swagger_model(
     api=invoices_ns,
     model=Invoice,
     exclude_fields=[],  # No excluded fields in this model
-    readonly_fields=["invoice_id"],  # Fields that cannot be modified
+    readonly_fields=["invoice_id", "version"],  # Fields that cannot be modified
 )
 
+# Parser for the IDs accepted by the bulk delete endpoint
+ids_parser = invoices_ns.parser()
+ids_parser.add_argument("ids", type=id_list, required=True, location="args", help="Comma-separated IDs of the invoices to delete")
+
+# Parser for the options accepted by the list endpoints
+list_parser = invoices_ns.parser()
+list_parser.add_argument("include_archived", type=inputs.boolean, default=False, location="args", help="Also return the archived invoices")
+
+# Payload of the IVA rate propagation endpoint
+iva_rate_model = invoices_ns.model("IvaRate", {
+    "rate": fields.Float(description="IVA rate as a fraction, e.g. 0.23. Defaults to the 'iva' setting"),
+})
+
 @invoices_ns.route("/")
 class InvoiceList(Resource):
     """
     Handles operations on the collection of invoices.
-    Supports retrieving all invoices (GET) and creating new invoices (POST).
+    Supports retrieving all invoices (GET), counting them (HEAD), creating new invoices (POST) and deleting several invoices by ID (DELETE).
     """
 
     @invoices_ns.doc("get_all_invoices")
-    @invoices_ns.marshal_list_with(invoice_model)
+    @invoices_ns.expect(list_parser)
+    @marshal_with_fields(invoices_ns, invoice_model, as_list=True)
     def get(self):
         """
-        Retrieve all invoices.
+        Retrieve all invoices, including the archived ones with ?include_archived=true.
         :return: List of all invoices.
         """
         try:
-            return get_all_invoices()
+            args = list_parser.parse_args()
+            invoices = get_all_invoices(requested_fields(invoice_model), args["include_archived"])
+            return invoices, 200, {"X-Total-Count": len(invoices)}
         except HTTPException as http_err:
-            logger.error(f"HTTP error while retrieving invoices: {http_err}")
+            logger.error("HTTP error while retrieving invoices: %s", http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error retrieving invoices: {e}")
+            logger.error("Error retrieving invoices: %s", e)
             invoices_ns.abort(500, "An error occurred while retrieving the invoices.")
 
+    @invoices_ns.doc("count_invoices")
+    @invoices_ns.expect(list_parser)
+    @invoices_ns.response(200, "Success", headers={"X-Total-Count": "Number of invoices"})
+    def head(self):
+        """
+        Count the invoices without transferring them.
+        :return: Empty response with the number of invoices in the X-Total-Count header
+        """
+        try:
+            args = list_parser.parse_args()
+            return "", 200, {"X-Total-Count": count_invoices(args["include_archived"])}
+        except HTTPException as http_err:
+            logger.error("HTTP error while counting invoices: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error counting invoices: %s", e)
+            invoices_ns.abort(500, "An error occurred while counting the invoices.")
+
+    @idempotent
     @invoices_ns.doc("create_invoice")
     @invoices_ns.expect(invoice_model, validate=True)
     @invoices_ns.marshal_with(invoice_model, code=201)
@@ -72,12 +114,31 @@ class InvoiceList(Resource):
             )
             return created_invoice, 201
         except HTTPException as http_err:
-            logger.error(f"HTTP error while creating an invoice: {http_err}")
+            logger.error("HTTP error while creating an invoice: %s", http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error creating an invoice: {e}")
+            logger.error("Error creating an invoice: %s", e)
             invoices_ns.abort(500, "An error occurred while creating the invoice.")
 
+    @invoices_ns.doc("delete_invoices")
+    @invoices_ns.expect(ids_parser)
+    @invoices_ns.response(200, "Number of deleted invoices")
+    @invoices_ns.response(400, "Invalid list of IDs")
+    def delete(self):
+        """
+        Delete several invoices by ID in a single statement.
+        :return: The number of deleted invoices
+        """
+        args = ids_parser.parse_args()
+        try:
+            return {"deleted": delete_invoices(args["ids"])}, 200
+        except HTTPException as http_err:
+            logger.error("HTTP error while deleting invoices: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error deleting invoices: %s", e)
+            invoices_ns.abort(500, "An error occurred while deleting the invoices.")
+
 @invoices_ns.route("/<int:invoice_id>")
 @invoices_ns.param("invoice_id", "The ID of the invoice")
 class Invoice(Resource):
@@ -87,7 +148,7 @@ class Invoice(Resource):
     """
 
     @invoices_ns.doc("get_invoice")
-    @invoices_ns.marshal_with(invoice_model)
+    @marshal_with_fields(invoices_ns, invoice_model)
     def get(self, invoice_id):
         """
         Retrieve an invoice by ID.
@@ -95,18 +156,19 @@ class Invoice(Resource):
         :return: The invoice with the specified ID.
         """
         try:
-            invoice = get_invoice(invoice_id)
+            invoice = get_invoice(invoice_id, requested_fields(invoice_model))
             if not invoice:
                 invoices_ns.abort(404, f"Invoice {invoice_id} not found.")
-            return invoice
+            return invoice, 200, {"ETag": version_etag(invoice["version"])}
         except HTTPException as http_err:
-            logger.error(f"HTTP error while retrieving invoice {invoice_id}: {http_err}")
+            logger.error("HTTP error while retrieving invoice %s: %s", invoice_id, http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error retrieving invoice {invoice_id}: {e}")
+            logger.error("Error retrieving invoice %s: %s", invoice_id, e)
             invoices_ns.abort(500, "An error occurred while retrieving the invoice.")
 
     @invoices_ns.doc("update_invoice")
+    @invoices_ns.response(412, "Invoice was modified since the If-Match version")
     @invoices_ns.expect(invoice_model, validate=True)
     @invoices_ns.marshal_with(invoice_model)
     def put(self, invoice_id):
@@ -121,15 +183,45 @@ class Invoice(Resource):
             iva = data.get("iva")
             total = data.get("total")
             total_with_iva = data.get("total_with_iva")
-            invoice = update_invoice(invoice_id, client_id, iva, total, total_with_iva)
+            invoice = update_invoice(invoice_id, client_id, iva, total, total_with_iva, parse_if_match())
+            if not invoice:
+                invoices_ns.abort(404, f"Invoice {invoice_id} not found.")
+            return invoice, 200, {"ETag": version_etag(invoice["version"])}
+        except VersionConflictError as conflict:
+            invoices_ns.abort(412, str(conflict))
+        except HTTPException as http_err:
+            logger.error("HTTP error while updating invoice %s: %s", invoice_id, http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error updating invoice %s: %s", invoice_id, e)
+            invoices_ns.abort(500, "An error occurred while updating the invoice.")
+
+    @invoices_ns.doc("patch_invoice")
+    @invoices_ns.response(412, "Invoice was modified since the If-Match version")
+    @invoices_ns.response(400, "No updatable fields or invalid values")
+    @invoices_ns.expect(invoice_model, validate=True)
+    @invoices_ns.marshal_with(invoice_model)
+    def patch(self, invoice_id):
+        """
+        Partially update an invoice by ID.
+        Only the fields present in the payload are changed.
+        :param invoice_id: The ID of the invoice to update.
+        :return: The updated invoice.
+        """
+        try:
+            invoice = patch_invoice(invoice_id, invoices_ns.payload, parse_if_match())
             if not invoice:
                 invoices_ns.abort(404, f"Invoice {invoice_id} not found.")
-            return invoice
+            return invoice, 200, {"ETag": version_etag(invoice["version"])}
+        except ValueError as ve:
+            invoices_ns.abort(400, str(ve))
+        except VersionConflictError as conflict:
+            invoices_ns.abort(412, str(conflict))
         except HTTPException as http_err:
-            logger.error(f"HTTP error while updating invoice {invoice_id}: {http_err}")
+            logger.error("HTTP error while patching invoice %s: %s", invoice_id, http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error updating invoice {invoice_id}: {e}")
+            logger.error("Error patching invoice %s: %s", invoice_id, e)
             invoices_ns.abort(500, "An error occurred while updating the invoice.")
 
     @invoices_ns.doc("delete_invoice")
@@ -146,5 +238,36 @@ class Invoice(Resource):
             result, status_code = delete_invoice(invoice_id)
             return result, status_code
         except Exception as e:
-            logger.error(f"Unexpected error deleting invoice {invoice_id}: {e}")
-            invoices_ns.abort(500, "An unexpected error occurred.")
\ No newline at end of file
+            logger.error("Unexpected error deleting invoice %s: %s", invoice_id, e)
+            invoices_ns.abort(500, "An unexpected error occurred.")
+
+
+@invoices_ns.route("/iva")
+class InvoiceIvaRate(Resource):
+    """
+    Handles applying an IVA rate to the invoices that are not finalized.
+    """
+
+    @idempotent
+    @invoices_ns.doc("apply_iva_rate")
+    @invoices_ns.expect(iva_rate_model)
+    @invoices_ns.response(200, "Number of updated invoices and duration")
+    @invoices_ns.response(400, "Missing or invalid rate")
+    def post(self):
+        """
+        Recalculate the IVA of every invoice that is not finalized.
+        Runs set-based UPDATE statements over chunks of invoice IDs.
+        :return: The rate applied, the number of updated invoices and the duration in milliseconds.
+        """
+        # The body is optional: without a rate the "iva" setting is applied
+        data = request.get_json(silent=True) or {}
+        try:
+            return apply_iva_rate(data.get("rate"), current_app.config["IVA_UPDATE_CHUNK_SIZE"]), 200
+        except ValueError as ve:
+            invoices_ns.abort(400, str(ve))
+        except HTTPException as http_err:
+            logger.error("HTTP error while applying the IVA rate: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error applying the IVA rate: %s", e)
+            invoices_ns.abort(500, "An error occurred while applying the IVA rate.")
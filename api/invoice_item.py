@@ -1,18 +1,22 @@
 import logging
-from flask_restx import Namespace, Resource
+from flask_restx import Namespace, Resource, inputs
 from werkzeug.exceptions import HTTPException
 from services.invoice_item_service import (
     get_all_invoice_items,
+    count_invoice_items,
     get_invoice_item,
     create_invoice_item,
     update_invoice_item,
-    delete_invoice_item
+    delete_invoice_item,
+    patch_invoice_item,
+    delete_invoice_items
 )
-from utils.utils import generate_swagger_model
+from utils.utils import generate_swagger_model, id_list
+from utils.fieldsets import marshal_with_fields, requested_fields
+from utils.idempotency import idempotent
 from models.invoice_item import InvoiceItem
 
 # Initialize logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for invoice_item
@@ -26,29 +30,59 @@ invoice_item_model = generate_swagger_model(
     readonly_fields=["item_id"],  # Fields that cannot be modified
 )
 
+# Parser for the IDs accepted by the bulk delete endpoint
+ids_parser = invoice_items_ns.parser()
+ids_parser.add_argument("ids", type=id_list, required=True, location="args", help="Comma-separated IDs of the invoice_items to delete")
+
+# Parser for the options accepted by the list endpoints
+list_parser = invoice_items_ns.parser()
+list_parser.add_argument("include_archived", type=inputs.boolean, default=False, location="args", help="Also return the archived invoice_items, of archived invoices")
+
 @invoice_items_ns.route("/")
 class InvoiceItemList(Resource):
     """
     Handles operations on the collection of invoice_items.
-    Supports retrieving all invoice_items (GET) and creating new invoice_items (POST).
+    Supports retrieving all invoice_items (GET), counting them (HEAD), creating new invoice_items (POST) and deleting several invoice_items by ID (DELETE).
     """
 
     @invoice_items_ns.doc("get_all_invoice_items")
-    @invoice_items_ns.marshal_list_with(invoice_item_model)
+    @invoice_items_ns.expect(list_parser)
+    @marshal_with_fields(invoice_items_ns, invoice_item_model, as_list=True)
     def get(self):
         """
-        Retrieve all invoice_items.
+        Retrieve all invoice_items, including those of archived invoices with ?include_archived=true.
         :return: List of all invoice_items.
         """
         try:
-            return get_all_invoice_items()
+            args = list_parser.parse_args()
+            invoice_items = get_all_invoice_items(requested_fields(invoice_item_model), args["include_archived"])
+            return invoice_items, 200, {"X-Total-Count": len(invoice_items)}
         except HTTPException as http_err:
-            logger.error(f"HTTP error while retrieving invoice_items: {http_err}")
+            logger.error("HTTP error while retrieving invoice_items: %s", http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error retrieving invoice_items: {e}")
+            logger.error("Error retrieving invoice_items: %s", e)
             invoice_items_ns.abort(500, "An error occurred while retrieving the invoice_items.")
 
+    @invoice_items_ns.doc("count_invoice_items")
+    @invoice_items_ns.expect(list_parser)
+    @invoice_items_ns.response(200, "Success", headers={"X-Total-Count": "Number of invoice items"})
+    def head(self):
+        """
+        Count the invoice items without transferring them.
+        :return: Empty response with the number of invoice items in the X-Total-Count header
+        """
+        try:
+            args = list_parser.parse_args()
+            return "", 200, {"X-Total-Count": count_invoice_items(args["include_archived"])}
+        except HTTPException as http_err:
+            logger.error("HTTP error while counting invoice items: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error counting invoice items: %s", e)
+            invoice_items_ns.abort(500, "An error occurred while counting the invoice items.")
+
+    @idempotent
     @invoice_items_ns.doc("create_invoice_item")
     @invoice_items_ns.expect(invoice_item_model, validate=True)
     @invoice_items_ns.marshal_with(invoice_item_model, code=201)
@@ -72,12 +106,31 @@ class InvoiceItemList(Resource):
             )
             return created_invoice_item, 201
         except HTTPException as http_err:
-            logger.error(f"HTTP error while creating an invoice_item: {http_err}")
+            logger.error("HTTP error while creating an invoice_item: %s", http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error creating an invoice_item: {e}")
+            logger.error("Error creating an invoice_item: %s", e)
             invoice_items_ns.abort(500, "An error occurred while creating the invoice_item.")
 
+    @invoice_items_ns.doc("delete_invoice_items")
+    @invoice_items_ns.expect(ids_parser)
+    @invoice_items_ns.response(200, "Number of deleted invoice_items")
+    @invoice_items_ns.response(400, "Invalid list of IDs")
+    def delete(self):
+        """
+        Delete several invoice_items by ID in a single statement.
+        :return: The number of deleted invoice_items
+        """
+        args = ids_parser.parse_args()
+        try:
+            return {"deleted": delete_invoice_items(args["ids"])}, 200
+        except HTTPException as http_err:
+            logger.error("HTTP error while deleting invoice_items: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error deleting invoice_items: %s", e)
+            invoice_items_ns.abort(500, "An error occurred while deleting the invoice_items.")
+
 @invoice_items_ns.route("/<int:item_id>")
 @invoice_items_ns.param("item_id", "The ID of the invoice_item")
 class InvoiceItem(Resource):
@@ -87,7 +140,7 @@ class InvoiceItem(Resource):
     """
 
     @invoice_items_ns.doc("get_invoice_item")
-    @invoice_items_ns.marshal_with(invoice_item_model)
+    @marshal_with_fields(invoice_items_ns, invoice_item_model)
     def get(self, item_id):
         """
         Retrieve an invoice_item by ID.
@@ -95,15 +148,15 @@ class InvoiceItem(Resource):
         :return: The invoice_item with the specified ID.
         """
         try:
-            invoice_item = get_invoice_item(item_id)
+            invoice_item = get_invoice_item(item_id, requested_fields(invoice_item_model))
             if not invoice_item:
                 invoice_items_ns.abort(404, f"Invoice_item {item_id} not found.")
             return invoice_item
         except HTTPException as http_err:
-            logger.error(f"HTTP error while retrieving invoice_item {item_id}: {http_err}")
+            logger.error("HTTP error while retrieving invoice_item %s: %s", item_id, http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error retrieving invoice_item {item_id}: {e}")
+            logger.error("Error retrieving invoice_item %s: %s", item_id, e)
             invoice_items_ns.abort(500, "An error occurred while retrieving the invoice_item.")
 
     @invoice_items_ns.doc("update_invoice_item")
@@ -126,10 +179,35 @@ class InvoiceItem(Resource):
                 invoice_items_ns.abort(404, f"Invoice_item {item_id} not found.")
             return invoice_item
         except HTTPException as http_err:
-            logger.error(f"HTTP error while updating invoice_item {item_id}: {http_err}")
+            logger.error("HTTP error while updating invoice_item %s: %s", item_id, http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error updating invoice_item %s: %s", item_id, e)
+            invoice_items_ns.abort(500, "An error occurred while updating the invoice_item.")
+
+    @invoice_items_ns.doc("patch_invoice_item")
+    @invoice_items_ns.response(400, "No updatable fields or invalid values")
+    @invoice_items_ns.expect(invoice_item_model, validate=True)
+    @invoice_items_ns.marshal_with(invoice_item_model)
+    def patch(self, item_id):
+        """
+        Partially update an invoice_item by ID.
+        Only the fields present in the payload are changed.
+        :param item_id: The ID of the invoice_item to update.
+        :return: The updated invoice_item.
+        """
+        try:
+            invoice_item = patch_invoice_item(item_id, invoice_items_ns.payload)
+            if not invoice_item:
+                invoice_items_ns.abort(404, f"Invoice_item {item_id} not found.")
+            return invoice_item
+        except ValueError as ve:
+            invoice_items_ns.abort(400, str(ve))
+        except HTTPException as http_err:
+            logger.error("HTTP error while patching invoice_item %s: %s", item_id, http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error updating invoice_item {item_id}: {e}")
+            logger.error("Error patching invoice_item %s: %s", item_id, e)
             invoice_items_ns.abort(500, "An error occurred while updating the invoice_item.")
 
     @invoice_items_ns.doc("delete_invoice_item")
@@ -146,5 +224,5 @@ class InvoiceItem(Resource):
             result, status_code = delete_invoice_item(item_id)
             return result, status_code
         except Exception as e:
-            logger.error(f"Unexpected error deleting invoice_item {item_id}: {e}")
+            logger.error("Unexpected error deleting invoice_item %s: %s", item_id, e)
             invoice_items_ns.abort(500, "An unexpected error occurred.")
\ No newline at end of file
@@ -0,0 +1,89 @@
+import logging
+from flask_restx import Namespace, Resource
+from utils.cache import response_cache
+from utils.events import event_hub
+from utils.rate_limit import rate_limiter
+from utils.admission import admission_controller
+from utils.availability import availability_calendar
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Namespace for runtime metrics of this process
+metrics_ns = Namespace('metrics', description='Runtime metrics of the API process')
+
+
+@metrics_ns.route('/cache')
+class CacheMetrics(Resource):
+    """
+    Exposes the statistics of the list response cache.
+    """
+
+    @metrics_ns.doc('get_cache_metrics')
+    def get(self):
+        """
+        Retrieve the hit/miss statistics of the list response cache of this process.
+        :return: Entry count, hits, misses, evictions, hit ratio and table generations
+        """
+        return response_cache.stats()
+
+
+@metrics_ns.route('/events')
+class EventMetrics(Resource):
+    """
+    Exposes the statistics of the server-sent event hub.
+    """
+
+    @metrics_ns.doc('get_event_metrics')
+    def get(self):
+        """
+        Retrieve the subscriber count and the published and dropped event counts of this process.
+        :return: Subscribers, thread subscribers and their limit, queue size, published and dropped
+                 messages and refused thread subscribers
+        """
+        return event_hub.stats()
+
+
+@metrics_ns.route('/rate-limit')
+class RateLimitMetrics(Resource):
+    """
+    Exposes the statistics of the rate limiter.
+    """
+
+    @metrics_ns.doc('get_rate_limit_metrics')
+    def get(self):
+        """
+        Retrieve the configured limits and the bucket and rejection counts of this process.
+        :return: Rules, live buckets, rejected requests and buckets dropped by compaction
+        """
+        return rate_limiter.stats()
+
+
+@metrics_ns.route('/admission')
+class AdmissionMetrics(Resource):
+    """
+    Exposes the statistics of the admission controller.
+    """
+
+    @metrics_ns.doc('get_admission_metrics')
+    def get(self):
+        """
+        Retrieve the in-flight requests, queue depth and shed counts of the read and write budgets of this process.
+        :return: Statistics per budget
+        """
+        return admission_controller.stats()
+
+
+@metrics_ns.route('/availability')
+class AvailabilityMetrics(Resource):
+    """
+    Exposes the statistics of the employee availability calendar.
+    """
+
+    @metrics_ns.doc('get_availability_metrics')
+    def get(self):
+        """
+        Retrieve the horizon, size and change log cursor of the availability calendar of this process.
+        :return: First day and length of the horizon, tracked tasks, busy employees, rebuilds and applied changes
+        """
+        return availability_calendar.stats()
@@ -3,16 +3,20 @@ from flask_restx import Namespace, Resource
 from werkzeug.exceptions import HTTPException
 from services.setting_service import (
     get_all_settings,
+    count_settings,
     get_setting,
     create_setting,
     update_setting,
-    delete_setting
+    delete_setting,
+    patch_setting,
+    delete_settings
 )
-from utils.utils import generate_swagger_model
+from utils.utils import generate_swagger_model, id_list
+from utils.fieldsets import marshal_with_fields, requested_fields
+from utils.idempotency import idempotent
 from models.setting import Setting
 
 # Initialize logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 settings_ns = Namespace("setting", description="CRUD operations for managing settings")
@@ -25,15 +29,19 @@ setting_model = generate_swagger_model(
     readonly_fields=["setting_id"],  # Fields that cannot be modified
 )
 
+# Parser for the IDs accepted by the bulk delete endpoint
+ids_parser = settings_ns.parser()
+ids_parser.add_argument("ids", type=id_list, required=True, location="args", help="Comma-separated IDs of the settings to delete")
+
 @settings_ns.route("/")
 class SettingList(Resource):
     """
     Handles operations on the collection of settings.
-    Supports retrieving all settings (GET) and creating new settings (POST).
+    Supports retrieving all settings (GET), counting them (HEAD), creating new settings (POST) and deleting several settings by ID (DELETE).
     """
 
     @settings_ns.doc("get_all_settings")
-    @settings_ns.marshal_list_with(setting_model)
+    @marshal_with_fields(settings_ns, setting_model, as_list=True)
     def get(self):
         """
         Retrieve all settings.
@@ -41,16 +49,34 @@ class SettingList(Resource):
         """
         try:
             # Fetch all settings from the service layer
-            return get_all_settings()
+            settings = get_all_settings(requested_fields(setting_model))
+            return settings, 200, {"X-Total-Count": len(settings)}
         except HTTPException as http_err:
             # Allow HTTP exceptions to propagate their status codes and messages
-            logger.error(f"HTTP error while retrieving settings: {http_err}")
+            logger.error("HTTP error while retrieving settings: %s", http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error retrieving settings: {e}")
+            logger.error("Error retrieving settings: %s", e)
             settings_ns.abort(500, "An error occurred while retrieving the settings.")
 
+    @settings_ns.doc("count_settings")
+    @settings_ns.response(200, "Success", headers={"X-Total-Count": "Number of settings"})
+    def head(self):
+        """
+        Count the settings without transferring them.
+        :return: Empty response with the number of settings in the X-Total-Count header
+        """
+        try:
+            return "", 200, {"X-Total-Count": count_settings()}
+        except HTTPException as http_err:
+            logger.error("HTTP error while counting settings: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error counting settings: %s", e)
+            settings_ns.abort(500, "An error occurred while counting the settings.")
+
+    @idempotent
     @settings_ns.doc("create_setting")
     @settings_ns.expect(setting_model, validate=True)
     @settings_ns.marshal_with(setting_model, code=201)
@@ -67,13 +93,32 @@ class SettingList(Resource):
             return create_setting(key_name, value), 201
         except HTTPException as http_err:
             # Allow HTTP exceptions to propagate their status codes and messages
-            logger.error(f"HTTP error while creating a setting: {http_err}")
+            logger.error("HTTP error while creating a setting: %s", http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error creating a setting: {e}")
+            logger.error("Error creating a setting: %s", e)
             settings_ns.abort(500, "An error occurred while creating the setting.")
 
+    @settings_ns.doc("delete_settings")
+    @settings_ns.expect(ids_parser)
+    @settings_ns.response(200, "Number of deleted settings")
+    @settings_ns.response(400, "Invalid list of IDs")
+    def delete(self):
+        """
+        Delete several settings by ID in a single statement.
+        :return: The number of deleted settings
+        """
+        args = ids_parser.parse_args()
+        try:
+            return {"deleted": delete_settings(args["ids"])}, 200
+        except HTTPException as http_err:
+            logger.error("HTTP error while deleting settings: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error deleting settings: %s", e)
+            settings_ns.abort(500, "An error occurred while deleting the settings.")
+
 @settings_ns.route("/<int:setting_id>")
 @settings_ns.param("setting_id", "The ID of the setting")
 
@@ -84,7 +129,7 @@ class Setting(Resource):
     """
 
     @settings_ns.doc("get_setting")
-    @settings_ns.marshal_with(setting_model)
+    @marshal_with_fields(settings_ns, setting_model)
     def get(self, setting_id):
         """
         Retrieve a setting by ID.
@@ -93,17 +138,17 @@ class Setting(Resource):
         """
         try:
             # Fetch the setting by ID
-            setting = get_setting(setting_id)
+            setting = get_setting(setting_id, requested_fields(setting_model))
             if not setting:
                 settings_ns.abort(404, f"Setting {setting_id} not found.")
             return setting
         except HTTPException as http_err:
             # Allow HTTP exceptions to propagate their status codes and messages
-            logger.error(f"HTTP error while retrieving setting {setting_id}: {http_err}")
+            logger.error("HTTP error while retrieving setting %s: %s", setting_id, http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error retrieving setting {setting_id}: {e}")
+            logger.error("Error retrieving setting %s: %s", setting_id, e)
             settings_ns.abort(500, "An error occurred while retrieving the setting.")
 
     @settings_ns.doc("update_setting")
@@ -126,11 +171,36 @@ class Setting(Resource):
             return setting
         except HTTPException as http_err:
             # Allow HTTP exceptions to propagate their status codes and messages
-            logger.error(f"HTTP error while updating setting {setting_id}: {http_err}")
+            logger.error("HTTP error while updating setting %s: %s", setting_id, http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error updating setting {setting_id}: {e}")
+            logger.error("Error updating setting %s: %s", setting_id, e)
+            settings_ns.abort(500, "An error occurred while updating the setting.")
+
+    @settings_ns.doc("patch_setting")
+    @settings_ns.response(400, "No updatable fields or invalid values")
+    @settings_ns.expect(setting_model, validate=True)
+    @settings_ns.marshal_with(setting_model)
+    def patch(self, setting_id):
+        """
+        Partially update a setting by ID.
+        Only the fields present in the payload are changed.
+        :param setting_id: The ID of the setting to update.
+        :return: The updated setting.
+        """
+        try:
+            setting = patch_setting(setting_id, settings_ns.payload)
+            if not setting:
+                settings_ns.abort(404, f"Setting {setting_id} not found.")
+            return setting
+        except ValueError as ve:
+            settings_ns.abort(400, str(ve))
+        except HTTPException as http_err:
+            logger.error("HTTP error while patching setting %s: %s", setting_id, http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error patching setting %s: %s", setting_id, e)
             settings_ns.abort(500, "An error occurred while updating the setting.")
 
     @settings_ns.doc("delete_setting")
@@ -146,9 +216,9 @@ class Setting(Resource):
             result, status_code = delete_setting(setting_id)
             return result, status_code
         except HTTPException as http_err:
-            logger.error(f"HTTP error while deleting setting {setting_id}: {http_err}")
+            logger.error("HTTP error while deleting setting %s: %s", setting_id, http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error deleting setting {setting_id}: {e}")
+            logger.error("Error deleting setting %s: %s", setting_id, e)
             settings_ns.abort(500, "An error occurred while deleting the setting.")
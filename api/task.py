@@ -1,18 +1,26 @@
 import logging
-from flask_restx import Namespace, Resource
+from flask_restx import Namespace, Resource, fields, inputs
 from werkzeug.exceptions import HTTPException
 from services.task_service import (
     get_all_tasks,
+    count_tasks,
     get_task,
     create_task,
     update_task,
-    delete_task
+    delete_task,
+    patch_task,
+    delete_tasks,
+    auto_assign_tasks,
+    DEFAULT_ASSIGNEE_ROLE,
 )
-from utils.utils import generate_swagger_model
+from utils.utils import generate_swagger_model, parse_if_match, version_etag, id_list
+from utils.fieldsets import marshal_with_fields, requested_fields
+from utils.idempotency import idempotent
+from errors.errors import VersionConflictError
 from models.task import Task
+from models.status import STATUSES, status_list
 
 # Initialize logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for Task
@@ -23,32 +31,69 @@ task_model = generate_swagger_model(
     api=tasks_ns,
     model=Task,
     exclude_fields=[],  # No excluded fields in this model
-    readonly_fields=["task_id"],  # Fields that cannot be modified
+    readonly_fields=["task_id", "version"],  # Fields that cannot be modified
 )
 
+# Task sent for automatic assignment: no employee, but the role of the employee to assign it to
+unassigned_task_model = tasks_ns.model("UnassignedTask", {
+    **{name: field for name, field in task_model.items() if name not in ("task_id", "employee_id", "created_at", "version")},
+    "role": fields.String(description=f"Role of the employee to assign the task to, {DEFAULT_ASSIGNEE_ROLE} when omitted"),
+})
+
+# Parser for the IDs accepted by the bulk delete endpoint
+ids_parser = tasks_ns.parser()
+ids_parser.add_argument("ids", type=id_list, required=True, location="args", help="Comma-separated IDs of the tasks to delete")
+
+# Parser for the filters accepted by the list endpoints
+list_parser = tasks_ns.parser()
+list_parser.add_argument("status", type=status_list, location="args", help=f"Comma-separated statuses to filter on ({', '.join(STATUSES)})")
+list_parser.add_argument("include_archived", type=inputs.boolean, default=False, location="args", help="Also return the archived tasks")
+
 @tasks_ns.route("/")
 class TaskList(Resource):
     """
     Handles operations on the collection of tasks.
-    Supports retrieving all tasks (GET) and creating new tasks (POST).
+    Supports retrieving all tasks (GET), counting them (HEAD), creating new tasks (POST) and deleting several tasks by ID (DELETE).
     """
 
     @tasks_ns.doc("get_all_tasks")
-    @tasks_ns.marshal_list_with(task_model)
+    @tasks_ns.expect(list_parser)
+    @marshal_with_fields(tasks_ns, task_model, as_list=True)
     def get(self):
         """
-        Retrieve all tasks.
+        Retrieve all tasks, optionally filtered by ?status, including the archived ones with ?include_archived=true.
         :return: List of all tasks.
         """
         try:
-            return get_all_tasks()
+            args = list_parser.parse_args()
+            tasks = get_all_tasks(requested_fields(task_model), args["status"], args["include_archived"])
+            return tasks, 200, {"X-Total-Count": len(tasks)}
         except HTTPException as http_err:
-            logger.error(f"HTTP error while retrieving tasks: {http_err}")
+            logger.error("HTTP error while retrieving tasks: %s", http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error retrieving tasks: {e}")
+            logger.error("Error retrieving tasks: %s", e)
             tasks_ns.abort(500, "An error occurred while retrieving the tasks.")
 
+    @tasks_ns.doc("count_tasks")
+    @tasks_ns.expect(list_parser)
+    @tasks_ns.response(200, "Success", headers={"X-Total-Count": "Number of tasks"})
+    def head(self):
+        """
+        Count the tasks without transferring them.
+        :return: Empty response with the number of tasks in the X-Total-Count header
+        """
+        try:
+            args = list_parser.parse_args()
+            return "", 200, {"X-Total-Count": count_tasks(args["status"], args["include_archived"])}
+        except HTTPException as http_err:
+            logger.error("HTTP error while counting tasks: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error counting tasks: %s", e)
+            tasks_ns.abort(500, "An error occurred while counting the tasks.")
+
+    @idempotent
     @tasks_ns.doc("create_task")
     @tasks_ns.expect(task_model, validate=True)
     @tasks_ns.marshal_with(task_model, code=201)
@@ -66,13 +111,66 @@ class TaskList(Resource):
             status = data.get("status")
             work_id = data.get("work_id")
             return create_task(description, employee_id, start_date, end_date, status, work_id)
+        except ValueError as ve:
+            tasks_ns.abort(400, str(ve))
         except HTTPException as http_err:
-            logger.error(f"HTTP error while creating task: {http_err}")
+            logger.error("HTTP error while creating task: %s", http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error creating task: {e}")
+            logger.error("Error creating task: %s", e)
             tasks_ns.abort(500, "An error occurred while creating the task.")
 
+    @tasks_ns.doc("delete_tasks")
+    @tasks_ns.expect(ids_parser)
+    @tasks_ns.response(200, "Number of deleted tasks")
+    @tasks_ns.response(400, "Invalid list of IDs")
+    def delete(self):
+        """
+        Delete several tasks by ID in a single statement.
+        :return: The number of deleted tasks
+        """
+        args = ids_parser.parse_args()
+        try:
+            return {"deleted": delete_tasks(args["ids"])}, 200
+        except HTTPException as http_err:
+            logger.error("HTTP error while deleting tasks: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error deleting tasks: %s", e)
+            tasks_ns.abort(500, "An error occurred while deleting the tasks.")
+
+@tasks_ns.route("/auto-assign")
+class TaskAutoAssign(Resource):
+    """
+    Handles the creation of tasks assigned to an employee by the API.
+    """
+
+    @idempotent
+    @tasks_ns.doc("auto_assign_tasks")
+    @tasks_ns.expect([unassigned_task_model])
+    @tasks_ns.response(400, "Invalid task or no employee with the role")
+    @tasks_ns.marshal_list_with(task_model, code=201)
+    def post(self):
+        """
+        Create one task or a list of tasks, each assigned to the least-loaded employee of its role who is free on the task's dates.
+        All the tasks are created in one transaction.
+        :return: The created tasks, in the order given.
+        """
+        data = tasks_ns.payload
+        tasks = [data] if isinstance(data, dict) else data
+        if not isinstance(tasks, list) or not all(isinstance(task, dict) for task in tasks):
+            tasks_ns.abort(400, "The payload must be a task or a list of tasks.")
+        try:
+            return auto_assign_tasks(tasks), 201
+        except ValueError as ve:
+            tasks_ns.abort(400, str(ve))
+        except HTTPException as http_err:
+            logger.error("HTTP error while auto-assigning tasks: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error auto-assigning tasks: %s", e)
+            tasks_ns.abort(500, "An error occurred while assigning the tasks.")
+
 @tasks_ns.route("/<int:task_id>")
 @tasks_ns.param("task_id", "The ID of the task")
 class Task(Resource):
@@ -82,7 +180,7 @@ class Task(Resource):
     """
 
     @tasks_ns.doc("get_task")
-    @tasks_ns.marshal_with(task_model)
+    @marshal_with_fields(tasks_ns, task_model)
     def get(self, task_id):
         """
         Retrieve a task by ID.
@@ -90,18 +188,19 @@ class Task(Resource):
         :return: The task with the specified ID.
         """
         try:
-            task = get_task(task_id)
+            task = get_task(task_id, requested_fields(task_model))
             if not task:
                 tasks_ns.abort(404, f"Task {task_id} not found.")
-            return task
+            return task, 200, {"ETag": version_etag(task["version"])}
         except HTTPException as http_err:
-            logger.error(f"HTTP error while retrieving task {task_id}: {http_err}")
+            logger.error("HTTP error while retrieving task %s: %s", task_id, http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error retrieving task {task_id}: {e}")
+            logger.error("Error retrieving task %s: %s", task_id, e)
             tasks_ns.abort(500, f"An error occurred while retrieving task {task_id}.")
 
     @tasks_ns.doc("update_task")
+    @tasks_ns.response(412, "Task was modified since the If-Match version")
     @tasks_ns.expect(task_model, validate=True)
     @tasks_ns.marshal_with(task_model)
     def put(self, task_id):
@@ -118,12 +217,47 @@ class Task(Resource):
             end_date = data.get("end_date")
             status = data.get("status")
             work_id = data.get("work_id")
-            return update_task(task_id, description, employee_id, start_date, end_date, status, work_id)
+            task = update_task(task_id, description, employee_id, start_date, end_date, status, work_id, parse_if_match())
+            if not task:
+                tasks_ns.abort(404, f"Task {task_id} not found.")
+            return task, 200, {"ETag": version_etag(task["version"])}
+        except ValueError as ve:
+            tasks_ns.abort(400, str(ve))
+        except VersionConflictError as conflict:
+            tasks_ns.abort(412, str(conflict))
+        except HTTPException as http_err:
+            logger.error("HTTP error while updating task %s: %s", task_id, http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error updating task %s: %s", task_id, e)
+            tasks_ns.abort(500, f"An error occurred while updating task {task_id}.")
+
+    @tasks_ns.doc("patch_task")
+    @tasks_ns.response(412, "Task was modified since the If-Match version")
+    @tasks_ns.response(400, "No updatable fields or invalid values")
+    @tasks_ns.expect(task_model, validate=True)
+    @tasks_ns.marshal_with(task_model)
+    def patch(self, task_id):
+        """
+        Partially update a task by ID.
+        Only the fields present in the payload are changed.
+        :param task_id: The ID of the task to update.
+        :return: The updated task.
+        """
+        try:
+            task = patch_task(task_id, tasks_ns.payload, parse_if_match())
+            if not task:
+                tasks_ns.abort(404, f"Task {task_id} not found.")
+            return task, 200, {"ETag": version_etag(task["version"])}
+        except ValueError as ve:
+            tasks_ns.abort(400, str(ve))
+        except VersionConflictError as conflict:
+            tasks_ns.abort(412, str(conflict))
         except HTTPException as http_err:
-            logger.error(f"HTTP error while updating task {task_id}: {http_err}")
+            logger.error("HTTP error while patching task %s: %s", task_id, http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error updating task {task_id}: {e}")
+            logger.error("Error patching task %s: %s", task_id, e)
             tasks_ns.abort(500, f"An error occurred while updating task {task_id}.")
 
     @tasks_ns.doc("delete_task")
@@ -143,8 +277,8 @@ class Task(Resource):
             else:
                 tasks_ns.abort(404, f"Task {task_id} not found.")
         except HTTPException as http_err:
-            logger.error(f"HTTP error while deleting task {task_id}: {http_err}")
+            logger.error("HTTP error while deleting task %s: %s", task_id, http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error deleting task {task_id}: {e}")
+            logger.error("Error deleting task %s: %s", task_id, e)
             tasks_ns.abort(500, f"An error occurred while deleting task {task_id}.")
@@ -1,19 +1,27 @@
+import json
 import logging
+from flask import Response, stream_with_context
 from flask_restx import Namespace, Resource
 from werkzeug.exceptions import HTTPException
 from services.vehicle_service import (
     get_all_vehicles,
+    count_vehicles,
     get_vehicle,
     create_vehicle,
     update_vehicle,
-    delete_vehicle
+    delete_vehicle,
+    patch_vehicle,
+    delete_vehicles,
+    get_vehicle_history
 )
-from utils.utils import generate_swagger_model
+from utils.utils import generate_swagger_model, id_list
+from utils.fieldsets import marshal_with_fields, requested_fields
+from utils.idempotency import idempotent
+from utils.cache import cached_response
 from models.vehicle import Vehicle
 
 
 # Initialize logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for managing vehicles
@@ -27,16 +35,21 @@ vehicle_model = generate_swagger_model(
     readonly_fields=['vehicle_id']  # Fields that cannot be modified
 )
 
+# Parser for the IDs accepted by the bulk delete endpoint
+ids_parser = vehicles_ns.parser()
+ids_parser.add_argument('ids', type=id_list, required=True, location='args', help='Comma-separated IDs of the vehicles to delete')
+
 
 @vehicles_ns.route('/')
 class VehicleList(Resource):
     """
     Handles operations on the collection of vehicles.
-    Supports retrieving all vehicles (GET) and creating new vehicles (POST).
+    Supports retrieving all vehicles (GET), counting them (HEAD), creating new vehicles (POST) and deleting several vehicles by ID (DELETE).
     """
 
+    @cached_response("vehicle")
     @vehicles_ns.doc('get_all_vehicles')
-    @vehicles_ns.marshal_list_with(vehicle_model)
+    @marshal_with_fields(vehicles_ns, vehicle_model, as_list=True)
     def get(self):
         """
         Retrieve all vehicles.
@@ -44,16 +57,34 @@ class VehicleList(Resource):
         """
         try:
             # Call the service to get all vehicles
-            return get_all_vehicles()
+            vehicles = get_all_vehicles(requested_fields(vehicle_model))
+            return vehicles, 200, {'X-Total-Count': len(vehicles)}
         except HTTPException as http_err:
-            logger.error(f"HTTP error while retrieving vehicles: {http_err}")
+            logger.error("HTTP error while retrieving vehicles: %s", http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error retrieving vehicles: {e}")
+            logger.error("Error retrieving vehicles: %s", e)
             vehicles_ns.abort(500, "An error occurred while retrieving the list of vehicles.")
 
+    @vehicles_ns.doc('count_vehicles')
+    @vehicles_ns.response(200, 'Success', headers={'X-Total-Count': 'Number of vehicles'})
+    def head(self):
+        """
+        Count the vehicles without transferring them.
+        :return: Empty response with the number of vehicles in the X-Total-Count header
+        """
+        try:
+            return '', 200, {'X-Total-Count': count_vehicles()}
+        except HTTPException as http_err:
+            logger.error("HTTP error while counting vehicles: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error counting vehicles: %s", e)
+            vehicles_ns.abort(500, "An error occurred while counting the vehicles.")
 
+
+    @idempotent
     @vehicles_ns.doc('create_vehicle')
     @vehicles_ns.expect(vehicle_model, validate=True)
     @vehicles_ns.marshal_with(vehicle_model, code=201)
@@ -68,14 +99,31 @@ class VehicleList(Resource):
             vehicle = create_vehicle(data["brand"], data["client_id"], data["license_plate"], data["model"], data["year"])
             return vehicle, 201  # Return the newly created vehicle with status code 201
         except HTTPException as http_err:
-            logger.error(f"HTTP error while creating vehicle: {http_err}")
+            logger.error("HTTP error while creating vehicle: %s", http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error creating vehicle: {e}")
+            logger.error("Error creating vehicle: %s", e)
             vehicles_ns.abort(500, "An error occurred while creating the vehicle.")
 
-
+    @vehicles_ns.doc('delete_vehicles')
+    @vehicles_ns.expect(ids_parser)
+    @vehicles_ns.response(200, 'Number of deleted vehicles')
+    @vehicles_ns.response(400, 'Invalid list of IDs')
+    def delete(self):
+        """
+        Delete several vehicles by ID in a single statement.
+        :return: The number of deleted vehicles
+        """
+        args = ids_parser.parse_args()
+        try:
+            return {"deleted": delete_vehicles(args["ids"])}, 200
+        except HTTPException as http_err:
+            logger.error("HTTP error while deleting vehicles: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error deleting vehicles: %s", e)
+            vehicles_ns.abort(500, "An error occurred while deleting the vehicles.")
 
 
 @vehicles_ns.route('/<int:vehicle_id>')
@@ -87,7 +135,7 @@ class Vehicle(Resource):
     """
 
     @vehicles_ns.doc('get_vehicle')
-    @vehicles_ns.marshal_with(vehicle_model)
+    @marshal_with_fields(vehicles_ns, vehicle_model)
     def get(self, vehicle_id):
         """
         Retrieve a vehicle by ID.
@@ -96,17 +144,17 @@ class Vehicle(Resource):
         """
         try:
             # Call the service to get the vehicle by ID
-            vehicle = get_vehicle(vehicle_id)
+            vehicle = get_vehicle(vehicle_id, requested_fields(vehicle_model))
             if not vehicle:
                 # Return a 404 error if vehicle does not exist
                 vehicles_ns.abort(404, f"Vehicle with ID {vehicle_id} not found.")
             return vehicle
         except HTTPException as http_err:
-            logger.error(f"HTTP error while retrieving vehicle with ID {vehicle_id}: {http_err}")
+            logger.error("HTTP error while retrieving vehicle with ID %s: %s", vehicle_id, http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error retrieving vehicle with ID {vehicle_id}: {e}")
+            logger.error("Error retrieving vehicle with ID %s: %s", vehicle_id, e)
             vehicles_ns.abort(500, "An error occurred while retrieving the vehicle.")
 
     @vehicles_ns.doc('update_vehicle')
@@ -127,11 +175,36 @@ class Vehicle(Resource):
                 vehicles_ns.abort(404, f"Vehicle with ID {vehicle_id} not found.")
             return vehicle
         except HTTPException as http_err:
-            logger.error(f"HTTP error while updating vehicle with ID {vehicle_id}: {http_err}")
+            logger.error("HTTP error while updating vehicle with ID %s: %s", vehicle_id, http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error updating vehicle with ID {vehicle_id}: {e}")
+            logger.error("Error updating vehicle with ID %s: %s", vehicle_id, e)
+            vehicles_ns.abort(500, "An error occurred while updating the vehicle.")
+
+    @vehicles_ns.doc('patch_vehicle')
+    @vehicles_ns.response(400, 'No updatable fields or invalid values')
+    @vehicles_ns.expect(vehicle_model, validate=True)
+    @vehicles_ns.marshal_with(vehicle_model)
+    def patch(self, vehicle_id):
+        """
+        Partially update a vehicle by ID.
+        Only the fields present in the payload are changed.
+        :param vehicle_id: The ID of the vehicle to update.
+        :return: The updated vehicle.
+        """
+        try:
+            vehicle = patch_vehicle(vehicle_id, vehicles_ns.payload)
+            if not vehicle:
+                vehicles_ns.abort(404, f"Vehicle with ID {vehicle_id} not found.")
+            return vehicle
+        except ValueError as ve:
+            vehicles_ns.abort(400, str(ve))
+        except HTTPException as http_err:
+            logger.error("HTTP error while patching vehicle %s: %s", vehicle_id, http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error patching vehicle %s: %s", vehicle_id, e)
             vehicles_ns.abort(500, "An error occurred while updating the vehicle.")
 
     @vehicles_ns.doc('delete_vehicle')
@@ -150,9 +223,57 @@ class Vehicle(Resource):
                 vehicles_ns.abort(404, f"Vehicle with ID {vehicle_id} not found.")
             return response
         except HTTPException as http_err:
-            logger.error(f"HTTP error while deleting vehicle with ID {vehicle_id}: {http_err}")
+            logger.error("HTTP error while deleting vehicle with ID %s: %s", vehicle_id, http_err)
             raise http_err
         except Exception as e:
             # Log error and return a 500 status code
-            logger.error(f"Error deleting vehicle with ID {vehicle_id}: {e}")
+            logger.error("Error deleting vehicle with ID %s: %s", vehicle_id, e)
             vehicles_ns.abort(500, "An error occurred while deleting the vehicle.")
+
+
+def _json_default(value):
+    """
+    Serialize the dates and timestamps of history events in ISO 8601 format.
+    """
+    return value.isoformat()
+
+
+@vehicles_ns.route('/<int:vehicle_id>/history')
+@vehicles_ns.param('vehicle_id', 'The ID of the vehicle')
+class VehicleHistory(Resource):
+    """
+    Handles the service history of a single vehicle.
+    """
+
+    @vehicles_ns.doc('get_vehicle_history')
+    @vehicles_ns.produces(['application/x-ndjson'])
+    @vehicles_ns.response(200, 'One JSON event per line: works, their tasks and their invoice items, in chronological order')
+    @vehicles_ns.response(404, 'Vehicle not found')
+    def get(self, vehicle_id):
+        """
+        Stream the history of a vehicle.
+        Each line is a JSON object with a "type" (work, task or invoice_item) and a "date"; a work is
+        followed by its tasks and a task by its invoice items.
+        :param vehicle_id: The ID of the vehicle
+        :return: Newline-delimited JSON stream of history events, or 404 if the vehicle does not exist
+        """
+        try:
+            events = get_vehicle_history(vehicle_id)
+            if events is None:
+                vehicles_ns.abort(404, f"Vehicle with ID {vehicle_id} not found.")
+        except HTTPException as http_err:
+            logger.error("HTTP error while retrieving history of vehicle %s: %s", vehicle_id, http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error retrieving history of vehicle %s: %s", vehicle_id, e)
+            vehicles_ns.abort(500, "An error occurred while retrieving the vehicle history.")
+
+        def generate():
+            try:
+                for event in events:
+                    yield json.dumps(event, default=_json_default) + "\n"
+            except Exception as e:
+                # The status line is already sent, so the stream can only be cut short
+                logger.error("Error streaming history of vehicle %s: %s", vehicle_id, e)
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -3,16 +3,22 @@ from flask_restx import Namespace, Resource
 from werkzeug.exceptions import HTTPException
 from services.work_service import (
     get_all_works,
+    count_works,
     get_work,
     create_work,
     update_work,
-    delete_work
+    delete_work,
+    patch_work,
+    delete_works
 )
-from utils.utils import generate_swagger_model
+from utils.utils import generate_swagger_model, parse_if_match, version_etag, id_list
+from utils.fieldsets import marshal_with_fields, requested_fields
+from utils.idempotency import idempotent
+from errors.errors import VersionConflictError
 from models.work import Work
+from models.status import STATUSES, status_list
 
 # Initialize logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Namespace for Work
@@ -23,32 +29,62 @@ work_model = generate_swagger_model(
     api=works_ns,
     model=Work,
     exclude_fields=[],  # No excluded fields in this model
-    readonly_fields=["work_id"],  # Fields that cannot be modified
+    readonly_fields=["work_id", "version"],  # Fields that cannot be modified
 )
 
+# Parser for the IDs accepted by the bulk delete endpoint
+ids_parser = works_ns.parser()
+ids_parser.add_argument("ids", type=id_list, required=True, location="args", help="Comma-separated IDs of the works to delete")
+
+# Parser for the filters accepted by the list endpoints
+list_parser = works_ns.parser()
+list_parser.add_argument("status", type=status_list, location="args", help=f"Comma-separated statuses to filter on ({', '.join(STATUSES)})")
+
 @works_ns.route("/")
 class WorkList(Resource):
     """
     Handles operations on the collection of works.
-    Supports retrieving all works (GET) and creating new works (POST).
+    Supports retrieving all works (GET), counting them (HEAD), creating new works (POST) and deleting several works by ID (DELETE).
     """
 
     @works_ns.doc("get_all_works")
-    @works_ns.marshal_list_with(work_model)
+    @works_ns.expect(list_parser)
+    @marshal_with_fields(works_ns, work_model, as_list=True)
     def get(self):
         """
-        Retrieve all works.
+        Retrieve all works, optionally filtered by ?status.
         :return: List of all works.
         """
         try:
-            return get_all_works()
+            args = list_parser.parse_args()
+            works = get_all_works(requested_fields(work_model), args["status"])
+            return works, 200, {"X-Total-Count": len(works)}
         except HTTPException as http_err:
-            logger.error(f"HTTP error while retrieving works: {http_err}")
+            logger.error("HTTP error while retrieving works: %s", http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error retrieving works: {e}")
+            logger.error("Error retrieving works: %s", e)
             works_ns.abort(500, "An error occurred while retrieving the works.")
 
+    @works_ns.doc("count_works")
+    @works_ns.expect(list_parser)
+    @works_ns.response(200, "Success", headers={"X-Total-Count": "Number of works"})
+    def head(self):
+        """
+        Count the works without transferring them.
+        :return: Empty response with the number of works in the X-Total-Count header
+        """
+        try:
+            args = list_parser.parse_args()
+            return "", 200, {"X-Total-Count": count_works(args["status"])}
+        except HTTPException as http_err:
+            logger.error("HTTP error while counting works: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error counting works: %s", e)
+            works_ns.abort(500, "An error occurred while counting the works.")
+
+    @idempotent
     @works_ns.doc("create_work")
     @works_ns.expect(work_model, validate=True)
     @works_ns.marshal_with(work_model, code=201)
@@ -76,13 +112,34 @@ class WorkList(Resource):
                 vehicle_id=vehicle_id
             )
             return created_work, 201
+        except ValueError as ve:
+            works_ns.abort(400, str(ve))
         except HTTPException as http_err:
-            logger.error(f"HTTP error while creating an work: {http_err}")
+            logger.error("HTTP error while creating an work: %s", http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error creating an work: {e}")
+            logger.error("Error creating an work: %s", e)
             works_ns.abort(500, "An error occurred while creating the work.")
 
+    @works_ns.doc("delete_works")
+    @works_ns.expect(ids_parser)
+    @works_ns.response(200, "Number of deleted works")
+    @works_ns.response(400, "Invalid list of IDs")
+    def delete(self):
+        """
+        Delete several works by ID in a single statement.
+        :return: The number of deleted works
+        """
+        args = ids_parser.parse_args()
+        try:
+            return {"deleted": delete_works(args["ids"])}, 200
+        except HTTPException as http_err:
+            logger.error("HTTP error while deleting works: %s", http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error deleting works: %s", e)
+            works_ns.abort(500, "An error occurred while deleting the works.")
+
 @works_ns.route("/<int:work_id>")
 @works_ns.param("work_id", "The ID of the work")
 class Work(Resource):
@@ -92,7 +149,7 @@ class Work(Resource):
     """
 
     @works_ns.doc("get_work")
-    @works_ns.marshal_with(work_model)
+    @marshal_with_fields(works_ns, work_model)
     def get(self, work_id):
         """
         Retrieve an work by ID.
@@ -100,18 +157,19 @@ class Work(Resource):
         :return: The work with the specified ID.
         """
         try:
-            work = get_work(work_id)
+            work = get_work(work_id, requested_fields(work_model))
             if not work:
                 works_ns.abort(404, f"Work {work_id} not found.")
-            return work
+            return work, 200, {"ETag": version_etag(work["version"])}
         except HTTPException as http_err:
-            logger.error(f"HTTP error while retrieving work {work_id}: {http_err}")
+            logger.error("HTTP error while retrieving work %s: %s", work_id, http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error retrieving work {work_id}: {e}")
+            logger.error("Error retrieving work %s: %s", work_id, e)
             works_ns.abort(500, "An error occurred while retrieving the work.")
 
     @works_ns.doc("update_work")
+    @works_ns.response(412, "Work was modified since the If-Match version")
     @works_ns.expect(work_model, validate=True)
     @works_ns.marshal_with(work_model)
     def put(self, work_id):
@@ -128,15 +186,47 @@ class Work(Resource):
             start_date = data.get("start_date")
             status = data.get("status")
             vehicle_id = data.get("vehicle_id")
-            work = update_work(work_id, cost, description, end_date, start_date, status, vehicle_id)
+            work = update_work(work_id, cost, description, end_date, start_date, status, vehicle_id, parse_if_match())
+            if not work:
+                works_ns.abort(404, f"Work {work_id} not found.")
+            return work, 200, {"ETag": version_etag(work["version"])}
+        except ValueError as ve:
+            works_ns.abort(400, str(ve))
+        except VersionConflictError as conflict:
+            works_ns.abort(412, str(conflict))
+        except HTTPException as http_err:
+            logger.error("HTTP error while updating work %s: %s", work_id, http_err)
+            raise http_err
+        except Exception as e:
+            logger.error("Error updating work %s: %s", work_id, e)
+            works_ns.abort(500, "An error occurred while updating the work.")
+
+    @works_ns.doc("patch_work")
+    @works_ns.response(412, "Work was modified since the If-Match version")
+    @works_ns.response(400, "No updatable fields or invalid values")
+    @works_ns.expect(work_model, validate=True)
+    @works_ns.marshal_with(work_model)
+    def patch(self, work_id):
+        """
+        Partially update a work by ID.
+        Only the fields present in the payload are changed.
+        :param work_id: The ID of the work to update.
+        :return: The updated work.
+        """
+        try:
+            work = patch_work(work_id, works_ns.payload, parse_if_match())
             if not work:
                 works_ns.abort(404, f"Work {work_id} not found.")
-            return work
+            return work, 200, {"ETag": version_etag(work["version"])}
+        except ValueError as ve:
+            works_ns.abort(400, str(ve))
+        except VersionConflictError as conflict:
+            works_ns.abort(412, str(conflict))
         except HTTPException as http_err:
-            logger.error(f"HTTP error while updating work {work_id}: {http_err}")
+            logger.error("HTTP error while patching work %s: %s", work_id, http_err)
             raise http_err
         except Exception as e:
-            logger.error(f"Error updating work {work_id}: {e}")
+            logger.error("Error patching work %s: %s", work_id, e)
             works_ns.abort(500, "An error occurred while updating the work.")
 
     @works_ns.doc("delete_work")
@@ -153,5 +243,5 @@ class Work(Resource):
             result, status_code = delete_work(work_id)
             return result, status_code
         except Exception as e:
-            logger.error(f"Unexpected error deleting work {work_id}: {e}")
+            logger.error("Unexpected error deleting work %s: %s", work_id, e)
             works_ns.abort(500, "An unexpected error occurred.")
\ No newline at end of file
@@ -4,8 +4,14 @@ from sqlalchemy import false
 from api import api_bp  # Import the API blueprint
 from config import Config  # Import the configuration class
 from utils.database import db  # Import the SQLAlchemy database instance
-from utils.utils import configure_logging  # Import the logging configuration function
+from utils.logging_config import configure_logging  # Import the logging configuration function
 from errors.errors import register_error_handlers
+from cli import register_commands  # Import the flask command line commands
+from utils.cache import response_cache  # Import the list response cache
+from utils.events import event_hub  # Import the server-sent event hub
+from utils.rate_limit import rate_limiter  # Import the per-client rate limiter
+from utils.admission import admission_controller  # Import the concurrency limiter
+from utils.availability import availability_calendar  # Import the employee availability calendar
 
 
 def create_app():
@@ -18,24 +24,30 @@ def create_app():
     try:
         app = Flask(__name__)
         app.config.from_object(Config)  # Load configuration from the Config class
+        configure_logging(app)  # Queue log records to a background JSON writer, with request IDs
         register_error_handlers(app)  # Register error handlers for 404 and 500 errors
         db.init_app(app) # Initialize extensions (e.g., SQLAlchemy)
+        response_cache.init_app(app)  # Size the list response cache from the configuration
+        event_hub.init_app(app)  # Size the per-subscriber event queues from the configuration
+        rate_limiter.init_app(app)  # Throttle each client according to the configured limits
+        admission_controller.init_app(app)  # Bound concurrent reads and writes, after rate limiting
+        availability_calendar.init_app(app)  # Size the availability horizon from the configuration
         # Register blueprints (e.g., API routes)
         app.register_blueprint(api_bp)
+        register_commands(app)  # Register the maintenance commands (flask --app app <command>)
         return app
 
     except Exception as e:
         # Log the error and re-raise it to ensure it doesn't get silently ignored
         import logging
         logger = logging.getLogger(__name__)
-        logger.error(f"Error during app creation: {e}")
+        logger.error("Error during app creation: %s", e)
         raise
 
 
 if __name__ == "__main__":
     # Create the Flask application instance and run it in debug mode
     try:
-        #configure_logging()  # Configure the logging system
         app = create_app()
         app.run(debug=False)  # Running in debug mode for development
         #app.run(ERROR_INCLUDE_MESSAGE=False)
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import re
+from a2wsgi import WSGIMiddleware
+from flask_restx import marshal
+from starlette.responses import JSONResponse, StreamingResponse
+
+from app import create_app  # Import the Flask application factory
+from utils.database import REPLICA_BIND_KEY, db, wrote_recently
+from utils.utils import version_etag
+from utils.events import KEEPALIVE_MESSAGE, RESYNC_MESSAGE, event_hub
+from utils.rate_limit import TOO_MANY_REQUESTS, rate_limiter
+from utils.admission import OVERLOADED, admission_controller
+from services.async_read_service import get_all_async, get_async, make_async_sessionmaker
+from models.client import Client
+from models.employee import Employee
+from models.setting import Setting
+from models.invoice import Invoice
+from models.vehicle import Vehicle
+from models.work import Work
+from models.task import Task
+from models.invoice_item import InvoiceItem
+from api.client import client_model
+from api.employee import employee_model
+from api.setting import setting_model
+from api.invoice import invoice_model
+from api.vehicle import vehicle_model
+from api.work import work_model
+from api.task import task_model
+from api.invoice_item import invoice_item_model
+
+logger = logging.getLogger(__name__)
+
+# Resources whose GET endpoints are served asynchronously: path -> (SQLAlchemy model, Swagger model)
+RESOURCES = {
+    "client": (Client, client_model),
+    "employee": (Employee, employee_model),
+    "setting": (Setting, setting_model),
+    "invoice": (Invoice, invoice_model),
+    "vehicle": (Vehicle, vehicle_model),
+    "work": (Work, work_model),
+    "task": (Task, task_model),
+    "invoice_item": (InvoiceItem, invoice_item_model),
+}
+
+# Matches /api/<resource>/ and /api/<resource>/<id>
+READ_PATH = re.compile(r"^/api/(?P<resource>[a-z_]+)/(?P<id>\d+)?$")
+
+# Server-sent event stream, served from the event loop so that idle subscribers cost a coroutine
+EVENTS_PATHS = ("/api/events", "/api/events/")
+
+
+class AsyncReadApp:
+    """
+    ASGI application that serves the list and get endpoints with an async SQLAlchemy engine.
+    A request waiting on the database then costs a coroutine instead of a WSGI thread.
+    Every other request (writes, query options such as ?include_archived or ?fields, field masks
+    in the X-Fields header, documentation) is passed to the Flask application, which keeps the synchronous write path.
+    Reads go to the replica when one is configured, except within REPLICA_LAG_SECONDS of a write
+    by this process, as for the Flask services, so a client reading right after its write sees it.
+    """
+
+    def __init__(self, flask_app):
+        self.wsgi = WSGIMiddleware(flask_app)
+        self.replica_lag = flask_app.config["REPLICA_LAG_SECONDS"]
+        self.mask_header = flask_app.config["RESTX_MASK_HEADER"].lower().encode()
+        with flask_app.app_context():
+            # Reuse the URLs resolved by Flask-SQLAlchemy
+            self.sessionmaker = make_async_sessionmaker(db.engine.url)
+            replica = db.engines.get(REPLICA_BIND_KEY)
+            self.replica_sessionmaker = make_async_sessionmaker(replica.url) if replica else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] == "http" and scope["method"] == "GET" and scope["path"] in EVENTS_PATHS:
+            await self.events()(scope, receive, send)
+            return
+        match = READ_PATH.match(scope.get("path", "")) if scope["type"] == "http" else None
+        if (
+            match is None
+            or scope["method"] != "GET"
+            or scope["query_string"]
+            or match["resource"] not in RESOURCES
+            or any(name == self.mask_header for name, _ in scope["headers"])
+        ):
+            await self.wsgi(scope, receive, send)
+            return
+        # Requests answered here bypass Flask, so apply its rate limits and read budget too
+        retry_after = rate_limiter.limit(scope["path"], "GET", self.client_key(scope))
+        if retry_after is not None:
+            response = JSONResponse(TOO_MANY_REQUESTS, status_code=429, headers={"Retry-After": str(retry_after)})
+        else:
+            response = await self.admitted_read(match["resource"], match["id"], scope["path"])
+        await response(scope, receive, send)
+
+    async def admitted_read(self, resource, pk_value, path):
+        """
+        Answer a read within the read budget of the admission controller, or shed it with 503.
+        The budget waits on a thread lock, so a request that has to queue for a slot waits in a
+        worker thread rather than blocking the event loop.
+        """
+        kind = admission_controller.budget_for(path, "GET")
+        if kind is None:
+            return await self.read(resource, pk_value)
+        budget = admission_controller.budgets[kind]
+        if not budget.try_acquire() and not await asyncio.to_thread(budget.acquire, admission_controller.queue_timeout):
+            return JSONResponse(OVERLOADED, status_code=503, headers={"Retry-After": admission_controller.retry_after()})
+        try:
+            return await self.read(resource, pk_value)
+        finally:
+            budget.release()
+
+    @staticmethod
+    def client_key(scope):
+        """
+        Return the key the rate limiter identifies the client by: its IP address, as in Flask.
+        """
+        return scope["client"][0] if scope.get("client") else None
+
+    async def read(self, resource, pk_value):
+        """
+        Answer a list or get request for a resource.
+        :param resource: The resource name from the path
+        :param pk_value: The ID from the path, or None for the list endpoint
+        :return: The JSON response
+        """
+        model, swagger_model = RESOURCES[resource]
+        sessionmaker = self.sessionmaker
+        if self.replica_sessionmaker and not wrote_recently(self.replica_lag):
+            sessionmaker = self.replica_sessionmaker
+        try:
+            async with sessionmaker() as session:
+                if pk_value is None:
+                    rows = await get_all_async(session, model)
+                    # Same X-Total-Count as the Flask list endpoints
+                    return JSONResponse(marshal(rows, swagger_model), headers={"X-Total-Count": str(len(rows))})
+                row = await get_async(session, model, int(pk_value))
+        except Exception as e:
+            logger.error("Error retrieving %s %s: %s", resource, pk_value if pk_value is not None else "list", e)
+            return JSONResponse({"status": "error", "message": "An unexpected error occurred."}, status_code=500)
+        if row is None:
+            return JSONResponse({"message": f"{model.__name__} {pk_value} not found."}, status_code=404)
+        # Same ETag as the Flask endpoints for versioned resources
+        headers = {"ETag": version_etag(row["version"])} if "version" in row else None
+        return JSONResponse(marshal(row, swagger_model), headers=headers)
+
+    def events(self):
+        """
+        Stream task and work status changes as server-sent events.
+        The Flask services publish from the WSGI threads; the hub hands each message to this
+        subscriber through the event loop, and the stream ends when the client disconnects.
+        :return: The streaming response
+        """
+        async def generate():
+            subscription = event_hub.subscribe(loop=asyncio.get_running_loop())
+            try:
+                while True:
+                    try:
+                        message = await asyncio.wait_for(subscription.queue.get(), event_hub.keepalive)
+                    except asyncio.TimeoutError:
+                        yield KEEPALIVE_MESSAGE
+                        continue
+                    yield RESYNC_MESSAGE if subscription.take_overflow() else message
+            finally:
+                event_hub.unsubscribe(subscription)
+
+        return StreamingResponse(
+            generate(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def lifespan(self, receive, send):
+        """
+        Handle the ASGI lifespan protocol, closing the async engine on shutdown.
+        """
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.sessionmaker.kw["bind"].dispose()
+                if self.replica_sessionmaker:
+                    await self.replica_sessionmaker.kw["bind"].dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+# Create the ASGI application instance (run with: uvicorn asgi:app)
+app = AsyncReadApp(create_app())
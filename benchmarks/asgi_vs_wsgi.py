@@ -0,0 +1,43 @@
+"""
+Compare the throughput of the read endpoints under concurrent connections when served by
+the Flask development server (app.run) and by the async ASGI entry point (asgi.py).
+
+Usage: python -m benchmarks.asgi_vs_wsgi [--path /api/task/] [--requests 2000] [--concurrency 50]
+DATABASE_URI must point at the database to read from, as for app.py.
+"""
+import argparse
+
+from benchmarks.load import PYTHON, print_results, run_load, start_server, stop_server
+
+SERVERS = {
+    "flask app.run": (
+        [PYTHON, "-c", "from app import create_app; create_app().run(port=5101, threaded=True)"],
+        5101,
+    ),
+    "uvicorn asgi:app": (
+        [PYTHON, "-m", "uvicorn", "asgi:app", "--port", "5102", "--log-level", "warning"],
+        5102,
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default="/api/task/", help="GET endpoint to load")
+    parser.add_argument("--requests", type=int, default=2000, help="Total number of requests per server")
+    parser.add_argument("--concurrency", type=int, default=50, help="Number of concurrent connections")
+    args = parser.parse_args()
+
+    results = {}
+    for name, (command, port) in SERVERS.items():
+        process = start_server(command, port)
+        try:
+            run_load(port, args.path, min(100, args.requests), args.concurrency)  # Warm up
+            results[name] = run_load(port, args.path, args.requests, args.concurrency)
+        finally:
+            stop_server(process)
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Root of the repository, used as working directory of the benchmarked servers
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Interpreter used to run the benchmarked servers
+PYTHON = sys.executable
+
+
+def start_server(command, port, env=None, timeout=30):
+    """
+    Start a server process and wait until it accepts HTTP requests.
+
+    :param command: Command line of the server, as a list
+    :param port: Port the server listens on
+    :param env: Extra environment variables for the server
+    :param timeout: Seconds to wait for the server to come up
+    :return: The server process
+    """
+    process = subprocess.Popen(
+        command,
+        cwd=ROOT,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/api/docs")
+            connection.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server {' '.join(command)} did not start on port {port}")
+
+
+def stop_server(process):
+    """
+    Stop a server started with start_server.
+    """
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_load(port, path, requests, concurrency):
+    """
+    Send `requests` GET requests to `path` from `concurrency` concurrent connections.
+
+    :return: dict with the throughput in requests per second and latency percentiles in ms
+    """
+    per_worker = max(1, requests // concurrency)
+
+    def worker(_):
+        latencies = []
+        errors = 0
+        for _ in range(per_worker):
+            started = time.perf_counter()
+            try:
+                # New connection per request, as the development server does not keep connections alive
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+                connection.close()
+                if response.status >= 400:
+                    errors += 1
+            except OSError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for worker_latencies, _ in results for latency in worker_latencies)
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def print_results(results):
+    """
+    Print one line per benchmarked server.
+
+    :param results: dict of server name to the result of run_load
+    """
+    print(f"{'server':<24}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<24}{result['requests']:>10}{result['errors']:>8}"
+            f"{result['rps']:>10.1f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+        )
+
@@ -0,0 +1,84 @@
+import click
+from services.data_generator_service import generate_data
+from services.archive_service import archive_closed_rows, default_cutoff
+from services.backup_service import create_snapshot, restore_snapshot, snapshot_directory
+
+
+def register_commands(app):
+    """
+    Register the maintenance commands of the application with the `flask` command line.
+    Run them with `flask --app app <command>`.
+
+    :param app: The Flask application
+    """
+
+    @app.cli.command("generate-data")
+    @click.option("--clients", type=click.IntRange(0), default=1000, show_default=True, help="Number of clients.")
+    @click.option("--employees", type=click.IntRange(1), default=50, show_default=True, help="Number of employees.")
+    @click.option("--settings", type=click.IntRange(0), default=10, show_default=True, help="Number of settings.")
+    @click.option("--vehicles-per-client", type=click.IntRange(1), default=2, show_default=True, help="Average number of vehicles per client.")
+    @click.option("--works-per-vehicle", type=click.IntRange(1), default=3, show_default=True, help="Average number of works per vehicle.")
+    @click.option("--tasks-per-work", type=click.IntRange(1), default=4, show_default=True, help="Average number of tasks (and invoice items) per work.")
+    @click.option("--seed", type=int, default=0, show_default=True, help="Seed of the random generator; the same seed generates the same data.")
+    @click.option("--batch-size", type=click.IntRange(1), default=10000, show_default=True, help="Rows per insert statement.")
+    def generate_data_command(clients, employees, settings, vehicles_per_client, works_per_vehicle, tasks_per_work, seed, batch_size):
+        """
+        Generate realistic, referentially consistent data for every table.
+        With the defaults, 1000 clients give about 24000 tasks; scale --clients for millions.
+        """
+        result = generate_data(clients, employees, settings, vehicles_per_client, works_per_vehicle, tasks_per_work, seed, batch_size)
+        for table, rows in result["rows"].items():
+            click.echo(f"{table:<14} {rows:>12,}")
+        click.echo(f"Inserted {result['total']:,} rows in {result['duration_s']}s ({result['rows_per_second']:,} rows/s, seed {seed})")
+
+    @app.cli.command("archive")
+    @click.option("--before", type=click.DateTime(), default=None, help="Archive rows closed before this date. [default: ARCHIVE_AFTER_DAYS ago]")
+    @click.option("--chunk-size", type=click.IntRange(1), default=None, help="Invoices or tasks moved per transaction. [default: ARCHIVE_CHUNK_SIZE]")
+    def archive_command(before, chunk_size):
+        """
+        Move finalized invoices, their items and finished tasks closed before a cutoff to the archive tables.
+        """
+        cutoff = before or default_cutoff(app.config["ARCHIVE_AFTER_DAYS"])
+        result = archive_closed_rows(cutoff, chunk_size or app.config["ARCHIVE_CHUNK_SIZE"])
+        for table, rows in result["archived"].items():
+            click.echo(f"{table:<14} {rows:>12,}")
+        click.echo(f"Archived rows closed before {cutoff:%Y-%m-%d %H:%M} in {result['chunks']} chunks and {result['duration_ms']:.0f}ms")
+
+    @app.cli.command("backup")
+    @click.option("--directory", type=click.Path(file_okay=False), default=None, help="Directory of the snapshot. [default: BACKUP_DIR, or instance/backups]")
+    @click.option("--pages-per-step", type=click.IntRange(1), default=None, help="Pages copied per step. [default: BACKUP_PAGES_PER_STEP]")
+    @click.option("--step-sleep-ms", type=click.IntRange(0), default=None, help="Pause between steps, for writers to commit. [default: BACKUP_STEP_SLEEP_MS]")
+    @click.option("--max-restarts", type=click.IntRange(0), default=None, help="Restarts after which the copy is done in one step. [default: BACKUP_MAX_RESTARTS]")
+    def backup_command(directory, pages_per_step, step_sleep_ms, max_restarts):
+        """
+        Take a compressed, checksummed snapshot of the database while it is in use.
+        """
+        if max_restarts is None:
+            max_restarts = app.config["BACKUP_MAX_RESTARTS"]
+        result = create_snapshot(
+            directory or snapshot_directory(),
+            pages_per_step or app.config["BACKUP_PAGES_PER_STEP"],
+            app.config["BACKUP_STEP_SLEEP_MS"] if step_sleep_ms is None else step_sleep_ms,
+            max_restarts,
+        )
+        click.echo(f"Created {result['snapshot']} ({result['size']:,} bytes, sha256 {result['sha256']})")
+        click.echo(
+            f"Copied {result['pages']:,} pages in {result['steps']} steps and {result['duration_ms']:.0f}ms, "
+            f"{result['busy_steps']} busy steps, {result['restarts']} restarts; writers stalled {result['writer_stall_ms']:.0f}ms "
+            f"(longest {result['max_writer_stall_ms']:.0f}ms, journal mode {result['journal_mode']})"
+        )
+        if result["single_step"]:
+            click.echo(f"The copy restarted more than {max_restarts} times and was finished in a single step, blocking writers meanwhile")
+
+    @app.cli.command("restore")
+    @click.argument("snapshot", type=click.Path(exists=True, dir_okay=False))
+    @click.confirmation_option(prompt="This replaces the whole database with the snapshot. Stop the application first. Continue?")
+    def restore_command(snapshot):
+        """
+        Replace the database with a snapshot, after verifying its checksum and integrity.
+        """
+        try:
+            result = restore_snapshot(snapshot)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Restored {result['snapshot']} ({result['pages']:,} pages) in {result['duration_ms']:.0f}ms")
@@ -6,4 +6,34 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URI")
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Optional read-only replica for the get_* services, e.g. sqlite:///file:app.db?mode=ro&uri=true
+    READ_DATABASE_URI = os.getenv("READ_DATABASE_URI")
+    # Seconds after a write during which this process reads from the primary, to cover the replica lag
+    REPLICA_LAG_SECONDS = int(os.getenv("REPLICA_LAG_SECONDS", 5))
+    SQLALCHEMY_BINDS = {"replica": READ_DATABASE_URI} if READ_DATABASE_URI else {}
+    CLIENT_IMPORT_BATCH_SIZE = int(os.getenv("CLIENT_IMPORT_BATCH_SIZE", 1000))
+    IDEMPOTENCY_KEY_TTL = int(os.getenv("IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 256))
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 30))
+    IVA_UPDATE_CHUNK_SIZE = int(os.getenv("IVA_UPDATE_CHUNK_SIZE", 5000))
+    CHANGE_LOG_RETENTION = int(os.getenv("CHANGE_LOG_RETENTION", 30 * 24 * 60 * 60))
+    CHANGE_LOG_COMPACT_INTERVAL = int(os.getenv("CHANGE_LOG_COMPACT_INTERVAL", 60 * 60))
+    EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 100))
+    EVENT_KEEPALIVE = int(os.getenv("EVENT_KEEPALIVE", 15))
+    EVENT_MAX_THREAD_SUBSCRIBERS = int(os.getenv("EVENT_MAX_THREAD_SUBSCRIBERS", 2))  # Per process; streams served by asgi.py are not limited
+    RATE_LIMITS = os.getenv("RATE_LIMITS", "")  # e.g. "invoice_item:GET=100/60, *=1000/60", see utils.rate_limit
+    RATE_LIMIT_COMPACT_INTERVAL = int(os.getenv("RATE_LIMIT_COMPACT_INTERVAL", 60))
+    ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", 16))
+    ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", 4))
+    ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 32))
+    ADMISSION_QUEUE_TIMEOUT_MS = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", 1000))
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FILE = os.getenv("LOG_FILE", "")  # Empty logs to stderr
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 2 * 365))
+    ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", 1000))
+    BACKUP_DIR = os.getenv("BACKUP_DIR")  # Defaults to instance/backups
+    BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", 1024))
+    BACKUP_STEP_SLEEP_MS = int(os.getenv("BACKUP_STEP_SLEEP_MS", 10))
+    BACKUP_MAX_RESTARTS = int(os.getenv("BACKUP_MAX_RESTARTS", 10))
+    AVAILABILITY_HORIZON_DAYS = int(os.getenv("AVAILABILITY_HORIZON_DAYS", 180))
\ No newline at end of file
@@ -1,6 +1,23 @@
 from flask import jsonify
 from werkzeug.exceptions import HTTPException
 
+
+class VersionConflictError(Exception):
+    """
+    Raised when a conditional update targets a row whose version has changed.
+    """
+
+
+class CursorExpiredError(Exception):
+    """
+    Raised when a change log cursor is older than the retained history.
+    `cursor` is the latest change_id, from which a client can resume after a full resync.
+    """
+
+    def __init__(self, message, cursor):
+        super().__init__(message)
+        self.cursor = cursor
+
 def register_error_handlers(app):
     """
     Register custom error handlers for the Flask application.
@@ -0,0 +1,46 @@
+# Gunicorn configuration for production (run with: gunicorn -c gunicorn.conf.py)
+# Every setting can be overridden with the environment variable named next to it.
+import multiprocessing
+import os
+
+# WSGI application to serve
+wsgi_app = "wsgi:app"
+
+# Address to listen on (GUNICORN_BIND)
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# Number of worker processes (GUNICORN_WORKERS), by default two per CPU plus one
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+# Threads per worker (GUNICORN_THREADS); more than one uses the gthread worker
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+# Seconds a worker may take on a request before it is killed and restarted (GUNICORN_TIMEOUT)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+
+# Seconds workers get to finish in-flight requests on restart or shutdown (GUNICORN_GRACEFUL_TIMEOUT).
+# Send SIGHUP to the master process for a graceful restart of all workers.
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+
+# Restart a worker after this many requests, with jitter, to bound memory growth (GUNICORN_MAX_REQUESTS, 0 disables)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+# Load the application once in the master, so workers share the imported modules and
+# the precomputed Swagger models and specification copy-on-write
+preload_app = True
+
+
+def post_fork(server, worker):
+    """
+    Give each worker its own connection pools.
+    Connections opened in the master before the fork must not be shared between processes,
+    so the inherited pools are discarded without closing the parent's connections.
+    """
+    from wsgi import app
+    from utils.database import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    server.log.info(f"Worker {worker.pid} initialized its database pools")
@@ -0,0 +1,35 @@
+from utils.database import db
+
+
+# Model definition for the 'Change_log' table
+class ChangeLog(db.Model):
+    """
+    Represents one insert, update or delete of a row of the eight API tables.
+    Rows are appended by AFTER INSERT/UPDATE/DELETE triggers (see scripts.sql), so an entry is
+    committed in the same transaction as the change it records, whichever code path made it.
+
+    Attributes:
+        change_id (int): Primary key and sync cursor. AUTOINCREMENT, so IDs follow commit order and are never reused.
+        table_name (str): Name of the changed table.
+        row_id (int): Primary key of the changed row.
+        operation (str): 'I' for insert, 'U' for update, 'D' for delete.
+        changed_at (int): Unix timestamp of the change, used for retention.
+    """
+
+    __table_args__ = (
+        db.Index("ix_change_log_table_name_row_id", "table_name", "row_id"),  # Used by compaction
+        {"sqlite_autoincrement": True},
+    )
+
+    change_id = db.Column(db.Integer, primary_key=True)  # Monotonic sync cursor
+    table_name = db.Column(db.String(64), nullable=False)  # Changed table
+    row_id = db.Column(db.Integer, nullable=False)  # Primary key of the changed row
+    operation = db.Column(db.String(1), nullable=False)  # I, U or D
+    changed_at = db.Column(db.Integer, nullable=False, index=True)  # Unix timestamp, set by the database
+
+    def __repr__(self):
+        """
+        String representation of the ChangeLog object.
+        Useful for debugging and logging purposes.
+        """
+        return f"<ChangeLog {self.change_id} {self.operation} {self.table_name} {self.row_id}>"
@@ -0,0 +1,23 @@
+from utils.database import db
+
+
+# Model definition for the 'Change_log_horizon' table
+class ChangeLogHorizon(db.Model):
+    """
+    Single row holding the highest change_id removed from the change log by expiry.
+    A sync cursor below it may have missed deletes and needs a full resync.
+
+    Attributes:
+        horizon_id (int): Always 1.
+        change_id (int): Highest expired change_id, 0 if nothing has expired.
+    """
+
+    horizon_id = db.Column(db.Integer, primary_key=True)  # Always 1
+    change_id = db.Column(db.Integer, nullable=False, default=0)  # Highest expired change_id
+
+    def __repr__(self):
+        """
+        String representation of the ChangeLogHorizon object.
+        Useful for debugging and logging purposes.
+        """
+        return f"<ChangeLogHorizon {self.change_id}>"
@@ -0,0 +1,28 @@
+from utils.database import db
+
+
+# Model definition for the 'Idempotency_key' table
+class IdempotencyKey(db.Model):
+    """
+    Represents a stored response for a request sent with an Idempotency-Key header.
+
+    Attributes:
+        key (str): The value of the Idempotency-Key header. Primary key, so lookups are a single indexed read.
+        request_hash (str): SHA-256 of the method, path and body of the original request.
+        status_code (int): HTTP status of the stored response. Null while the original request is in progress.
+        response_body (str): JSON body of the stored response.
+        expires_at (int): Unix timestamp after which the key can be reused.
+    """
+
+    key = db.Column(db.String(255), primary_key=True)  # Client-supplied idempotency key
+    request_hash = db.Column(db.String(64), nullable=False)  # Fingerprint of the original request
+    status_code = db.Column(db.Integer)  # Status of the stored response
+    response_body = db.Column(db.Text)  # Stored response, replayed on retries
+    expires_at = db.Column(db.Integer, nullable=False, index=True)  # Expiry as a Unix timestamp
+
+    def __repr__(self):
+        """
+        String representation of the IdempotencyKey object.
+        Useful for debugging and logging purposes.
+        """
+        return f"<IdempotencyKey {self.key} ({self.status_code})>"
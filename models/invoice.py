@@ -16,14 +16,21 @@ class Invoice(db.Model):
         iva (float): The IVA (tax) applied to the invoice.
         total (float): The total amount of the invoice before IVA.
         total_with_iva (float): The total amount of the invoice after adding IVA.
+        finalized (bool): Whether the invoice is closed; finalized invoices keep their IVA when the rate changes.
+        version (int): Row version, incremented on every update.
     """
 
     invoice_id = db.Column(db.Integer, primary_key=True)  # Unique identifier for each invoice
-    client_id = db.Column(db.Integer, ForeignKey('client.client_id'), nullable=False)  # Foreign key to 'client'
+    client_id = db.Column(db.Integer, ForeignKey('client.client_id'), nullable=False, index=True)  # Foreign key to 'client'
     issued_at = db.Column(db.DateTime, server_default=db.func.now())  # Timestamp of invoice issuance
     iva = db.Column(db.Float, nullable=False)  # IVA percentage or value
     total = db.Column(db.Float, nullable=False)  # Total amount before IVA
     total_with_iva = db.Column(db.Float, nullable=False)  # Total amount after IVA
+    finalized = db.Column(db.Boolean, nullable=False, default=False, server_default="0")  # Closed invoices are not re-taxed
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")  # Row version for optimistic locking
+
+    # IDs are never reused, so new invoices cannot take the ID of an archived one
+    __table_args__ = {"sqlite_autoincrement": True}
     relationship('Client', back_populates='invoices')  # Relationship with the 'Client' model
 
     def __repr__(self):
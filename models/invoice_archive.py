@@ -0,0 +1,30 @@
+from utils.database import db
+
+
+# Model definition for the 'Invoice_archive' table
+class InvoiceArchive(db.Model):
+    """
+    Represents an archived invoice: a finalized invoice moved out of the invoice table
+    by services.archive_service. It has the columns of Invoice, without foreign keys,
+    as archived rows outlive the rows they referenced.
+
+    Attributes:
+        archived_at (datetime): Timestamp when the invoice was archived.
+    """
+
+    invoice_id = db.Column(db.Integer, primary_key=True)  # ID the invoice had in the invoice table
+    client_id = db.Column(db.Integer, nullable=False)  # Client the invoice was issued to
+    issued_at = db.Column(db.DateTime)  # Timestamp of invoice issuance
+    iva = db.Column(db.Float, nullable=False)  # IVA percentage or value
+    total = db.Column(db.Float, nullable=False)  # Total amount before IVA
+    total_with_iva = db.Column(db.Float, nullable=False)  # Total amount after IVA
+    finalized = db.Column(db.Boolean, nullable=False)  # Always true, only closed invoices are archived
+    version = db.Column(db.Integer, nullable=False)  # Row version when the invoice was archived
+    archived_at = db.Column(db.DateTime, server_default=db.func.now())  # Timestamp of archival
+
+    def __repr__(self):
+        """
+        String representation of the InvoiceArchive object.
+        Useful for debugging and logging purposes.
+        """
+        return f"<InvoiceArchive {self.invoice_id} issued to Client {self.client_id} at {self.issued_at}>"
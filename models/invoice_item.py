@@ -14,8 +14,11 @@ class InvoiceItem(db.Model):
     item_id = db.Column(db.Integer, primary_key=True)  # Unique identifier for each invoice_item
     cost = db.Column(db.Float, nullable=False)
     description = db.Column(db.String(200), nullable=False)
-    invoice_id = db.Column(db.Integer, ForeignKey('invoice.invoice_id'), nullable=False)
-    task_id = db.Column(db.Integer, ForeignKey('task.task_id'), nullable=False)
+    invoice_id = db.Column(db.Integer, ForeignKey('invoice.invoice_id'), nullable=False, index=True)
+    task_id = db.Column(db.Integer, ForeignKey('task.task_id'), nullable=False, index=True)
+
+    # IDs are never reused, so new items cannot take the ID of an archived one
+    __table_args__ = {"sqlite_autoincrement": True}
 
     relationship('Invoice', back_populates='invoice_items')
     relationship('Task', back_populates='invoice_items')
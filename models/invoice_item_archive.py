@@ -0,0 +1,24 @@
+from utils.database import db
+
+
+# Model definition for the 'Invoice_item_archive' table
+class InvoiceItemArchive(db.Model):
+    """
+    Represents an archived invoice_item, moved out of the invoice_item table together with its invoice.
+    It has the columns of InvoiceItem, without foreign keys.
+
+    """
+
+    item_id = db.Column(db.Integer, primary_key=True)  # ID the item had in the invoice_item table
+    cost = db.Column(db.Float, nullable=False)
+    description = db.Column(db.String(200), nullable=False)
+    invoice_id = db.Column(db.Integer, nullable=False, index=True)  # Archived invoice of the item
+    task_id = db.Column(db.Integer, nullable=False)
+    archived_at = db.Column(db.DateTime, server_default=db.func.now())  # Timestamp of archival
+
+    def __repr__(self):
+        """
+        String representation of the InvoiceItemArchive object.
+        Useful for debugging and logging purposes.
+        """
+        return f"<InvoiceItemArchive {self.item_id}, Cost: {self.cost}, Invoice ID: {self.invoice_id}, Task ID: {self.task_id}>"
@@ -0,0 +1,22 @@
+from utils.database import db
+
+
+# Model definition for the 'Row_count' table
+class RowCount(db.Model):
+    """
+    Represents the number of rows of one table, kept current by AFTER INSERT and AFTER DELETE triggers.
+
+    Attributes:
+        table_name (str): Name of the counted table. Primary key, so reading a count is a single indexed lookup.
+        row_count (int): Number of rows currently in the table.
+    """
+
+    table_name = db.Column(db.String(64), primary_key=True)  # Name of the counted table
+    row_count = db.Column(db.Integer, nullable=False, default=0)  # Maintained by the trg_<table>_count_* triggers
+
+    def __repr__(self):
+        """
+        String representation of the RowCount object.
+        Useful for debugging and logging purposes.
+        """
+        return f"<RowCount {self.table_name}: {self.row_count}>"
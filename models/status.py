@@ -0,0 +1,61 @@
+from sqlalchemy import Integer
+from sqlalchemy.types import TypeDecorator
+
+
+# Statuses shared by tasks and works; the position of each name is the integer stored in the database
+STATUSES = ("pending", "in_progress", "completed", "cancelled")
+STATUS_CODES = {name: code for code, name in enumerate(STATUSES)}
+
+
+class StatusType(TypeDecorator):
+    """
+    Stores a status name as its small integer code, so status columns are compact and
+    cheap to index, while the models and the API keep working with the names.
+    """
+
+    impl = Integer
+    cache_ok = True
+    enums = STATUSES  # Read by generate_swagger_model to document the allowed values
+
+    def process_bind_param(self, value, dialect):
+        """
+        Convert a status name to its code before it is written or compared.
+        """
+        if value is None:
+            return None
+        return STATUS_CODES[validate_status(value)]
+
+    def process_result_value(self, value, dialect):
+        """
+        Convert a stored code back to its status name.
+        """
+        return None if value is None else STATUSES[value]
+
+
+def validate_status(status):
+    """
+    Check that a status is one of STATUSES.
+
+    :param status: The status name, or None
+    :return: The status unchanged
+    :raises ValueError: If the status is not a known status name
+    """
+    if status is not None and status not in STATUS_CODES:
+        raise ValueError(f"Invalid status '{status}'. Valid statuses are: {', '.join(STATUSES)}.")
+    return status
+
+
+def status_list(value):
+    """
+    Parse a comma-separated list of statuses, for use as a request parser type.
+
+    :param value: The raw query string value, e.g. "pending,in_progress"
+    :return: List of unique status names, in the order given
+    :raises ValueError: If a status is unknown or none is given
+    """
+    statuses = list(dict.fromkeys(part.strip() for part in value.split(",") if part.strip()))
+    if not statuses:
+        raise ValueError("At least one status is required.")
+    for status in statuses:
+        validate_status(status)
+    return statuses
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import relationship
 from utils.database import db
+from models.status import StatusType
 from sqlalchemy import ForeignKey
 from datetime import datetime
 
@@ -18,16 +19,26 @@ class Task(db.Model):
         end_date (date): The date when the task ends.
         status (str): The status of the task.
         work_id (int): Foreign key referencing the work table.
+        version (int): Row version, incremented on every update.
     """
 
     task_id = db.Column(db.Integer, primary_key=True)  # Unique identifier for each task
     description = db.Column(db.Text, nullable=False)  # Task description
-    employee_id = db.Column(db.Integer, ForeignKey('employee.employee_id'), nullable=False)  # Foreign key to 'employee'
+    employee_id = db.Column(db.Integer, ForeignKey('employee.employee_id'), nullable=False, index=True)  # Foreign key to 'employee'
     start_date = db.Column(db.Date, nullable=False)  # Task start date
     end_date = db.Column(db.Date)  # Task end date
-    status = db.Column(db.Text)  # Task status
-    work_id = db.Column(db.Integer, ForeignKey('work.work_id'), nullable=False)  # Foreign key to 'work'
+    status = db.Column(StatusType, server_default="0")  # Task status, one of models.status.STATUSES stored as its code
+    work_id = db.Column(db.Integer, ForeignKey('work.work_id'), nullable=False, index=True)  # Foreign key to 'work'
     created_at = db.Column(db.DateTime, server_default=db.func.now())  # Timestamp of task creation
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")  # Row version for optimistic locking
+
+    # Status-filtered queries ("open tasks of an employee", "overdue tasks") are index range scans.
+    # IDs are never reused, so new tasks cannot take the ID of an archived one
+    __table_args__ = (
+        db.Index('ix_task_status_employee_id', 'status', 'employee_id'),
+        db.Index('ix_task_status_end_date', 'status', 'end_date'),
+        {"sqlite_autoincrement": True},
+    )
 
     # Relationships with other models (example)
 
@@ -0,0 +1,31 @@
+from utils.database import db
+from models.status import StatusType
+
+
+# Model definition for the 'Task_archive' table
+class TaskArchive(db.Model):
+    """
+    Represents an archived task: a completed or cancelled task moved out of the task table
+    by services.archive_service. It has the columns of Task, without foreign keys.
+
+    Attributes:
+        archived_at (datetime): Timestamp when the task was archived.
+    """
+
+    task_id = db.Column(db.Integer, primary_key=True)  # ID the task had in the task table
+    description = db.Column(db.Text, nullable=False)  # Task description
+    employee_id = db.Column(db.Integer, nullable=False)  # Employee who did the task
+    start_date = db.Column(db.Date, nullable=False)  # Task start date
+    end_date = db.Column(db.Date)  # Task end date
+    status = db.Column(StatusType)  # Final status of the task, "completed" or "cancelled"
+    work_id = db.Column(db.Integer, nullable=False)  # Work the task belonged to
+    created_at = db.Column(db.DateTime)  # Timestamp of task creation
+    version = db.Column(db.Integer, nullable=False)  # Row version when the task was archived
+    archived_at = db.Column(db.DateTime, server_default=db.func.now())  # Timestamp of archival
+
+    def __repr__(self):
+        """
+        String representation of the TaskArchive object.
+        Useful for debugging and logging purposes.
+        """
+        return f"<TaskArchive {self.task_id}: {self.description} (Status: {self.status})>"
@@ -21,7 +21,7 @@ class Vehicle(db.Model):
     # Define columns for the table
     vehicle_id = db.Column(db.Integer, primary_key=True)  # Unique identifier for each vehicle
     brand = db.Column(db.String(80), nullable=False)
-    client_id = db.Column(db.Integer, ForeignKey('client.client_id'), nullable=False)
+    client_id = db.Column(db.Integer, ForeignKey('client.client_id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now())  # Auto-generated timestamp
     license_plate = db.Column(db.String(30), nullable=False)
     model = db.Column(db.String(80), nullable=False)
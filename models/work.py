@@ -1,5 +1,6 @@
 from sqlalchemy.orm import relationship
 from utils.database import db
+from models.status import StatusType
 from sqlalchemy import ForeignKey
 from datetime import datetime
 
@@ -17,8 +18,10 @@ class Work(db.Model):
     description = db.Column(db.String(200), nullable=False)
     end_date = db.Column(db.Date, nullable=False)
     start_date = db.Column(db.Date, nullable=False)
-    status = db.Column(db.String(50))
-    vehicle_id = db.Column(db.Integer, ForeignKey('vehicle.vehicle_id'), nullable=False)  # Foreign key to 'vehicle'
+    status = db.Column(StatusType, server_default="0")  # One of models.status.STATUSES, stored as its code
+    vehicle_id = db.Column(db.Integer, ForeignKey('vehicle.vehicle_id'), nullable=False, index=True)  # Foreign key to 'vehicle'
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")  # Row version for optimistic locking
+    __table_args__ = (db.Index('ix_work_status_end_date', 'status', 'end_date'),)  # Status-filtered scans
     relationship('Vehicle', back_populates='works')  # Relationship with the 'Vehicle' model
 
     def __repr__(self):
@@ -35,3 +35,341 @@ INSERT INTO employee (name, email, phone, role, hired_date) VALUES
 ('Pedro Martins', 'pedro.martins@example.com', '912345678', 'mechanic', '2024-02-20'),
 ('Tiago Almeida', 'tiago.almeida@example.com', '913456789', 'mechanic', '2024-03-10'),
 ('Sofia Lopes', 'sofia.lopes@example.com', '914567890', 'admin', '2021-11-01');
+
+
+
+-- Índice único no nome do cliente (necessário para o upsert da importação CSV)
+CREATE UNIQUE INDEX IF NOT EXISTS ix_client_name ON client (name);
+
+-- Chaves de idempotência dos pedidos POST
+CREATE TABLE idempotency_key (
+    key TEXT PRIMARY KEY,
+    request_hash TEXT NOT NULL,
+    status_code INTEGER,
+    response_body TEXT,
+    expires_at INTEGER NOT NULL
+);
+CREATE INDEX ix_idempotency_key_expires_at ON idempotency_key (expires_at);
+
+
+-- Versão das linhas para controlo de concorrência otimista (If-Match)
+ALTER TABLE task ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE work ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE invoice ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+
+-- Contagem de linhas por tabela, mantida por triggers (HEAD e X-Total-Count sem COUNT(*))
+CREATE TABLE row_count (
+    table_name TEXT PRIMARY KEY,
+    row_count INTEGER NOT NULL DEFAULT 0
+);
+INSERT INTO row_count (table_name, row_count)
+SELECT 'client', COUNT(*) FROM client
+UNION ALL SELECT 'employee', COUNT(*) FROM employee
+UNION ALL SELECT 'vehicle', COUNT(*) FROM vehicle
+UNION ALL SELECT 'work', COUNT(*) FROM work
+UNION ALL SELECT 'task', COUNT(*) FROM task
+UNION ALL SELECT 'invoice', COUNT(*) FROM invoice
+UNION ALL SELECT 'invoice_item', COUNT(*) FROM invoice_item
+UNION ALL SELECT 'setting', COUNT(*) FROM setting;
+CREATE TRIGGER trg_client_count_insert AFTER INSERT ON client
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'client'; END;
+CREATE TRIGGER trg_client_count_delete AFTER DELETE ON client
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'client'; END;
+CREATE TRIGGER trg_employee_count_insert AFTER INSERT ON employee
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'employee'; END;
+CREATE TRIGGER trg_employee_count_delete AFTER DELETE ON employee
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'employee'; END;
+CREATE TRIGGER trg_vehicle_count_insert AFTER INSERT ON vehicle
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'vehicle'; END;
+CREATE TRIGGER trg_vehicle_count_delete AFTER DELETE ON vehicle
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'vehicle'; END;
+CREATE TRIGGER trg_work_count_insert AFTER INSERT ON work
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'work'; END;
+CREATE TRIGGER trg_work_count_delete AFTER DELETE ON work
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'work'; END;
+CREATE TRIGGER trg_task_count_insert AFTER INSERT ON task
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'task'; END;
+CREATE TRIGGER trg_task_count_delete AFTER DELETE ON task
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'task'; END;
+CREATE TRIGGER trg_invoice_count_insert AFTER INSERT ON invoice
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'invoice'; END;
+CREATE TRIGGER trg_invoice_count_delete AFTER DELETE ON invoice
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'invoice'; END;
+CREATE TRIGGER trg_invoice_item_count_insert AFTER INSERT ON invoice_item
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'invoice_item'; END;
+CREATE TRIGGER trg_invoice_item_count_delete AFTER DELETE ON invoice_item
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'invoice_item'; END;
+CREATE TRIGGER trg_setting_count_insert AFTER INSERT ON setting
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'setting'; END;
+CREATE TRIGGER trg_setting_count_delete AFTER DELETE ON setting
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'setting'; END;
+
+-- Índices nas chaves estrangeiras (histórico do veículo e eliminações em cascata)
+CREATE INDEX ix_vehicle_client_id ON vehicle (client_id);
+CREATE INDEX ix_work_vehicle_id ON work (vehicle_id);
+CREATE INDEX ix_task_work_id ON task (work_id);
+CREATE INDEX ix_task_employee_id ON task (employee_id);
+CREATE INDEX ix_invoice_client_id ON invoice (client_id);
+CREATE INDEX ix_invoice_item_invoice_id ON invoice_item (invoice_id);
+CREATE INDEX ix_invoice_item_task_id ON invoice_item (task_id);
+
+-- Estado das tarefas e trabalhos guardado como inteiro (0 pending, 1 in_progress, 2 completed, 3 cancelled)
+-- O SQLite não altera o tipo de uma coluna, por isso as tabelas são reconstruídas
+PRAGMA foreign_keys = OFF;  -- Para o DROP TABLE não apagar em cascata as linhas dependentes
+
+CREATE TABLE work_new (
+    work_id INTEGER PRIMARY KEY,
+    vehicle_id INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    status INTEGER CHECK (status BETWEEN 0 AND 3) DEFAULT 0,
+    cost REAL,
+    start_date DATE NOT NULL,
+    end_date DATE,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+    version INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (vehicle_id) REFERENCES vehicle(vehicle_id) ON DELETE CASCADE
+);
+INSERT INTO work_new (work_id, vehicle_id, description, status, cost, start_date, end_date, created_at, version)
+SELECT work_id, vehicle_id, description,
+       CASE status WHEN 'pending' THEN 0 WHEN 'in_progress' THEN 1 WHEN 'completed' THEN 2 WHEN 'cancelled' THEN 3 END,
+       cost, start_date, end_date, created_at, version
+FROM work;
+DROP TABLE work;
+ALTER TABLE work_new RENAME TO work;
+CREATE INDEX ix_work_vehicle_id ON work (vehicle_id);
+CREATE INDEX ix_work_status_end_date ON work (status, end_date);
+CREATE TRIGGER trg_work_count_insert AFTER INSERT ON work
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'work'; END;
+CREATE TRIGGER trg_work_count_delete AFTER DELETE ON work
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'work'; END;
+
+CREATE TABLE task_new (
+    task_id INTEGER PRIMARY KEY,
+    work_id INTEGER NOT NULL,
+    employee_id INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    status INTEGER CHECK (status BETWEEN 0 AND 3) DEFAULT 0,
+    start_date DATE NOT NULL,
+    end_date DATE,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+    version INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (work_id) REFERENCES work(work_id) ON DELETE CASCADE,
+    FOREIGN KEY (employee_id) REFERENCES employee(employee_id) ON DELETE SET NULL
+);
+INSERT INTO task_new (task_id, work_id, employee_id, description, status, start_date, end_date, created_at, version)
+SELECT task_id, work_id, employee_id, description,
+       CASE status WHEN 'pending' THEN 0 WHEN 'in_progress' THEN 1 WHEN 'completed' THEN 2 WHEN 'cancelled' THEN 3 END,
+       start_date, end_date, created_at, version
+FROM task;
+DROP TABLE task;
+ALTER TABLE task_new RENAME TO task;
+CREATE INDEX ix_task_work_id ON task (work_id);
+CREATE INDEX ix_task_employee_id ON task (employee_id);
+CREATE INDEX ix_task_status_employee_id ON task (status, employee_id);
+CREATE INDEX ix_task_status_end_date ON task (status, end_date);
+CREATE TRIGGER trg_task_count_insert AFTER INSERT ON task
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'task'; END;
+CREATE TRIGGER trg_task_count_delete AFTER DELETE ON task
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'task'; END;
+
+-- Faturas fechadas não são recalculadas quando a taxa de IVA muda
+ALTER TABLE invoice ADD COLUMN finalized BOOLEAN NOT NULL DEFAULT 0;
+-- As faturas existentes já foram emitidas e ficam fechadas; só as criadas a partir daqui começam abertas
+UPDATE invoice SET finalized = 1;
+
+-- Registo de alterações para a sincronização incremental (GET /api/changes)
+-- Escrito por triggers, na mesma transação que a alteração; AUTOINCREMENT garante que os cursores nunca são reutilizados
+CREATE TABLE change_log (
+    change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    operation TEXT NOT NULL CHECK (operation IN ('I', 'U', 'D')),
+    changed_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+);
+CREATE INDEX ix_change_log_table_name_row_id ON change_log (table_name, row_id);
+CREATE INDEX ix_change_log_changed_at ON change_log (changed_at);
+-- Último change_id removido por expiração; cursores anteriores exigem uma ressincronização completa
+CREATE TABLE change_log_horizon (
+    horizon_id INTEGER PRIMARY KEY CHECK (horizon_id = 1),
+    change_id INTEGER NOT NULL
+);
+INSERT INTO change_log_horizon (horizon_id, change_id) VALUES (1, 0);
+CREATE TRIGGER trg_client_log_insert AFTER INSERT ON client
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('client', NEW.client_id, 'I'); END;
+CREATE TRIGGER trg_client_log_update AFTER UPDATE ON client
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('client', NEW.client_id, 'U'); END;
+CREATE TRIGGER trg_client_log_delete AFTER DELETE ON client
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('client', OLD.client_id, 'D'); END;
+CREATE TRIGGER trg_employee_log_insert AFTER INSERT ON employee
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('employee', NEW.employee_id, 'I'); END;
+CREATE TRIGGER trg_employee_log_update AFTER UPDATE ON employee
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('employee', NEW.employee_id, 'U'); END;
+CREATE TRIGGER trg_employee_log_delete AFTER DELETE ON employee
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('employee', OLD.employee_id, 'D'); END;
+CREATE TRIGGER trg_vehicle_log_insert AFTER INSERT ON vehicle
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('vehicle', NEW.vehicle_id, 'I'); END;
+CREATE TRIGGER trg_vehicle_log_update AFTER UPDATE ON vehicle
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('vehicle', NEW.vehicle_id, 'U'); END;
+CREATE TRIGGER trg_vehicle_log_delete AFTER DELETE ON vehicle
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('vehicle', OLD.vehicle_id, 'D'); END;
+CREATE TRIGGER trg_work_log_insert AFTER INSERT ON work
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('work', NEW.work_id, 'I'); END;
+CREATE TRIGGER trg_work_log_update AFTER UPDATE ON work
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('work', NEW.work_id, 'U'); END;
+CREATE TRIGGER trg_work_log_delete AFTER DELETE ON work
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('work', OLD.work_id, 'D'); END;
+CREATE TRIGGER trg_task_log_insert AFTER INSERT ON task
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('task', NEW.task_id, 'I'); END;
+CREATE TRIGGER trg_task_log_update AFTER UPDATE ON task
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('task', NEW.task_id, 'U'); END;
+CREATE TRIGGER trg_task_log_delete AFTER DELETE ON task
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('task', OLD.task_id, 'D'); END;
+CREATE TRIGGER trg_invoice_log_insert AFTER INSERT ON invoice
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice', NEW.invoice_id, 'I'); END;
+CREATE TRIGGER trg_invoice_log_update AFTER UPDATE ON invoice
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice', NEW.invoice_id, 'U'); END;
+CREATE TRIGGER trg_invoice_log_delete AFTER DELETE ON invoice
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice', OLD.invoice_id, 'D'); END;
+CREATE TRIGGER trg_invoice_item_log_insert AFTER INSERT ON invoice_item
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice_item', NEW.item_id, 'I'); END;
+CREATE TRIGGER trg_invoice_item_log_update AFTER UPDATE ON invoice_item
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice_item', NEW.item_id, 'U'); END;
+CREATE TRIGGER trg_invoice_item_log_delete AFTER DELETE ON invoice_item
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice_item', OLD.item_id, 'D'); END;
+CREATE TRIGGER trg_setting_log_insert AFTER INSERT ON setting
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('setting', NEW.setting_id, 'I'); END;
+CREATE TRIGGER trg_setting_log_update AFTER UPDATE ON setting
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('setting', NEW.setting_id, 'U'); END;
+CREATE TRIGGER trg_setting_log_delete AFTER DELETE ON setting
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('setting', OLD.setting_id, 'D'); END;
+
+-- Arquivo de faturas fechadas, das suas linhas e de tarefas terminadas (flask --app app archive)
+-- As linhas são movidas com o mesmo ID e lidas quando não existem nas tabelas principais; sem chaves estrangeiras
+CREATE TABLE invoice_archive (
+    invoice_id INTEGER PRIMARY KEY,
+    client_id INTEGER NOT NULL,
+    total REAL NOT NULL,
+    iva REAL NOT NULL,
+    total_with_iva REAL NOT NULL,
+    issued_at DATETIME,
+    version INTEGER NOT NULL,
+    finalized BOOLEAN NOT NULL,
+    archived_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+
+CREATE TABLE invoice_item_archive (
+    item_id INTEGER PRIMARY KEY,
+    invoice_id INTEGER NOT NULL,
+    task_id INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    cost REAL NOT NULL,
+    archived_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_invoice_item_archive_invoice_id ON invoice_item_archive (invoice_id);
+
+CREATE TABLE task_archive (
+    task_id INTEGER PRIMARY KEY,
+    work_id INTEGER NOT NULL,
+    employee_id INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    status INTEGER,
+    start_date DATE NOT NULL,
+    end_date DATE,
+    created_at DATETIME,
+    version INTEGER NOT NULL,
+    archived_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+
+-- IDs de faturas, linhas e tarefas nunca reutilizados, para não colidirem com os do arquivo
+-- Sem AUTOINCREMENT o SQLite reutiliza o maior ID depois de a última linha ser apagada; as tabelas são reconstruídas
+PRAGMA foreign_keys = OFF;  -- Para o DROP TABLE não apagar em cascata as linhas dependentes
+
+CREATE TABLE task_new (
+    task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    work_id INTEGER NOT NULL,
+    employee_id INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    status INTEGER CHECK (status BETWEEN 0 AND 3) DEFAULT 0,
+    start_date DATE NOT NULL,
+    end_date DATE,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+    version INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (work_id) REFERENCES work(work_id) ON DELETE CASCADE,
+    FOREIGN KEY (employee_id) REFERENCES employee(employee_id) ON DELETE SET NULL
+);
+INSERT INTO task_new SELECT task_id, work_id, employee_id, description, status, start_date, end_date, created_at, version FROM task;
+DROP TABLE task;
+ALTER TABLE task_new RENAME TO task;
+CREATE INDEX ix_task_work_id ON task (work_id);
+CREATE INDEX ix_task_employee_id ON task (employee_id);
+CREATE INDEX ix_task_status_employee_id ON task (status, employee_id);
+CREATE INDEX ix_task_status_end_date ON task (status, end_date);
+CREATE TRIGGER trg_task_count_insert AFTER INSERT ON task
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'task'; END;
+CREATE TRIGGER trg_task_count_delete AFTER DELETE ON task
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'task'; END;
+CREATE TRIGGER trg_task_log_insert AFTER INSERT ON task
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('task', NEW.task_id, 'I'); END;
+CREATE TRIGGER trg_task_log_update AFTER UPDATE ON task
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('task', NEW.task_id, 'U'); END;
+CREATE TRIGGER trg_task_log_delete AFTER DELETE ON task
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('task', OLD.task_id, 'D'); END;
+
+CREATE TABLE invoice_new (
+    invoice_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_id INTEGER NOT NULL,
+    total REAL NOT NULL,
+    iva REAL NOT NULL,
+    total_with_iva REAL NOT NULL,
+    issued_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+    version INTEGER NOT NULL DEFAULT 1,
+    finalized BOOLEAN NOT NULL DEFAULT 0,
+    FOREIGN KEY (client_id) REFERENCES client(client_id) ON DELETE CASCADE
+);
+INSERT INTO invoice_new SELECT invoice_id, client_id, total, iva, total_with_iva, issued_at, version, finalized FROM invoice;
+DROP TABLE invoice;
+ALTER TABLE invoice_new RENAME TO invoice;
+CREATE INDEX ix_invoice_client_id ON invoice (client_id);
+CREATE TRIGGER trg_invoice_count_insert AFTER INSERT ON invoice
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'invoice'; END;
+CREATE TRIGGER trg_invoice_count_delete AFTER DELETE ON invoice
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'invoice'; END;
+CREATE TRIGGER trg_invoice_log_insert AFTER INSERT ON invoice
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice', NEW.invoice_id, 'I'); END;
+CREATE TRIGGER trg_invoice_log_update AFTER UPDATE ON invoice
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice', NEW.invoice_id, 'U'); END;
+CREATE TRIGGER trg_invoice_log_delete AFTER DELETE ON invoice
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice', OLD.invoice_id, 'D'); END;
+
+CREATE TABLE invoice_item_new (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    invoice_id INTEGER NOT NULL,
+    task_id INTEGER NOT NULL,  -- Relacionamento com a task, não com o work
+    description TEXT NOT NULL,
+    cost REAL NOT NULL,
+    FOREIGN KEY (invoice_id) REFERENCES invoice(invoice_id) ON DELETE CASCADE,
+    FOREIGN KEY (task_id) REFERENCES task(task_id) ON DELETE CASCADE
+);
+INSERT INTO invoice_item_new SELECT item_id, invoice_id, task_id, description, cost FROM invoice_item;
+DROP TABLE invoice_item;
+ALTER TABLE invoice_item_new RENAME TO invoice_item;
+CREATE INDEX ix_invoice_item_invoice_id ON invoice_item (invoice_id);
+CREATE INDEX ix_invoice_item_task_id ON invoice_item (task_id);
+CREATE TRIGGER trg_invoice_item_count_insert AFTER INSERT ON invoice_item
+BEGIN UPDATE row_count SET row_count = row_count + 1 WHERE table_name = 'invoice_item'; END;
+CREATE TRIGGER trg_invoice_item_count_delete AFTER DELETE ON invoice_item
+BEGIN UPDATE row_count SET row_count = row_count - 1 WHERE table_name = 'invoice_item'; END;
+CREATE TRIGGER trg_invoice_item_log_insert AFTER INSERT ON invoice_item
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice_item', NEW.item_id, 'I'); END;
+CREATE TRIGGER trg_invoice_item_log_update AFTER UPDATE ON invoice_item
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice_item', NEW.item_id, 'U'); END;
+CREATE TRIGGER trg_invoice_item_log_delete AFTER DELETE ON invoice_item
+BEGIN INSERT INTO change_log (table_name, row_id, operation) VALUES ('invoice_item', OLD.item_id, 'D'); END;
+
+-- Os próximos IDs começam acima do maior ID das tabelas principais e do arquivo
+DELETE FROM sqlite_sequence WHERE name IN ('task', 'invoice', 'invoice_item');
+INSERT INTO sqlite_sequence (name, seq) VALUES
+    ('task', MAX(COALESCE((SELECT MAX(task_id) FROM task), 0), COALESCE((SELECT MAX(task_id) FROM task_archive), 0))),
+    ('invoice', MAX(COALESCE((SELECT MAX(invoice_id) FROM invoice), 0), COALESCE((SELECT MAX(invoice_id) FROM invoice_archive), 0))),
+    ('invoice_item', MAX(COALESCE((SELECT MAX(item_id) FROM invoice_item), 0), COALESCE((SELECT MAX(item_id) FROM invoice_item_archive), 0)));
+PRAGMA foreign_keys = ON;
@@ -0,0 +1,131 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from models.invoice import Invoice
+from models.invoice_item import InvoiceItem
+from models.task import Task
+from models.invoice_archive import InvoiceArchive
+from models.invoice_item_archive import InvoiceItemArchive
+from models.task_archive import TaskArchive
+from utils.database import db
+from utils.queries import primary_key_column, select_columns, select_columns_by_pk
+
+logger = logging.getLogger(__name__)
+
+# Archive table of each archived table. The archive tables have the same columns, plus archived_at
+ARCHIVES = {
+    Invoice: InvoiceArchive,
+    InvoiceItem: InvoiceItemArchive,
+    Task: TaskArchive,
+}
+
+# Statuses of the tasks that are finished, and can be archived
+FINISHED_STATUSES = ("completed", "cancelled")
+
+def archive_closed_rows(cutoff, chunk_size=1000):
+    """
+    Move the rows that are closed and older than `cutoff` to the archive tables:
+    finalized invoices issued before the cutoff, with their items, then completed or cancelled
+    tasks that ended before it and are not referenced by a live invoice item.
+    Rows keep their IDs, so get_invoice, get_invoice_item and get_task still find them; the
+    tables are AUTOINCREMENT, so new rows never take an archived ID.
+    Each chunk of `chunk_size` rows is copied and deleted in its own transaction, so the write
+    lock is held for one chunk at a time.
+    :param cutoff: datetime: Rows closed before this moment are archived.
+    :param chunk_size: The number of invoices or tasks moved per transaction.
+    :return: dict: The cutoff, the number of archived rows per table and of chunks, and the duration in milliseconds.
+    """
+    started = time.perf_counter()
+    archived = {"invoice": 0, "invoice_item": 0, "task": 0}
+    chunks = 0
+
+    invoices = Invoice.__table__
+    items = InvoiceItem.__table__
+    closed_invoices = [
+        invoices.c.finalized.is_(True),
+        invoices.c.issued_at < cutoff,
+    ]
+    tasks = Task.__table__
+    finished_tasks = [
+        tasks.c.status.in_(FINISHED_STATUSES),
+        func.coalesce(tasks.c.end_date, tasks.c.start_date) < cutoff.date(),
+        # Items of live invoices keep referencing their tasks
+        ~exists().where(items.c.task_id == tasks.c.task_id),
+    ]
+
+    try:
+        for ids in _chunks(Invoice, closed_invoices, chunk_size):
+            archived["invoice_item"] += _move(InvoiceItem, items.c.invoice_id.in_(ids))
+            archived["invoice"] += _move(Invoice, invoices.c.invoice_id.in_(ids))
+            db.session.commit()
+            chunks += 1
+        for ids in _chunks(Task, finished_tasks, chunk_size):
+            archived["task"] += _move(Task, tasks.c.task_id.in_(ids))
+            db.session.commit()
+            chunks += 1
+    except SQLAlchemyError as e:
+        logger.error("Error archiving rows closed before %s after %s chunks: %s", cutoff, chunks, e)
+        db.session.rollback()
+        raise
+
+    return {
+        "cutoff": cutoff,
+        "archived": archived,
+        "chunks": chunks,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+def get_archived(model, pk_value, fields=None):
+    """
+    Retrieve an archived row of an archived table by ID, as its get service would return it.
+    :param model: Invoice, InvoiceItem or Task.
+    :param pk_value: The ID the row had in its table.
+    :param fields: Optional list of column names to select; all the columns of `model` are returned when omitted.
+    :return: dict: The archived row, or None if no row with that ID was archived.
+    """
+    return select_columns_by_pk(ARCHIVES[model], pk_value, fields or [column.name for column in model.__table__.c])
+
+def get_all_archived(model, fields=None, *criteria):
+    """
+    Retrieve the archived rows of an archived table, as its list service would return them.
+    :param model: Invoice, InvoiceItem or Task.
+    :param fields: Optional list of column names to select; all the columns of `model` are returned when omitted.
+    :param criteria: Optional filter expressions on the archive table.
+    :return: list: The archived rows, as dicts.
+    """
+    return select_columns(ARCHIVES[model], fields or [column.name for column in model.__table__.c], *criteria)
+
+def default_cutoff(days):
+    """
+    Return the cutoff of rows closed more than `days` days ago.
+    :param days: The age in days from which rows are archived.
+    :return: datetime: The cutoff.
+    """
+    return datetime.now() - timedelta(days=days)
+
+def _chunks(model, criteria, chunk_size):
+    """
+    Yield the IDs of the rows matching `criteria`, `chunk_size` at a time in ID order.
+    Each chunk starts after the last ID of the previous one, so the table is read once
+    even though the rows of the previous chunks have been deleted meanwhile.
+    """
+    pk = primary_key_column(model)
+    last = 0
+    while True:
+        ids = db.session.execute(select(pk).where(pk > last, *criteria).order_by(pk).limit(chunk_size)).scalars().all()
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+def _move(model, criterion):
+    """
+    Copy the rows matching `criterion` to the archive table of `model` and delete them, in the current transaction.
+    :return: int: The number of rows moved.
+    """
+    table = model.__table__
+    columns = [column.name for column in table.c]
+    db.session.execute(insert(ARCHIVES[model].__table__).from_select(columns, select(*table.c).where(criterion)))
+    return db.session.execute(delete(table).where(criterion)).rowcount
@@ -0,0 +1,59 @@
+import logging
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from utils.queries import primary_key_column
+from services.archive_service import ARCHIVES
+
+logger = logging.getLogger(__name__)
+
+# Async drivers used in place of the synchronous ones of the Flask application
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite"}
+
+def make_async_sessionmaker(url):
+    """
+    Create an async engine and session factory for the database at `url`.
+    :param url: SQLAlchemy URL of the synchronous engine, e.g. db.engine.url.
+    :return: async_sessionmaker: A factory of AsyncSession objects bound to the new engine.
+    """
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    engine = create_async_engine(url.set(drivername=drivername))
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+async def get_all_async(session, model):
+    """
+    Retrieve all rows of a model without blocking the event loop.
+    Async counterpart of the get_all_* services; the rows have the same keys.
+    :param session: AsyncSession to query with.
+    :param model: SQLAlchemy model class.
+    :return: list: A list of dictionaries, one per row.
+    """
+    try:
+        result = await session.execute(select(model.__table__))
+        return [dict(row) for row in result.mappings()]
+    except Exception as e:
+        logger.error("Error fetching all rows of %s: %s", model.__name__, e)
+        raise
+
+async def get_async(session, model, pk_value):
+    """
+    Retrieve a row by primary key without blocking the event loop.
+    Async counterpart of the get_* services; the row has the same keys, and rows of archived
+    tables are looked up in their archive table when they are no longer in the table itself.
+    :param session: AsyncSession to query with.
+    :param model: SQLAlchemy model class.
+    :param pk_value: Primary key of the row.
+    :return: dict: The row, or None if not found.
+    """
+    try:
+        result = await session.execute(select(model.__table__).where(primary_key_column(model) == pk_value))
+        row = result.mappings().first()
+        if row is None and model in ARCHIVES:
+            # Same columns as get_archived: those of the live table, without archived_at
+            archive = ARCHIVES[model].__table__
+            pk = archive.c[primary_key_column(model).name]
+            result = await session.execute(select(*(archive.c[column.name] for column in model.__table__.c)).where(pk == pk_value))
+            row = result.mappings().first()
+        return dict(row) if row else None
+    except Exception as e:
+        logger.error("Error fetching %s %s: %s", model.__name__, pk_value, e)
+        raise
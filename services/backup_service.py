@@ -0,0 +1,229 @@
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from utils.database import db
+
+logger = logging.getLogger(__name__)
+
+# Snapshot file names are the database name, the UTC creation time and this suffix, e.g. app-20250101T120000123Z.db.gz
+SNAPSHOT_SUFFIX = ".db.gz"
+
+# Suffix of the file holding the SHA-256 of a snapshot, in the format of sha256sum
+CHECKSUM_SUFFIX = ".sha256"
+
+# Statuses of a backup step that could not read the database because a writer held it
+BUSY_STEP_STATUSES = (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+class _TooManyRestarts(Exception):
+    """
+    Raised from the progress callback to abort a stepwise copy that keeps restarting.
+    """
+
+def snapshot_directory():
+    """
+    Return the directory snapshots are written to: BACKUP_DIR, or "backups" in the instance folder.
+    """
+    return current_app.config["BACKUP_DIR"] or os.path.join(current_app.instance_path, "backups")
+
+def create_snapshot(directory, pages_per_step=1024, step_sleep_ms=10, max_restarts=10):
+    """
+    Copy the database with SQLite's online backup API into a compressed, checksummed snapshot.
+    The copy proceeds `pages_per_step` pages at a time and sleeps `step_sleep_ms` between steps.
+    A step holds a read lock on the database, which stalls writers in rollback journal mode
+    (not in WAL mode), so the stall is bounded by the duration of a step. A step that finds the
+    database locked by a writer returns at once and is retried after the same pause; it holds
+    no lock, so it is counted apart from the writer stall. A write by another connection restarts
+    the copy, and under a steady stream of writes it would never end; after `max_restarts`
+    restarts the copy is redone in a single step, which always completes but holds the read lock,
+    and so blocks writers, for the whole copy. The report says when that happened.
+    The copy is checked with PRAGMA quick_check before it is compressed.
+    :param directory: The directory the snapshot is written to, created if missing.
+    :param pages_per_step: The number of pages copied per step.
+    :param step_sleep_ms: The pause between steps in milliseconds, during which writers can commit.
+    :param max_restarts: The number of restarts after which the copy is done in a single step.
+    :return: dict: The snapshot file, its size and checksum, the number of pages, steps, busy steps
+             and restarts, whether the copy fell back to a single step, the duration and the writer
+             stall time (total and longest step) in milliseconds.
+    :raises ValueError: If the database is not an SQLite file or the copy fails the integrity check.
+    """
+    source_path = _database_path()
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    progress = {"steps": 0, "busy_steps": 0, "restarts": 0, "single_step": False, "remaining": None, "total": 0, "stall_ms": 0.0, "max_stall_ms": 0.0, "step_started": None}
+
+    def on_step(status, remaining, total):
+        # Called after each step, which started when the previous call returned
+        if status in BUSY_STEP_STATUSES:
+            progress["busy_steps"] += 1
+            time.sleep(max(step_sleep_ms, 1) / 1000)
+            progress["step_started"] = time.perf_counter()
+            return
+        # The step copied pages, holding the read lock all along
+        stall_ms = (time.perf_counter() - progress["step_started"]) * 1000
+        progress["stall_ms"] += stall_ms
+        progress["max_stall_ms"] = max(progress["max_stall_ms"], stall_ms)
+        if progress["remaining"] is not None and remaining > progress["remaining"]:
+            progress["restarts"] += 1
+            if progress["restarts"] > max_restarts:
+                raise _TooManyRestarts()
+        progress.update(steps=progress["steps"] + 1, remaining=remaining, total=total)
+        if remaining:
+            time.sleep(step_sleep_ms / 1000)
+        progress["step_started"] = time.perf_counter()
+
+    fd, copy_path = tempfile.mkstemp(suffix=".db", dir=directory)
+    os.close(fd)
+    try:
+        # No busy timeout: a step blocked by a writer returns at once instead of waiting in SQLite
+        source = sqlite3.connect(source_path, timeout=0)
+        target = sqlite3.connect(copy_path)
+        try:
+            progress["step_started"] = time.perf_counter()
+            try:
+                # on_step pauses between steps, so the backup must not sleep on busy steps itself
+                source.backup(target, pages=pages_per_step, progress=on_step, sleep=0)
+            except _TooManyRestarts:
+                logger.warning("Snapshot restarted %s times, copying the database in a single step", progress["restarts"])
+                progress.update(remaining=None, single_step=True, step_started=time.perf_counter())
+                source.backup(target, pages=-1, progress=on_step, sleep=0)
+            source.execute("PRAGMA busy_timeout = 5000")
+            journal_mode = source.execute("PRAGMA journal_mode").fetchone()[0]
+            check = target.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            target.close()
+            source.close()
+        if check != "ok":
+            raise ValueError(f"The database copy failed the integrity check: {check}")
+
+        now = datetime.now(timezone.utc)
+        name = f"{os.path.splitext(os.path.basename(source_path))[0]}-{now:%Y%m%dT%H%M%S}{now.microsecond // 1000:03d}Z{SNAPSHOT_SUFFIX}"
+        snapshot_path = os.path.join(directory, name)
+        with open(copy_path, "rb") as copy, gzip.open(snapshot_path, "wb", compresslevel=6) as snapshot:
+            shutil.copyfileobj(copy, snapshot, 1024 * 1024)
+    finally:
+        os.remove(copy_path)
+
+    checksum = _sha256(snapshot_path)
+    with open(snapshot_path + CHECKSUM_SUFFIX, "w") as checksum_file:
+        checksum_file.write(f"{checksum}  {name}\n")
+
+    logger.info("Created snapshot %s in %s steps", name, progress["steps"])
+    return {
+        "snapshot": name,
+        "size": os.path.getsize(snapshot_path),
+        "sha256": checksum,
+        "pages": progress["total"],
+        "steps": progress["steps"],
+        "busy_steps": progress["busy_steps"],
+        "restarts": progress["restarts"],
+        "single_step": progress["single_step"],
+        "journal_mode": journal_mode,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+        "writer_stall_ms": round(progress["stall_ms"], 3) if journal_mode != "wal" else 0,
+        "max_writer_stall_ms": round(progress["max_stall_ms"], 3) if journal_mode != "wal" else 0,
+    }
+
+def list_snapshots(directory):
+    """
+    List the snapshots of a directory, newest first.
+    :param directory: The directory the snapshots are written to.
+    :return: list: dicts with the name, size, creation time and checksum of each snapshot.
+    """
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith(SNAPSHOT_SUFFIX):
+            continue
+        path = os.path.join(directory, name)
+        snapshots.append({
+            "snapshot": name,
+            "size": os.path.getsize(path),
+            "created_at": datetime.fromtimestamp(os.path.getmtime(path), timezone.utc),
+            "sha256": _read_checksum(path),
+        })
+    return snapshots
+
+def restore_snapshot(snapshot_path):
+    """
+    Replace the contents of the database with a snapshot.
+    The checksum is verified and the decompressed copy checked with PRAGMA integrity_check
+    before anything is written; the database is then overwritten with the online backup API,
+    so connections opened by other processes see the restored contents. Stop the application
+    first: writes committed during the restore are lost.
+    :param snapshot_path: The path of the .db.gz snapshot.
+    :return: dict: The restored snapshot, its number of pages and the duration in milliseconds.
+    :raises ValueError: If the checksum does not match or the snapshot is corrupt.
+    """
+    started = time.perf_counter()
+    expected = _read_checksum(snapshot_path)
+    if expected is None:
+        raise ValueError(f"No checksum file {os.path.basename(snapshot_path)}{CHECKSUM_SUFFIX} next to the snapshot.")
+    if _sha256(snapshot_path) != expected:
+        raise ValueError(f"The checksum of {os.path.basename(snapshot_path)} does not match, the snapshot is damaged.")
+
+    fd, copy_path = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(os.path.abspath(snapshot_path)))
+    try:
+        with gzip.open(snapshot_path, "rb") as snapshot, os.fdopen(fd, "wb") as copy:
+            shutil.copyfileobj(snapshot, copy, 1024 * 1024)
+        source = sqlite3.connect(copy_path)
+        try:
+            check = source.execute("PRAGMA integrity_check").fetchone()[0]
+            if check != "ok":
+                raise ValueError(f"The snapshot failed the integrity check: {check}")
+            target = sqlite3.connect(_database_path())
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            pages = source.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            source.close()
+    finally:
+        os.remove(copy_path)
+
+    # Pooled connections may hold pages cached from before the restore
+    db.engine.dispose()
+    logger.info("Restored snapshot %s", os.path.basename(snapshot_path))
+    return {
+        "snapshot": os.path.basename(snapshot_path),
+        "pages": pages,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+def _database_path():
+    """
+    Return the file of the primary database.
+    :raises ValueError: If the database is not an SQLite file.
+    """
+    url = db.engine.url
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise ValueError("Snapshots are only supported for SQLite database files.")
+    return url.database
+
+def _sha256(path):
+    """
+    Compute the SHA-256 of a file, reading it in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _read_checksum(snapshot_path):
+    """
+    Read the checksum recorded next to a snapshot, or None if there is none.
+    """
+    try:
+        with open(snapshot_path + CHECKSUM_SUFFIX) as checksum_file:
+            return checksum_file.read().split()[0]
+    except (OSError, IndexError):
+        return None
@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from sqlalchemy import delete, func, select, update
+from utils.database import db, use_replica
+from errors.errors import CursorExpiredError
+from models.change_log import ChangeLog
+from models.change_log_horizon import ChangeLogHorizon
+from models.client import Client
+from models.employee import Employee
+from models.invoice import Invoice
+from models.invoice_item import InvoiceItem
+from models.setting import Setting
+from models.task import Task
+from models.vehicle import Vehicle
+from models.work import Work
+from utils.queries import primary_key_column
+
+logger = logging.getLogger(__name__)
+
+# Tables recorded in the change log, by table name
+TRACKED_MODELS = {model.__tablename__: model for model in (Client, Employee, Vehicle, Work, Task, Invoice, InvoiceItem, Setting)}
+
+OPERATIONS = {"I": "insert", "U": "update", "D": "delete"}
+
+# Time of the next opportunistic compaction of this process
+_next_compaction = 0.0
+_compaction_lock = threading.Lock()
+
+@use_replica
+def get_changes(since, limit):
+    """
+    Retrieve the changes committed after a cursor, in commit order.
+    The page is a range scan of the change log primary key, so its cost depends on the number of
+    changes, not on the size of the tables. Several changes of the same row in a page are reported
+    once, as the last one; inserts and updates carry the current row.
+    :param since: The cursor: the last change_id the client has applied, 0 for the start of the log.
+    :param limit: The maximum number of log entries to read.
+    :return: dict: The changes, the cursor to resume from and whether more changes follow.
+    :raises CursorExpiredError: If changes after `since` have been removed by retention.
+    """
+    try:
+        horizon = db.session.execute(select(ChangeLogHorizon.change_id)).scalar() or 0
+        if since < horizon:
+            latest = db.session.execute(select(func.max(ChangeLog.change_id))).scalar() or 0
+            # The log may be empty after expiry, in which case the horizon is the latest change
+            raise CursorExpiredError(f"Cursor {since} is older than the retained change history ({horizon}).", max(latest, horizon))
+
+        entries = db.session.execute(
+            select(ChangeLog.change_id, ChangeLog.table_name, ChangeLog.row_id, ChangeLog.operation)
+            .where(ChangeLog.change_id > since)
+            .order_by(ChangeLog.change_id)
+            .limit(limit + 1)
+        ).all()
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        # Keep the last entry of each row, in the position of that entry
+        latest = {}
+        for entry in entries:
+            latest.pop((entry.table_name, entry.row_id), None)
+            latest[(entry.table_name, entry.row_id)] = entry
+
+        rows = _current_rows([entry for entry in latest.values() if entry.operation != "D"])
+        changes = []
+        for key, entry in latest.items():
+            if entry.operation != "D" and key not in rows:
+                # Deleted by a later change, which the next page reports
+                continue
+            changes.append({
+                "change_id": entry.change_id,
+                "table": entry.table_name,
+                "id": entry.row_id,
+                "operation": OPERATIONS[entry.operation],
+                "data": rows.get(key),
+            })
+        return {
+            "changes": changes,
+            "next": entries[-1].change_id if entries else since,
+            "has_more": has_more,
+        }
+    except CursorExpiredError:
+        raise
+    except Exception as e:
+        logger.error("Error fetching changes since %s: %s", since, e)
+        raise
+
+def _current_rows(entries):
+    """
+    Load the current state of the rows referenced by change log entries, one query per table.
+    :param entries: Change log entries of inserted or updated rows.
+    :return: dict: Row dictionaries keyed by (table name, row ID).
+    """
+    ids_by_table = {}
+    for entry in entries:
+        ids_by_table.setdefault(entry.table_name, []).append(entry.row_id)
+    rows = {}
+    for table_name, ids in ids_by_table.items():
+        model = TRACKED_MODELS[table_name]
+        pk = primary_key_column(model)
+        for row in db.session.execute(select(model.__table__).where(pk.in_(ids))).mappings():
+            rows[(table_name, row[pk.name])] = dict(row)
+    return rows
+
+def compact_change_log(retention_seconds):
+    """
+    Shrink the change log.
+    Entries superseded by a later change of the same row are always removed, since a sync only
+    needs the last one. Entries older than `retention_seconds` are then removed and the horizon
+    raised to the highest of them, so that older cursors are told to resync.
+    :param retention_seconds: How long entries are kept.
+    :return: dict: The number of superseded and expired entries removed and the new horizon.
+    """
+    try:
+        latest_ids = select(func.max(ChangeLog.change_id)).group_by(ChangeLog.table_name, ChangeLog.row_id)
+        superseded = db.session.execute(delete(ChangeLog).where(ChangeLog.change_id.not_in(latest_ids))).rowcount
+
+        cutoff = int(time.time()) - retention_seconds
+        last_expired = db.session.execute(select(func.max(ChangeLog.change_id)).where(ChangeLog.changed_at < cutoff)).scalar()
+        expired = 0
+        if last_expired is not None:
+            expired = db.session.execute(delete(ChangeLog).where(ChangeLog.change_id <= last_expired)).rowcount
+            db.session.execute(
+                update(ChangeLogHorizon).where(ChangeLogHorizon.change_id < last_expired).values(change_id=last_expired)
+            )
+        db.session.commit()
+        horizon = db.session.execute(select(ChangeLogHorizon.change_id)).scalar() or 0
+        return {"superseded": superseded, "expired": expired, "horizon": horizon}
+    except Exception as e:
+        logger.error("Error compacting the change log: %s", e)
+        db.session.rollback()
+        raise
+
+def compact_change_log_if_due(retention_seconds, interval_seconds):
+    """
+    Compact the change log if this process has not done so in the last `interval_seconds`.
+    Called after serving changes, so the log is kept small by the clients that read it.
+    :param retention_seconds: How long entries are kept.
+    :param interval_seconds: The minimum time between two compactions of this process.
+    :return: dict: The result of compact_change_log, or None if no compaction was due.
+    """
+    global _next_compaction
+    with _compaction_lock:
+        now = time.monotonic()
+        if now < _next_compaction:
+            return None
+        _next_compaction = now + interval_seconds
+    return compact_change_log(retention_seconds)
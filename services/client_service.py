@@ -1,15 +1,37 @@
+import csv
+import io
 import logging
-from utils.database import db
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from utils.database import db, use_replica
+from utils.cache import response_cache
+from utils.queries import coerce_values, count_rows, delete_by_ids, delete_by_pk, select_columns, select_columns_by_pk, update_returning
 from models.client import Client
+from models.invoice import Invoice
+from models.invoice_item import InvoiceItem
+from models.task import Task
+from models.vehicle import Vehicle
+from models.work import Work
 
 logger = logging.getLogger(__name__)
 
-def get_all_clients():
+# Fields a client may change through PATCH
+CLIENT_UPDATABLE_FIELDS = ("name", "email", "phone", "address")
+
+# Columns expected in a client CSV import, in addition to being the upserted fields
+CLIENT_IMPORT_FIELDS = ("name", "email", "phone", "address")
+
+@use_replica
+def get_all_clients(fields=None):
     """
     Retrieve all clients.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: list: A list of dictionaries containing information about all clients.
     """
     try:
+        if fields:
+            return select_columns(Client, fields)
         clients = Client.query.all()  # Retrieve all clients from the database
         return [
             {
@@ -23,16 +45,20 @@ def get_all_clients():
             for client in clients
         ]
     except Exception as e:
-        logger.error(f"Error fetching all clients: {e}")
+        logger.error("Error fetching all clients: %s", e)
         return {"error": "Internal Server Error"}
 
-def get_client(client_id):
+@use_replica
+def get_client(client_id, fields=None):
     """
     Retrieve a client by ID.
     :param client_id: The ID of the client to retrieve.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: dict: A dictionary containing the client's information or an error message.
     """
     try:
+        if fields:
+            return select_columns_by_pk(Client, client_id, fields)
         client = Client.query.get(client_id)
         if not client:
             return None
@@ -45,9 +71,21 @@ def get_client(client_id):
             "created_at": client.created_at,
         }
     except Exception as e:
-        logger.error(f"Error fetching client {client_id}: {e}")
+        logger.error("Error fetching client %s: %s", client_id, e)
         return {"error": "Internal Server Error"}
 
+@use_replica
+def count_clients():
+    """
+    Count all clients without loading them.
+    :return: int: The number of clients.
+    """
+    try:
+        return count_rows(Client)
+    except Exception as e:
+        logger.error("Error counting clients: %s", e)
+        raise
+
 def create_client(name, email, phone, address):
     """
     Create a new client.
@@ -61,6 +99,7 @@ def create_client(name, email, phone, address):
         client = Client(name=name, email=email, phone=phone, address=address)
         db.session.add(client)  # Save the new client to the database
         db.session.commit() # Save the new client to the database
+        response_cache.bump("client")
         return {
             "client_id": client.client_id,
             "name": client.name,
@@ -70,7 +109,7 @@ def create_client(name, email, phone, address):
             "created_at": client.created_at,
         }
     except Exception as e:
-        logger.error(f"Error creating client: {e}")
+        logger.error("Error creating client: %s", e)
         return {"error": "Internal Server Error"}
 
 
@@ -99,6 +138,7 @@ def update_client(client_id, name, email, phone, address):
 
         # Commit the changes to the database
         db.session.commit()
+        response_cache.bump("client")
         # Return updated client information
         return {
             "client_id": client.client_id,
@@ -111,23 +151,175 @@ def update_client(client_id, name, email, phone, address):
     except Exception as e:
         # If an error occurs, rollback the transaction
         db.session.rollback()
-        logger.error(f"Error updating client {client_id}: {e}")
+        logger.error("Error updating client %s: %s", client_id, e)
         return {"error": "Internal Server Error"}
+
+def patch_client(client_id, changes):
+    """
+    Partially update a client with a single UPDATE ... RETURNING statement.
+    Only the fields present in `changes` are written and the row is not read first.
+    :param client_id: The ID of the client to update.
+    :param changes: dict: The fields to change, a subset of CLIENT_UPDATABLE_FIELDS.
+    :return: dict: A dictionary containing the updated client's information, or None if not found.
+    :raises ValueError: If `changes` has no updatable field.
+    """
+    try:
+        values = coerce_values(Client, changes, CLIENT_UPDATABLE_FIELDS)
+        client = update_returning(Client, client_id, values)
+        response_cache.bump("client")
+        return client
+    except SQLAlchemyError as e:
+        logger.error("Error patching client %s: %s", client_id, e)
+        db.session.rollback()
+        raise
+
 def delete_client(client_id):
     """
-    Delete a client.
+    Delete a client with a single DELETE statement.
     :param client_id: The ID of the client to delete.
-    :return: tuple: A message confirming deletion or an error message and the HTTP status code.
+    :return: dict: A message confirming deletion, or None if the client does not exist.
     """
     try:
-        client = Client.query.get(client_id)
-        if not client:
+        if not delete_by_pk(Client, client_id):
+            return None
+        response_cache.bump("client")
+        return {"message": "Client deleted successfully"}
+    except Exception as e:
+        logger.error("Error deleting client %s: %s", client_id, e)
+        db.session.rollback()
+        return {"error": "Internal Server Error"}
+
+def delete_client_cascade(client_id):
+    """
+    Delete a client together with its vehicles, works, tasks, invoices and invoice items.
+    Each table is cleared with one DELETE ... WHERE ... IN (subquery) statement, children first,
+    and all statements run in a single transaction, so no rows are loaded into the session.
+    :param client_id: The ID of the client to delete.
+    :return: dict: The number of deleted rows per table, or None if the client does not exist.
+    """
+    vehicle_ids = select(Vehicle.vehicle_id).where(Vehicle.client_id == client_id)
+    work_ids = select(Work.work_id).where(Work.vehicle_id.in_(vehicle_ids))
+    task_ids = select(Task.task_id).where(Task.work_id.in_(work_ids))
+    invoice_ids = select(Invoice.invoice_id).where(Invoice.client_id == client_id)
+
+    statements = [
+        ("invoice_item", delete(InvoiceItem.__table__).where(
+            InvoiceItem.invoice_id.in_(invoice_ids) | InvoiceItem.task_id.in_(task_ids)
+        )),
+        ("task", delete(Task.__table__).where(Task.work_id.in_(work_ids))),
+        ("work", delete(Work.__table__).where(Work.vehicle_id.in_(vehicle_ids))),
+        ("invoice", delete(Invoice.__table__).where(Invoice.client_id == client_id)),
+        ("vehicle", delete(Vehicle.__table__).where(Vehicle.client_id == client_id)),
+        ("client", delete(Client.__table__).where(Client.client_id == client_id)),
+    ]
+    try:
+        deleted = {table: db.session.execute(statement).rowcount for table, statement in statements}
+        if not deleted["client"]:
+            db.session.rollback()
             return None
-        # Delete the client
-        db.session.delete(client)
-        # Commit the deletion
         db.session.commit()
-        return client
+        response_cache.bump(*deleted)
+        return deleted
     except Exception as e:
-        logger.error(f"Error deleting client {client_id}: {e}")
-        return {"error": "Internal Server Error"}
\ No newline at end of file
+        logger.error("Error deleting client %s and its related records: %s", client_id, e)
+        db.session.rollback()
+        raise
+
+
+def delete_clients(client_ids):
+    """
+    Delete several clients with a single DELETE statement in one transaction.
+    :param client_ids: The IDs of the clients to delete.
+    :return: int: The number of deleted clients.
+    """
+    try:
+        deleted = delete_by_ids(Client, client_ids)
+        response_cache.bump("client")
+        return deleted
+    except Exception as e:
+        logger.error("Error deleting clients %s: %s", client_ids, e)
+        db.session.rollback()
+        raise
+
+def import_clients(stream, batch_size=1000):
+    """
+    Import clients from a CSV stream, inserting new names and updating existing ones.
+    The file is read row by row and written in batches of `batch_size` rows, each batch
+    in its own transaction, so memory use does not depend on the size of the file.
+    :param stream: A binary file-like object with a header row containing name, email, phone and address.
+    :param batch_size: The number of rows written per transaction.
+    :return: dict: The number of imported rows and a list of per-row errors.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    missing = [field for field in CLIENT_IMPORT_FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Missing CSV columns: {', '.join(missing)}.")
+
+    imported = 0
+    errors = []
+    batch = {}
+    # Data rows start on line 2, after the header
+    for line_number, row in enumerate(reader, start=2):
+        values = {field: (row.get(field) or "").strip() for field in CLIENT_IMPORT_FIELDS}
+        error = _validate_client_row(values)
+        if error:
+            errors.append({"row": line_number, "error": error})
+            continue
+        # A name repeated within the batch keeps its last occurrence, as a sequential upsert would
+        batch[values["name"]] = (line_number, values)
+        if len(batch) >= batch_size:
+            imported += _upsert_client_batch(list(batch.values()), errors)
+            batch = {}
+    if batch:
+        imported += _upsert_client_batch(list(batch.values()), errors)
+
+    return {"imported": imported, "errors": errors}
+
+def _validate_client_row(values):
+    """
+    Check a CSV row against the client columns.
+    :param values: dict: The stripped values of the row.
+    :return: str: An error message, or None if the row is valid.
+    """
+    for field, value in values.items():
+        if not value:
+            return f"Missing value for {field}."
+        max_length = Client.__table__.c[field].type.length
+        if max_length and len(value) > max_length:
+            return f"Value for {field} exceeds {max_length} characters."
+    return None
+
+def _upsert_client_batch(batch, errors):
+    """
+    Upsert a batch of clients by name in a single transaction.
+    If the batch fails, its rows are retried one by one so that only the offending
+    rows are reported and the rest of the batch is still imported.
+    :param batch: list: Tuples of (line number, values) to upsert.
+    :param errors: list: The error list to append per-row failures to.
+    :return: int: The number of rows written.
+    """
+    statement = sqlite_insert(Client.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=[Client.__table__.c.name],
+        set_={field: statement.excluded[field] for field in CLIENT_IMPORT_FIELDS if field != "name"},
+    )
+    try:
+        db.session.execute(statement, [values for _, values in batch])
+        db.session.commit()
+        response_cache.bump("client")
+        return len(batch)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.warning("Client import batch failed, retrying row by row: %s", e)
+
+    written = 0
+    for line_number, values in batch:
+        try:
+            db.session.execute(statement, values)
+            db.session.commit()
+            response_cache.bump("client")
+            written += 1
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            errors.append({"row": line_number, "error": str(getattr(e, "orig", e))})
+    return written
\ No newline at end of file
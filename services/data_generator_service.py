@@ -0,0 +1,264 @@
+import itertools
+import logging
+import random
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, insert, select
+from utils.database import db
+from models.client import Client
+from models.employee import Employee
+from models.setting import Setting
+from models.vehicle import Vehicle
+from models.work import Work
+from models.task import Task
+from models.invoice import Invoice
+from models.invoice_item import InvoiceItem
+from models.status import STATUSES
+from services.archive_service import ARCHIVES
+
+logger = logging.getLogger(__name__)
+
+# Tables in insertion order, parents before children
+MODELS = (Client, Employee, Setting, Vehicle, Work, Task, Invoice, InvoiceItem)
+
+# Pragmas set on the loading connection, restored afterwards.
+# Durability is traded for speed: a crash during the load can lose the last batches.
+LOADING_PRAGMAS = {
+    "synchronous": "OFF",
+    "cache_size": "-262144",  # 256 MiB
+    "temp_store": "MEMORY",
+}
+
+# Dates are drawn from this range, not from the current date, so that a seed always gives the same data
+FIRST_DATE = date(2018, 1, 1)
+DAYS = 7 * 365
+
+IVA_RATE = 0.23
+
+FIRST_NAMES = ("Ana", "João", "Maria", "Pedro", "Rita", "Tiago", "Inês", "Rui", "Sofia", "Miguel", "Carla", "Nuno")
+LAST_NAMES = ("Silva", "Santos", "Ferreira", "Pereira", "Oliveira", "Costa", "Rodrigues", "Martins", "Sousa", "Gomes")
+STREETS = ("Rua da Liberdade", "Avenida da República", "Rua do Comércio", "Rua Direita", "Avenida Central", "Rua das Flores")
+CITIES = ("Lisboa", "Porto", "Braga", "Coimbra", "Aveiro", "Faro", "Setúbal", "Viseu")
+VEHICLES = {
+    "Renault": ("Clio", "Mégane", "Captur"),
+    "Peugeot": ("208", "308", "3008"),
+    "Volkswagen": ("Golf", "Polo", "Passat"),
+    "Toyota": ("Yaris", "Corolla", "RAV4"),
+    "BMW": ("Série 1", "Série 3", "X1"),
+    "Fiat": ("Punto", "500", "Panda"),
+}
+JOBS = ("Revisão", "Mudança de óleo", "Substituição de pastilhas", "Alinhamento de direção", "Substituição de embraiagem",
+        "Diagnóstico eletrónico", "Substituição de pneus", "Reparação de ar condicionado", "Substituição de correia", "Inspeção")
+ROLES = ("mechanic",) * 8 + ("manager", "admin")
+# Weights of STATUSES: most works in a garage's history are done
+WORK_STATUS_WEIGHTS = (5, 5, 85, 5)
+
+
+def _spread(rng, average):
+    """
+    Draw a count between 1 and 2 * average - 1, whose mean is `average`.
+    """
+    return rng.randint(1, max(1, 2 * average - 1))
+
+
+def _license_plate(sequence):
+    """
+    Return the license plate of a sequence number, in the AA-00-AA format.
+    Different numbers give different plates, up to 26^4 * 100.
+    """
+    number, letters = sequence % 100, sequence // 100
+    a, b, c, d = (chr(65 + letters // 26 ** power % 26) for power in (3, 2, 1, 0))
+    return f"{a}{b}-{number:02d}-{c}{d}"
+
+
+def _next_ids(connection):
+    """
+    Return the first free primary key of each table, so generated rows can reference each other
+    without reading back their IDs, and so data can be added to a database that is not empty.
+    IDs of archived rows, and of deleted rows of AUTOINCREMENT tables, are never reused, so they are skipped.
+    """
+    sequences = dict(connection.exec_driver_sql("SELECT name, seq FROM sqlite_sequence").all())
+    next_ids = {}
+    for model in MODELS:
+        pk = model.__table__.primary_key.columns.values()[0]
+        used = [connection.execute(select(func.max(pk))).scalar() or 0, sequences.get(model.__tablename__, 0)]
+        if model in ARCHIVES:
+            used.append(connection.execute(select(func.max(ARCHIVES[model].__table__.c[pk.name]))).scalar() or 0)
+        next_ids[model] = max(used) + 1
+    return next_ids
+
+
+def _generate(rng, next_ids, taken_plates, clients, employees, settings, vehicles_per_client, works_per_vehicle, tasks_per_work):
+    """
+    Yield (model, row) pairs, parents before the rows that reference them.
+    License plates are unique, so the generated ones skip `taken_plates`.
+    Vehicles belong to the generated clients, works to their vehicles and tasks to their works,
+    assigned to generated mechanics; each completed work is invoiced to the vehicle's client,
+    with an item per task whose costs add up to the invoice total.
+    """
+    ids = dict(next_ids)
+    plates = (plate for plate in map(_license_plate, itertools.count()) if plate not in taken_plates)
+
+    def take_id(model):
+        value = ids[model]
+        ids[model] += 1
+        return value
+
+    for _ in range(settings):
+        setting_id = take_id(Setting)
+        yield Setting, {"setting_id": setting_id, "key_name": f"generated.setting.{setting_id}", "value": str(rng.randint(0, 1000))}
+
+    mechanics = []
+    for _ in range(employees):
+        employee_id = take_id(Employee)
+        role = rng.choice(ROLES)
+        if role == "mechanic":
+            mechanics.append(employee_id)
+        yield Employee, {
+            "employee_id": employee_id,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "email": f"employee{employee_id}@garage.example",
+            "phone": f"9{rng.randint(10000000, 99999999)}",
+            "role": role,
+            "hired_date": FIRST_DATE + timedelta(days=rng.randrange(DAYS)),
+        }
+    # Every task needs someone to do it, even if no mechanic was drawn
+    mechanics = mechanics or list(range(next_ids[Employee], ids[Employee]))
+
+    for _ in range(clients):
+        client_id = take_id(Client)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        yield Client, {
+            "client_id": client_id,
+            "name": f"{name} {client_id}",  # Client names are unique
+            "email": f"client{client_id}@mail.example",
+            "phone": f"9{rng.randint(10000000, 99999999)}",
+            "address": f"{rng.choice(STREETS)} {rng.randint(1, 300)}, {rng.choice(CITIES)}",
+        }
+        for _ in range(_spread(rng, vehicles_per_client)):
+            vehicle_id = take_id(Vehicle)
+            brand = rng.choice(tuple(VEHICLES))
+            yield Vehicle, {
+                "vehicle_id": vehicle_id,
+                "client_id": client_id,
+                "brand": brand,
+                "model": rng.choice(VEHICLES[brand]),
+                "year": rng.randint(2000, 2024),
+                "license_plate": next(plates),
+            }
+            for _ in range(_spread(rng, works_per_vehicle)):
+                work_id = take_id(Work)
+                start = FIRST_DATE + timedelta(days=rng.randrange(DAYS))
+                end = start + timedelta(days=rng.randint(0, 14))
+                status = rng.choices(STATUSES, WORK_STATUS_WEIGHTS)[0]
+                tasks = []
+                for _ in range(_spread(rng, tasks_per_work)):
+                    task_start = start + timedelta(days=rng.randint(0, (end - start).days))
+                    tasks.append({
+                        "task_id": take_id(Task),
+                        "work_id": work_id,
+                        "employee_id": rng.choice(mechanics),
+                        "description": rng.choice(JOBS),
+                        "start_date": task_start,
+                        "end_date": task_start + timedelta(days=rng.randint(0, (end - task_start).days)) if status == "completed" else None,
+                        "status": status,
+                    })
+                costs = [round(rng.uniform(20, 600), 2) for _ in tasks]
+                yield Work, {
+                    "work_id": work_id,
+                    "vehicle_id": vehicle_id,
+                    "description": ", ".join(sorted({task["description"] for task in tasks})),
+                    "start_date": start,
+                    "end_date": end,
+                    "status": status,
+                    "cost": round(sum(costs), 2),
+                }
+                for task in tasks:
+                    yield Task, task
+                if status != "completed":
+                    continue
+                invoice_id = take_id(Invoice)
+                total = round(sum(costs), 2)
+                yield Invoice, {
+                    "invoice_id": invoice_id,
+                    "client_id": client_id,
+                    "issued_at": datetime.combine(end, datetime.min.time()) + timedelta(hours=rng.randint(9, 18)),
+                    "iva": IVA_RATE,
+                    "total": total,
+                    "total_with_iva": round(total * (1 + IVA_RATE), 2),
+                    "finalized": True,
+                }
+                for task, cost in zip(tasks, costs):
+                    yield InvoiceItem, {
+                        "item_id": take_id(InvoiceItem),
+                        "invoice_id": invoice_id,
+                        "task_id": task["task_id"],
+                        "description": task["description"],
+                        "cost": cost,
+                    }
+
+
+def generate_data(clients, employees=50, settings=10, vehicles_per_client=2, works_per_vehicle=3, tasks_per_work=4, seed=0, batch_size=10000):
+    """
+    Generate realistic, referentially consistent data for all the tables, for load tests and
+    for reproducing production-scale behavior locally.
+    The same seed always generates the same rows. Rows are inserted with executemany Core
+    inserts in batches of `batch_size` per table, on a connection with LOADING_PRAGMAS set.
+    Each round of batches is committed as it is inserted. The row count and change log
+    triggers fire for every row, as for any other insert.
+
+    :param clients: Number of clients to generate
+    :param employees: Number of employees to generate, at least one
+    :param settings: Number of settings to generate
+    :param vehicles_per_client: Average number of vehicles per client
+    :param works_per_vehicle: Average number of works per vehicle
+    :param tasks_per_work: Average number of tasks per work, and of items per invoice
+    :param seed: Seed of the random generator
+    :param batch_size: Number of rows per insert statement
+    :return: dict with the rows inserted per table, the duration and the rows per second
+    :raises ValueError: If a count is not positive
+    """
+    if clients < 0 or employees < 1 or min(vehicles_per_client, works_per_vehicle, tasks_per_work, batch_size) < 1:
+        raise ValueError("Counts must be positive, with at least one employee to assign the tasks to.")
+    rng = random.Random(seed)
+    counts = {model.__tablename__: 0 for model in MODELS}
+    batches = {model: [] for model in MODELS}
+    started = time.perf_counter()
+
+    with db.engine.connect() as connection:
+        previous = {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in LOADING_PRAGMAS}
+        for name, value in LOADING_PRAGMAS.items():
+            connection.exec_driver_sql(f"PRAGMA {name} = {value}")
+        try:
+            def flush():
+                # Parents first, for the rows of the children to reference inserted rows
+                for model in MODELS:
+                    if batches[model]:
+                        connection.execute(insert(model.__table__), batches[model])
+                        counts[model.__tablename__] += len(batches[model])
+                        batches[model] = []
+                connection.commit()
+                logger.info("Generated %s rows so far", sum(counts.values()))
+
+            taken_plates = set(connection.execute(select(Vehicle.license_plate)).scalars())
+            generator = _generate(rng, _next_ids(connection), taken_plates, clients, employees, settings, vehicles_per_client, works_per_vehicle, tasks_per_work)
+            for model, row in generator:
+                batch = batches[model]
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    flush()
+            flush()
+        finally:
+            connection.rollback()
+            for name, value in previous.items():
+                connection.exec_driver_sql(f"PRAGMA {name} = {value}")
+
+    duration = time.perf_counter() - started
+    total = sum(counts.values())
+    return {
+        "seed": seed,
+        "rows": counts,
+        "total": total,
+        "duration_s": round(duration, 2),
+        "rows_per_second": round(total / duration) if duration else total,
+    }
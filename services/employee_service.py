@@ -1,29 +1,44 @@
 import logging
+from sqlalchemy.exc import SQLAlchemyError
 from models.employee import Employee
-from utils.database import db
+from utils.database import db, use_replica
+from utils.cache import response_cache
+from utils.availability import availability_calendar
+from utils.queries import coerce_values, count_rows, delete_by_ids, delete_by_pk, select_columns, select_columns_by_pk, update_returning
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
-def get_all_employees():
+# Fields a client may change through PATCH
+EMPLOYEE_UPDATABLE_FIELDS = ("name", "email", "phone", "role", "hired_date")
+
+@use_replica
+def get_all_employees(fields=None):
     """
     Retrieve all employees.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: dict: A list of dictionaries containing employee information.
     """
     try:
+        if fields:
+            return select_columns(Employee, fields)
         employees = Employee.query.all()
         return [{"employee_id": employee.employee_id, "name": employee.name, "email": employee.email, "phone": employee.phone, "role": employee.role, "hired_date": employee.hired_date, "created_at": employee.created_at} for employee in employees]
     except Exception as e:
-        logger.error(f"Error fetching all employees: {e}")
+        logger.error("Error fetching all employees: %s", e)
         return {"error": "Internal Server Error"}
 
-def get_employee(employee_id):
+@use_replica
+def get_employee(employee_id, fields=None):
     """
     Retrieve an employee by ID.
     :param employee_id: The ID of the employee to retrieve.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: dict: A dictionary containing the employee's information or None if not found.
     """
     try:
+        if fields:
+            return select_columns_by_pk(Employee, employee_id, fields)
         # Query the database for the employee by ID
         employee = Employee.query.get(employee_id)
         if not employee:
@@ -39,9 +54,40 @@ def get_employee(employee_id):
             "created_at": employee.created_at,
         }
     except Exception as e:
-        logger.error(f"Error fetching employee {employee_id}: {e}")
+        logger.error("Error fetching employee %s: %s", employee_id, e)
         raise  # Raise the exception to let the API layer handle it
 
+@use_replica
+def count_employees():
+    """
+    Count all employees without loading them.
+    :return: int: The number of employees.
+    """
+    try:
+        return count_rows(Employee)
+    except Exception as e:
+        logger.error("Error counting employees: %s", e)
+        raise
+
+def get_available_employees(start, end, fields=None):
+    """
+    Retrieve the employees without an open task on any day from `start` to `end`.
+    Their tasks are not scanned: the busy employees are found in the availability calendar.
+    :param start: date: The first day of the range.
+    :param end: date: The last day of the range, inclusive.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
+    :return: list: The available employees, as dicts.
+    :raises ValueError: If the range is empty or beyond the availability horizon.
+    """
+    try:
+        busy = availability_calendar.busy_employees(start, end)
+        return select_columns(Employee, fields or [column.name for column in Employee.__table__.c], Employee.employee_id.not_in(busy))
+    except ValueError:
+        raise
+    except Exception as e:
+        logger.error("Error fetching the employees available from %s to %s: %s", start, end, e)
+        raise
+
 def create_employee(name, email, phone, role, hired_date):
     """
     Create a new employee.
@@ -58,9 +104,10 @@ def create_employee(name, email, phone, role, hired_date):
         employee = Employee(name=name, email=email, phone=phone, role=role, hired_date=hired_date_obj)
         db.session.add(employee)  # Save the new employee to the database
         db.session.commit()
+        response_cache.bump("employee")
         return {"employee_id": employee.employee_id, "name": employee.name, "email": employee.email, "phone": employee.phone, "role": employee.role, "hired_date": employee.hired_date, "created_at": employee.created_at}
     except Exception as e:
-        logger.error(f"Error creating employee: {e}")
+        logger.error("Error creating employee: %s", e)
         return {"error": "Internal Server Error"}
 
 
@@ -95,6 +142,7 @@ def update_employee(employee_id, name, email, phone, role, hired_date):
         employee.hired_date = hired_date_obj  # Update hired date
 
         db.session.commit()  # Commit the transaction
+        response_cache.bump("employee")
 
         return {
             "employee_id": employee.employee_id,
@@ -108,22 +156,55 @@ def update_employee(employee_id, name, email, phone, role, hired_date):
 
     except Exception as e:
         db.session.rollback()  # Rollback on error
-        logger.error(f"Error updating employee {employee_id}: {e}")
+        logger.error("Error updating employee %s: %s", employee_id, e)
         return {"error": "Internal Server Error"}, 500
 
+def patch_employee(employee_id, changes):
+    """
+    Partially update an employee with a single UPDATE ... RETURNING statement.
+    Only the fields present in `changes` are written and the row is not read first.
+    :param employee_id: The ID of the employee to update.
+    :param changes: dict: The fields to change, a subset of EMPLOYEE_UPDATABLE_FIELDS.
+    :return: dict: A dictionary containing the updated employee's information, or None if not found.
+    :raises ValueError: If `changes` has no updatable field or a malformed date.
+    """
+    try:
+        values = coerce_values(Employee, changes, EMPLOYEE_UPDATABLE_FIELDS)
+        employee = update_returning(Employee, employee_id, values)
+        response_cache.bump("employee")
+        return employee
+    except SQLAlchemyError as e:
+        logger.error("Error patching employee %s: %s", employee_id, e)
+        db.session.rollback()
+        raise
+
 def delete_employee(employee_id):
     """
-    Delete an employee.
+    Delete an employee with a single DELETE statement.
     :param employee_id: The ID of the employee to delete.
-    :return: dict: A dictionary containing the deleted employee's information.
+    :return: dict: A message confirming deletion, or None if the employee does not exist.
     """
     try:
-        employee = Employee.query.get(employee_id)
-        if not employee:
+        if not delete_by_pk(Employee, employee_id):
             return None
-        employee.delete()  # Delete the employee from the database
-        return employee
+        response_cache.bump("employee")
+        return {"message": "Employee deleted successfully"}
     except Exception as e:
-        logger.error(f"Error deleting employee {employee_id}: {e}")
+        logger.error("Error deleting employee %s: %s", employee_id, e)
+        db.session.rollback()
         return {"error": "Internal Server Error"}, 500
 
+def delete_employees(employee_ids):
+    """
+    Delete several employees with a single DELETE statement in one transaction.
+    :param employee_ids: The IDs of the employees to delete.
+    :return: int: The number of deleted employees.
+    """
+    try:
+        deleted = delete_by_ids(Employee, employee_ids)
+        response_cache.bump("employee")
+        return deleted
+    except Exception as e:
+        logger.error("Error deleting employees %s: %s", employee_ids, e)
+        db.session.rollback()
+        raise
\ No newline at end of file
@@ -1,16 +1,29 @@
 import logging
+from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 from models.invoice_item import InvoiceItem
-from utils.database import db
+from models.invoice_item_archive import InvoiceItemArchive
+from utils.database import db, use_replica
+from utils.queries import coerce_values, count_rows, delete_by_ids, delete_by_pk, select_columns, select_columns_by_pk, update_returning
+from services.archive_service import get_all_archived, get_archived
 
 logger = logging.getLogger(__name__)
 
-def get_all_invoice_items():
+# Fields a client may change through PATCH
+INVOICE_ITEM_UPDATABLE_FIELDS = ("cost", "description", "invoice_id", "task_id")
+
+@use_replica
+def get_all_invoice_items(fields=None, include_archived=False):
     """
     Retrieve all invoice_items.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
+    :param include_archived: Whether to also return the items of archived invoices, after the others.
     :return: dict: A list of dictionaries containing invoice_item information.
     """
     try:
+        archived = get_all_archived(InvoiceItem, fields) if include_archived else []
+        if fields:
+            return select_columns(InvoiceItem, fields) + archived
         invoice_items = InvoiceItem.query.all()
         return [
             {
@@ -21,21 +34,25 @@ def get_all_invoice_items():
                 "task_id": invoice_item.task_id,
             }
             for invoice_item in invoice_items
-        ]
+        ] + archived
     except Exception as e:
-        logger.error(f"Error fetching all invoice_items: {e}")
+        logger.error("Error fetching all invoice_items: %s", e)
         return {"error": "Internal Server Error"}
 
-def get_invoice_item(item_id):
+@use_replica
+def get_invoice_item(item_id, fields=None):
     """
-    Retrieve an invoice_item by ID.
+    Retrieve an invoice_item by ID, from the archive if its invoice has been archived.
     :param item_id: The ID of the invoice_item to retrieve.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: dict: A dictionary containing the invoice_item's information or None if not found.
     """
     try:
+        if fields:
+            return select_columns_by_pk(InvoiceItem, item_id, fields) or get_archived(InvoiceItem, item_id, fields)
         invoice_item = InvoiceItem.query.get(item_id)
         if not invoice_item:
-            return None
+            return get_archived(InvoiceItem, item_id)
         return {
                 "item_id": invoice_item.item_id,
                 "cost": invoice_item.cost,
@@ -44,7 +61,20 @@ def get_invoice_item(item_id):
                 "task_id": invoice_item.task_id,
         }
     except Exception as e:
-        logger.error(f"Error fetching invoice_item {item_id}: {e}")
+        logger.error("Error fetching invoice_item %s: %s", item_id, e)
+        raise
+
+@use_replica
+def count_invoice_items(include_archived=False):
+    """
+    Count all invoice items without loading them.
+    :param include_archived: Whether to also count the items of archived invoices.
+    :return: int: The number of invoice items.
+    """
+    try:
+        return count_rows(InvoiceItem) + (count_rows(InvoiceItemArchive) if include_archived else 0)
+    except Exception as e:
+        logger.error("Error counting invoice items: %s", e)
         raise
 
 def create_invoice_item(cost, description, invoice_id, task_id):
@@ -70,7 +100,7 @@ def create_invoice_item(cost, description, invoice_id, task_id):
                 "task_id": invoice_item.task_id,
         }
     except Exception as e:
-        logger.error(f"Error creating invoice_item: {e}")
+        logger.error("Error creating invoice_item: %s", e)
         db.session.rollback()
         return {"error": "Internal Server Error"}, 500
 
@@ -99,26 +129,52 @@ def update_invoice_item(item_id, cost, description, invoice_id, task_id):
                 "task_id": invoice_item.task_id,
         }
     except Exception as e:
-        logger.error(f"Error updating invoice_item {item_id}: {e}")
+        logger.error("Error updating invoice_item %s: %s", item_id, e)
         db.session.rollback()
         return {"error": "Internal Server Error"}, 500
 
+def patch_invoice_item(item_id, changes):
+    """
+    Partially update an invoice_item with a single UPDATE ... RETURNING statement.
+    Only the fields present in `changes` are written and the row is not read first.
+    :param item_id: The ID of the invoice_item to update.
+    :param changes: dict: The fields to change, a subset of INVOICE_ITEM_UPDATABLE_FIELDS.
+    :return: dict: A dictionary containing the updated invoice_item's information, or None if not found.
+    :raises ValueError: If `changes` has no updatable field or a malformed date.
+    """
+    try:
+        values = coerce_values(InvoiceItem, changes, INVOICE_ITEM_UPDATABLE_FIELDS)
+        return update_returning(InvoiceItem, item_id, values)
+    except SQLAlchemyError as e:
+        logger.error("Error patching invoice_item %s: %s", item_id, e)
+        db.session.rollback()
+        raise
+
 def delete_invoice_item(item_id):
     """
-    Delete an invoice_item.
+    Delete an invoice_item with a single DELETE statement.
     :param item_id: The ID of the invoice_item to delete.
     :return: dict: A dictionary confirming the deletion or an error message.
     """
     try:
-        invoice_item = InvoiceItem.query.get(item_id)
-        if not invoice_item:
+        if not delete_by_pk(InvoiceItem, item_id):
             return {"error": f"Invoice_item with ID {item_id} not found."}, 404
 
-        db.session.delete(invoice_item)
-        db.session.commit()
-
         return {"message": f"Invoice_item {item_id} deleted successfully."}, 200
     except Exception as e:
-        logger.error(f"Error deleting invoice_item {item_id}: {e}")
+        logger.error("Error deleting invoice_item %s: %s", item_id, e)
+        db.session.rollback()
+        return {"error": "Internal Server Error"}, 500
+
+def delete_invoice_items(item_ids):
+    """
+    Delete several invoice_items with a single DELETE statement in one transaction.
+    :param item_ids: The IDs of the invoice_items to delete.
+    :return: int: The number of deleted invoice_items.
+    """
+    try:
+        return delete_by_ids(InvoiceItem, item_ids)
+    except Exception as e:
+        logger.error("Error deleting invoice_items %s: %s", item_ids, e)
         db.session.rollback()
-        return {"error": "Internal Server Error"}, 500
\ No newline at end of file
+        raise
\ No newline at end of file
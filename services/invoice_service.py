@@ -1,16 +1,36 @@
 import logging
+import time
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 from models.invoice import Invoice
-from utils.database import db
+from models.invoice_archive import InvoiceArchive
+from models.setting import Setting
+from utils.database import db, use_replica
+from utils.queries import coerce_values, count_rows, delete_by_ids, delete_by_pk, select_columns, select_columns_by_pk, update_returning
+from errors.errors import VersionConflictError
+from services.archive_service import get_all_archived, get_archived
 
 logger = logging.getLogger(__name__)
 
-def get_all_invoices():
+# Fields a client may change through PATCH
+INVOICE_UPDATABLE_FIELDS = ("client_id", "iva", "total", "total_with_iva", "finalized")
+
+# Setting holding the current IVA rate, as a fraction (e.g. "0,23")
+IVA_SETTING_KEY = "iva"
+
+@use_replica
+def get_all_invoices(fields=None, include_archived=False):
     """
     Retrieve all invoices.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
+    :param include_archived: Whether to also return the archived invoices, after the others.
     :return: dict: A list of dictionaries containing invoice information.
     """
     try:
+        archived = get_all_archived(Invoice, fields) if include_archived else []
+        if fields:
+            return select_columns(Invoice, fields) + archived
         invoices = Invoice.query.all()
         return [
             {
@@ -20,23 +40,31 @@ def get_all_invoices():
                 "iva": invoice.iva,
                 "total": invoice.total,
                 "total_with_iva": invoice.total_with_iva,
+                "finalized": invoice.finalized,
+                "version": invoice.version,
             }
             for invoice in invoices
-        ]
+        ] + archived
     except Exception as e:
-        logger.error(f"Error fetching all invoices: {e}")
+        logger.error("Error fetching all invoices: %s", e)
         return {"error": "Internal Server Error"}
 
-def get_invoice(invoice_id):
+@use_replica
+def get_invoice(invoice_id, fields=None):
     """
-    Retrieve an invoice by ID.
+    Retrieve an invoice by ID, from the archive if it has been archived.
     :param invoice_id: The ID of the invoice to retrieve.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: dict: A dictionary containing the invoice's information or None if not found.
     """
     try:
+        if fields:
+            # The version is always selected, as the API derives the ETag from it
+            fields = list(dict.fromkeys([*fields, "version"]))
+            return select_columns_by_pk(Invoice, invoice_id, fields) or get_archived(Invoice, invoice_id, fields)
         invoice = Invoice.query.get(invoice_id)
         if not invoice:
-            return None
+            return get_archived(Invoice, invoice_id)
         return {
             "invoice_id": invoice.invoice_id,
             "client_id": invoice.client_id,
@@ -44,9 +72,24 @@ def get_invoice(invoice_id):
             "iva": invoice.iva,
             "total": invoice.total,
             "total_with_iva": invoice.total_with_iva,
+            "finalized": invoice.finalized,
+            "version": invoice.version,
         }
     except Exception as e:
-        logger.error(f"Error fetching invoice {invoice_id}: {e}")
+        logger.error("Error fetching invoice %s: %s", invoice_id, e)
+        raise
+
+@use_replica
+def count_invoices(include_archived=False):
+    """
+    Count all invoices without loading them.
+    :param include_archived: Whether to also count the archived invoices.
+    :return: int: The number of invoices.
+    """
+    try:
+        return count_rows(Invoice) + (count_rows(InvoiceArchive) if include_archived else 0)
+    except Exception as e:
+        logger.error("Error counting invoices: %s", e)
         raise
 
 def create_invoice(client_id, iva, total, total_with_iva):
@@ -75,64 +118,151 @@ def create_invoice(client_id, iva, total, total_with_iva):
             "iva": invoice.iva,
             "total": invoice.total,
             "total_with_iva": invoice.total_with_iva,
+            "finalized": invoice.finalized,
+            "version": invoice.version,
         }
     except Exception as e:
-        logger.error(f"Error creating invoice: {e}")
+        logger.error("Error creating invoice: %s", e)
         db.session.rollback()
         return {"error": "Internal Server Error"}, 500
 
-def update_invoice(invoice_id, client_id, iva, total, total_with_iva):
+def update_invoice(invoice_id, client_id, iva, total, total_with_iva, expected_version=None):
     """
-    Update an existing invoice.
+    Update an existing invoice with a single UPDATE statement.
     :param invoice_id: The ID of the invoice to update.
     :param client_id: The new client ID.
-    :param issued_at: The new issue date.
     :param iva: The new IVA.
     :param total: The new total before IVA.
     :param total_with_iva: The new total after IVA.
-    :return: dict: A dictionary containing the updated invoice's information.
+    :param expected_version: The version the client last read (If-Match), or None to skip the check.
+    :return: dict: A dictionary containing the updated invoice's information, or None if not found.
+    :raises VersionConflictError: If the invoice was modified since `expected_version`.
     """
     try:
-
-        invoice = Invoice.query.get(invoice_id)
-        if not invoice:
-            return {"error": f"Invoice with ID {invoice_id} not found."}, 404
-
-        invoice.client_id = client_id
-        invoice.iva = iva
-        invoice.total = total
-        invoice.total_with_iva = total_with_iva
-
-        db.session.commit()
-        return {
-            "invoice_id": invoice.invoice_id,
-            "client_id": invoice.client_id,
-            "issued_at": invoice.issued_at,
-            "iva": invoice.iva,
-            "total": invoice.total,
-            "total_with_iva": invoice.total_with_iva,
-        }
+        return update_returning(Invoice, invoice_id, {
+            "client_id": client_id,
+            "iva": iva,
+            "total": total,
+            "total_with_iva": total_with_iva,
+        }, expected_version)
+    except VersionConflictError:
+        raise
     except Exception as e:
-        logger.error(f"Error updating invoice {invoice_id}: {e}")
+        logger.error("Error updating invoice %s: %s", invoice_id, e)
         db.session.rollback()
         return {"error": "Internal Server Error"}, 500
 
+def patch_invoice(invoice_id, changes, expected_version=None):
+    """
+    Partially update an invoice with a single UPDATE ... RETURNING statement.
+    Only the fields present in `changes` are written and the row is not read first.
+    :param invoice_id: The ID of the invoice to update.
+    :param changes: dict: The fields to change, a subset of INVOICE_UPDATABLE_FIELDS.
+    :param expected_version: The version the client last read (If-Match), or None to skip the check.
+    :return: dict: A dictionary containing the updated invoice's information, or None if not found.
+    :raises ValueError: If `changes` has no updatable field or a malformed date.
+    :raises VersionConflictError: If the invoice was modified since `expected_version`.
+    """
+    try:
+        values = coerce_values(Invoice, changes, INVOICE_UPDATABLE_FIELDS)
+        return update_returning(Invoice, invoice_id, values, expected_version)
+    except SQLAlchemyError as e:
+        logger.error("Error patching invoice %s: %s", invoice_id, e)
+        db.session.rollback()
+        raise
+
 def delete_invoice(invoice_id):
     """
-    Delete an invoice.
+    Delete an invoice with a single DELETE statement.
     :param invoice_id: The ID of the invoice to delete.
     :return: dict: A dictionary confirming the deletion or an error message.
     """
     try:
-        invoice = Invoice.query.get(invoice_id)
-        if not invoice:
+        if not delete_by_pk(Invoice, invoice_id):
             return {"error": f"Invoice with ID {invoice_id} not found."}, 404
 
-        db.session.delete(invoice)
-        db.session.commit()
-
         return {"message": f"Invoice {invoice_id} deleted successfully."}, 200
     except Exception as e:
-        logger.error(f"Error deleting invoice {invoice_id}: {e}")
+        logger.error("Error deleting invoice %s: %s", invoice_id, e)
         db.session.rollback()
-        return {"error": "Internal Server Error"}, 500
\ No newline at end of file
+        return {"error": "Internal Server Error"}, 500
+
+def delete_invoices(invoice_ids):
+    """
+    Delete several invoices with a single DELETE statement in one transaction.
+    :param invoice_ids: The IDs of the invoices to delete.
+    :return: int: The number of deleted invoices.
+    """
+    try:
+        return delete_by_ids(Invoice, invoice_ids)
+    except Exception as e:
+        logger.error("Error deleting invoices %s: %s", invoice_ids, e)
+        db.session.rollback()
+        raise
+
+def apply_iva_rate(rate=None, chunk_size=5000):
+    """
+    Apply an IVA rate to every invoice that is not finalized with set-based UPDATE statements.
+    Each statement covers a range of `chunk_size` invoice IDs and is committed on its own, so the
+    write lock is held for one chunk at a time rather than for the whole table.
+    :param rate: The IVA rate as a fraction (e.g. 0.23). Read from the "iva" setting when omitted.
+    :param chunk_size: The width of the invoice ID range updated per transaction.
+    :return: dict: The rate applied, the number of updated invoices and chunks, and the duration in milliseconds.
+    :raises ValueError: If the rate is missing, malformed or not between 0 and 1.
+    """
+    rate = _parse_iva_rate(_iva_setting() if rate is None else rate)
+    started = time.perf_counter()
+    table = Invoice.__table__
+    open_invoices = table.c.finalized.is_(False)
+    low, high = db.session.execute(select(func.min(table.c.invoice_id), func.max(table.c.invoice_id)).where(open_invoices)).one()
+
+    updated = chunks = 0
+    start = low
+    try:
+        while start is not None and start <= high:
+            statement = (
+                update(table)
+                .where(open_invoices, table.c.invoice_id >= start, table.c.invoice_id < start + chunk_size)
+                .values(iva=rate, total_with_iva=table.c.total * (1 + rate), version=table.c.version + 1)
+            )
+            updated += db.session.execute(statement).rowcount
+            db.session.commit()
+            chunks += 1
+            start += chunk_size
+    except SQLAlchemyError as e:
+        logger.error("Error applying IVA rate %s after %s invoices: %s", rate, updated, e)
+        db.session.rollback()
+        raise
+
+    return {
+        "rate": rate,
+        "updated": updated,
+        "chunks": chunks,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+def _iva_setting():
+    """
+    Read the current IVA rate from the settings.
+    :return: str: The raw setting value.
+    :raises ValueError: If the setting does not exist.
+    """
+    value = db.session.execute(select(Setting.value).where(Setting.key_name == IVA_SETTING_KEY)).scalar()
+    if value is None:
+        raise ValueError(f"No IVA rate given and no '{IVA_SETTING_KEY}' setting found.")
+    return value
+
+def _parse_iva_rate(value):
+    """
+    Convert an IVA rate given as a number or a string with a decimal point or comma.
+    :param value: The rate, e.g. 0.23 or "0,23".
+    :return: float: The rate as a fraction.
+    :raises ValueError: If the value is not a number between 0 and 1.
+    """
+    try:
+        rate = float(str(value).strip().replace(",", "."))
+    except ValueError:
+        raise ValueError(f"Invalid IVA rate '{value}'.")
+    if not 0 <= rate < 1:
+        raise ValueError(f"IVA rate {rate} must be a fraction between 0 and 1, e.g. 0.23.")
+    return rate
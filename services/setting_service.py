@@ -1,15 +1,24 @@
 import logging
-from utils.database import db
+from sqlalchemy.exc import SQLAlchemyError
+from utils.database import db, use_replica
+from utils.queries import coerce_values, count_rows, delete_by_ids, delete_by_pk, select_columns, select_columns_by_pk, update_returning
 from models.setting import Setting
 
 logger = logging.getLogger(__name__)
 
-def get_all_settings():
+# Fields a client may change through PATCH
+SETTING_UPDATABLE_FIELDS = ("key_name", "value")
+
+@use_replica
+def get_all_settings(fields=None):
     """
     Retrieve all settings.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: list: A list of dictionaries containing information about all settings.
     """
     try:
+        if fields:
+            return select_columns(Setting, fields)
         settings = Setting.query.all()  # Retrieve all settings from the database
         return [
             {
@@ -21,16 +30,20 @@ def get_all_settings():
             for setting in settings
         ]
     except Exception as e:
-        logger.error(f"Error fetching all settings: {e}")
+        logger.error("Error fetching all settings: %s", e)
         return {"error": "Internal Server Error"}
 
-def get_setting(setting_id):
+@use_replica
+def get_setting(setting_id, fields=None):
     """
     Retrieve a setting by ID.
     :param setting_id: The ID of the setting to retrieve.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: dict: A dictionary containing the setting's information or an error message.
     """
     try:
+        if fields:
+            return select_columns_by_pk(Setting, setting_id, fields)
         setting = Setting.query.get(setting_id)
         if not setting:
             return None
@@ -41,9 +54,21 @@ def get_setting(setting_id):
             "updated_at": setting.updated_at,
         }
     except Exception as e:
-        logger.error(f"Error fetching setting {setting_id}: {e}")
+        logger.error("Error fetching setting %s: %s", setting_id, e)
         return {"error": "Internal Server Error"}
 
+@use_replica
+def count_settings():
+    """
+    Count all settings without loading them.
+    :return: int: The number of settings.
+    """
+    try:
+        return count_rows(Setting)
+    except Exception as e:
+        logger.error("Error counting settings: %s", e)
+        raise
+
 def create_setting(key_name, value):
     """
     Create a new setting.
@@ -62,7 +87,7 @@ def create_setting(key_name, value):
             "updated_at": setting.updated_at,
         }
     except Exception as e:
-        logger.error(f"Error creating setting: {e}")
+        logger.error("Error creating setting: %s", e)
         return {"error": "Internal Server Error"}, 500
 
 def update_setting(setting_id, key_name, value):
@@ -87,23 +112,50 @@ def update_setting(setting_id, key_name, value):
             "updated_at": setting.updated_at,
         }, 200
     except Exception as e:
-        logger.error(f"Error updating setting {setting_id}: {e}")
+        logger.error("Error updating setting %s: %s", setting_id, e)
         return {"error": "Internal Server Error"}, 500
 
+def patch_setting(setting_id, changes):
+    """
+    Partially update a setting with a single UPDATE ... RETURNING statement.
+    Only the fields present in `changes` are written and the row is not read first.
+    :param setting_id: The ID of the setting to update.
+    :param changes: dict: The fields to change, a subset of SETTING_UPDATABLE_FIELDS.
+    :return: dict: A dictionary containing the updated setting's information, or None if not found.
+    :raises ValueError: If `changes` has no updatable field.
+    """
+    try:
+        values = coerce_values(Setting, changes, SETTING_UPDATABLE_FIELDS)
+        return update_returning(Setting, setting_id, values)
+    except SQLAlchemyError as e:
+        logger.error("Error patching setting %s: %s", setting_id, e)
+        db.session.rollback()
+        raise
+
 def delete_setting(setting_id):
     """
-    Delete a setting.
+    Delete a setting with a single DELETE statement.
     :param setting_id: The ID of the setting to delete.
     :return: tuple: A dictionary containing a success message or an error message and the HTTP status code.
     """
     try:
-        setting = Setting.query.get(setting_id)
-        if not setting:
+        if not delete_by_pk(Setting, setting_id):
             return {"error": "Setting not found"}, 404
-        db.session.delete(setting)
-        db.session.commit()
         return {"message": "Setting deleted successfully"}, 200
     except Exception as e:
-        logger.error(f"Error deleting setting {setting_id}: {e}")
+        logger.error("Error deleting setting %s: %s", setting_id, e)
+        db.session.rollback()
         return {"error": "Internal Server Error"}, 500
 
+def delete_settings(setting_ids):
+    """
+    Delete several settings with a single DELETE statement in one transaction.
+    :param setting_ids: The IDs of the settings to delete.
+    :return: int: The number of deleted settings.
+    """
+    try:
+        return delete_by_ids(Setting, setting_ids)
+    except Exception as e:
+        logger.error("Error deleting settings %s: %s", setting_ids, e)
+        db.session.rollback()
+        raise
\ No newline at end of file
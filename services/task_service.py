@@ -1,17 +1,48 @@
+import heapq
 import logging
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
+from models.employee import Employee
 from models.task import Task
-from utils.database import db
+from models.task_archive import TaskArchive
+from models.status import validate_status
+from utils.database import db, use_replica
+from utils.queries import coerce_values, count_rows, delete_by_ids, delete_by_pk, select_columns, select_columns_by_pk, update_returning
+from errors.errors import VersionConflictError
+from utils.events import publish_status
+from utils.availability import BUSY_STATUSES, availability_calendar
+from services.archive_service import get_all_archived, get_archived
 
 logger = logging.getLogger(__name__)
 
-def get_all_tasks():
+# Fields a client may change through PATCH
+TASK_UPDATABLE_FIELDS = ("description", "employee_id", "start_date", "end_date", "status", "work_id")
+
+# Fields of a task sent for automatic assignment, and the required ones
+AUTO_ASSIGN_FIELDS = ("description", "start_date", "end_date", "status", "work_id")
+AUTO_ASSIGN_REQUIRED_FIELDS = ("description", "start_date", "work_id")
+
+# Role of the employees tasks are assigned to when the task does not name one
+DEFAULT_ASSIGNEE_ROLE = "mechanic"
+
+@use_replica
+def get_all_tasks(fields=None, statuses=None, include_archived=False):
     """
-    Retrieve all tasks.
+    Retrieve all tasks, optionally only those in the given statuses.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
+    :param statuses: Optional list of status names to filter on, served by the status indexes.
+    :param include_archived: Whether to also return the archived tasks, after the others.
     :return: dict: A list of dictionaries containing task information.
     """
     try:
-        tasks = Task.query.all()
+        criteria = [Task.status.in_(statuses)] if statuses else []
+        archived = []
+        if include_archived:
+            archived = get_all_archived(Task, fields, *([TaskArchive.status.in_(statuses)] if statuses else []))
+        if fields:
+            return select_columns(Task, fields, *criteria) + archived
+        tasks = Task.query.filter(*criteria).all()
         return [
             {
                 "task_id": task.task_id,
@@ -22,23 +53,30 @@ def get_all_tasks():
                 "end_date": task.end_date,
                 "status": task.status,
                 "work_id": task.work_id,
+                "version": task.version,
             }
             for task in tasks
-        ]
+        ] + archived
     except Exception as e:
-        logger.error(f"Error fetching all tasks: {e}")
+        logger.error("Error fetching all tasks: %s", e)
         return {"error": "Internal Server Error"}
 
-def get_task(task_id):
+@use_replica
+def get_task(task_id, fields=None):
     """
-    Retrieve a task by ID.
+    Retrieve a task by ID, from the archive if it has been archived.
     :param task_id: The ID of the task to retrieve.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: dict: A dictionary containing the task's information or None if not found.
     """
     try:
+        if fields:
+            # The version is always selected, as the API derives the ETag from it
+            fields = list(dict.fromkeys([*fields, "version"]))
+            return select_columns_by_pk(Task, task_id, fields) or get_archived(Task, task_id, fields)
         task = Task.query.get(task_id)
         if not task:
-            return None
+            return get_archived(Task, task_id)
         return {
             "task_id": task.task_id,
             "created_at": task.created_at,
@@ -48,9 +86,29 @@ def get_task(task_id):
             "end_date": task.end_date,
             "status": task.status,
             "work_id": task.work_id,
+            "version": task.version,
         }
     except Exception as e:
-        logger.error(f"Error fetching task {task_id}: {e}")
+        logger.error("Error fetching task %s: %s", task_id, e)
+        raise
+
+@use_replica
+def count_tasks(statuses=None, include_archived=False):
+    """
+    Count all tasks without loading them, optionally only those in the given statuses.
+    :param statuses: Optional list of status names to filter on.
+    :param include_archived: Whether to also count the archived tasks.
+    :return: int: The number of tasks.
+    """
+    try:
+        archived = 0
+        if include_archived:
+            archived = count_rows(TaskArchive, *([TaskArchive.status.in_(statuses)] if statuses else []))
+        if statuses:
+            return count_rows(Task, Task.status.in_(statuses)) + archived
+        return count_rows(Task) + archived
+    except Exception as e:
+        logger.error("Error counting tasks: %s", e)
         raise
 
 def create_task(description, employee_id, start_date, end_date, status, work_id):
@@ -63,7 +121,9 @@ def create_task(description, employee_id, start_date, end_date, status, work_id)
     :param status: The status of the task.
     :param work_id: The ID of the work associated with the task.
     :return: dict: A dictionary containing the newly created task's information.
+    :raises ValueError: If `status` is not one of models.status.STATUSES.
     """
+    validate_status(status)
     try:
         if isinstance(start_date, str):
             start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
@@ -81,7 +141,7 @@ def create_task(description, employee_id, start_date, end_date, status, work_id)
         db.session.add(new_task)
         db.session.commit()
 
-        return {
+        task = {
             "task_id": new_task.task_id,
             "created_at": new_task.created_at,
             "description": new_task.description,
@@ -90,15 +150,107 @@ def create_task(description, employee_id, start_date, end_date, status, work_id)
             "end_date": new_task.end_date,
             "status": new_task.status,
             "work_id": new_task.work_id,
+            "version": new_task.version,
         }
+        availability_calendar.record_task(task)
+        return task
     except Exception as e:
-        logger.error(f"Error creating task: {e}")
+        logger.error("Error creating task: %s", e)
         db.session.rollback()
         return {"error": "Internal Server Error"}
 
-def update_task(task_id, description, employee_id, start_date, end_date, status, work_id):
+def auto_assign_tasks(tasks):
+    """
+    Create tasks without an employee, each assigned to the least-loaded employee of its role.
+    The load of an employee is their number of pending and in-progress tasks, read with one
+    grouped query. Employees are kept in a heap per role keyed on that load, and the tasks are
+    assigned in one pass in the order given: each goes to the least-loaded employee who is free
+    on every day of the task according to the availability calendar, or to the least-loaded one
+    if nobody is, whose load and days are updated before the next task. Tasks outside the
+    availability horizon are assigned on load alone. The transaction takes the database write lock
+    (BEGIN IMMEDIATE) before the loads and the calendar are read, so concurrent requests, in this
+    or another worker, wait for it and see its tasks instead of choosing the same employees.
+    :param tasks: list: dicts with the description, start_date, end_date, status and work_id of each
+                  task, and optionally the role of its assignee (DEFAULT_ASSIGNEE_ROLE when omitted).
+    :return: list: The created tasks, in the order given.
+    :raises ValueError: If a task is missing a required field, has a field not listed above, a malformed
+                        date or an unknown status, or if no employee has the role of a task.
     """
-    Update an existing task.
+    rows = []
+    roles = []
+    for task in tasks:
+        unknown = sorted(set(task) - set(AUTO_ASSIGN_FIELDS) - {"role"})
+        if unknown:
+            raise ValueError(f"Unknown task field {', '.join(unknown)}; expected {', '.join(AUTO_ASSIGN_FIELDS)} or role.")
+        missing = [field for field in AUTO_ASSIGN_REQUIRED_FIELDS if task.get(field) is None]
+        if missing:
+            raise ValueError(f"Every task needs {', '.join(AUTO_ASSIGN_REQUIRED_FIELDS)}; missing {', '.join(missing)}.")
+        row = coerce_values(Task, task, AUTO_ASSIGN_FIELDS)
+        row.setdefault("status", "pending")
+        validate_status(row["status"])
+        row.setdefault("end_date", None)
+        if row["end_date"] is not None and row["end_date"] < row["start_date"]:
+            raise ValueError(f"A task cannot end ({row['end_date']}) before it starts ({row['start_date']}).")
+        rows.append(row)
+        roles.append(task.get("role") or DEFAULT_ASSIGNEE_ROLE)
+    if not rows:
+        raise ValueError("At least one task is required.")
+
+    try:
+        db.session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+        loads = db.session.execute(
+            select(Employee.employee_id, Employee.role, func.count(Task.task_id))
+            .outerjoin(Task, (Task.employee_id == Employee.employee_id) & Task.status.in_(BUSY_STATUSES))
+            .where(Employee.role.in_(set(roles)))
+            .group_by(Employee.employee_id)
+        ).all()
+        heaps = {role: [] for role in roles}
+        for employee_id, role, load in loads:
+            heaps[role].append((load, employee_id))
+        unstaffed = sorted(role for role, heap in heaps.items() if not heap)
+        if unstaffed:
+            raise ValueError(f"No employee has the role {', '.join(unstaffed)}.")
+        for heap in heaps.values():
+            heapq.heapify(heap)
+
+        busy = availability_calendar.busy_bitmaps()
+        for row, role in zip(rows, roles):
+            heap = heaps[role]
+            window = availability_calendar.days_mask(row["start_date"], row["end_date"])
+            # Set aside the least-loaded employees until one is free during the task
+            skipped = []
+            while heap and busy.get(heap[0][1], 0) & window:
+                skipped.append(heapq.heappop(heap))
+            load, employee_id = heapq.heappop(heap) if heap else skipped.pop(0)
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+            if row["status"] in BUSY_STATUSES:
+                load += 1
+                busy[employee_id] = busy.get(employee_id, 0) | window
+            heapq.heappush(heap, (load, employee_id))
+            row["employee_id"] = employee_id
+
+        table = Task.__table__
+        created = db.session.execute(insert(table).returning(*table.c, sort_by_parameter_order=True), rows)
+        created = [dict(row._mapping) for row in created]
+        db.session.commit()
+    except ValueError:
+        db.session.rollback()
+        raise
+    except SQLAlchemyError as e:
+        logger.error("Error auto-assigning %s tasks: %s", len(rows), e)
+        db.session.rollback()
+        raise
+
+    for task in created:
+        availability_calendar.record_task(task)
+    logger.info("Auto-assigned %s tasks", len(created))
+    return created
+
+def update_task(task_id, description, employee_id, start_date, end_date, status, work_id, expected_version=None):
+    """
+    Update an existing task with a single UPDATE statement.
+    The committed status is published to the event hub (GET /api/events).
     :param task_id: The ID of the task to update.
     :param description: The new description of the task.
     :param employee_id: The new employee ID.
@@ -106,8 +258,12 @@ def update_task(task_id, description, employee_id, start_date, end_date, status,
     :param end_date: The new end date.
     :param status: The new status.
     :param work_id: The new work ID.
-    :return: dict: A dictionary containing the updated task's information.
+    :param expected_version: The version the client last read (If-Match), or None to skip the check.
+    :return: dict: A dictionary containing the updated task's information, or None if not found.
+    :raises ValueError: If `status` is not one of models.status.STATUSES or a date is malformed.
+    :raises VersionConflictError: If the task was modified since `expected_version`.
     """
+    validate_status(status)
     try:
         if isinstance(start_date, str):
             start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
@@ -115,45 +271,76 @@ def update_task(task_id, description, employee_id, start_date, end_date, status,
         if isinstance(end_date, str):
             end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
 
-        task = Task.query.get(task_id)
-        if not task:
-            return None
-        task.description = description
-        task.employee_id = employee_id
-        task.start_date = start_date
-        task.end_date = end_date
-        task.status = status
-        task.work_id = work_id
-        db.session.commit()
-        return {
-            "task_id": task.task_id,
-            "created_at": task.created_at,
-            "description": task.description,
-            "employee_id": task.employee_id,
-            "start_date": task.start_date,
-            "end_date": task.end_date,
-            "status": task.status,
-            "work_id": task.work_id,
-        }
-    except Exception as e:
-        logger.error(f"Error updating task {task_id}: {e}")
+        task = update_returning(Task, task_id, {
+            "description": description,
+            "employee_id": employee_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "status": status,
+            "work_id": work_id,
+        }, expected_version)
+        if task:
+            availability_calendar.record_task(task)
+            publish_status("task", task)
+        return task
+    except SQLAlchemyError as e:
+        logger.error("Error updating task %s: %s", task_id, e)
         db.session.rollback()
-        return {"error": "Internal Server Error"}
+        raise
+
+def patch_task(task_id, changes, expected_version=None):
+    """
+    Partially update a task with a single UPDATE ... RETURNING statement.
+    Only the fields present in `changes` are written and the row is not read first.
+    A changed status is published to the event hub once committed.
+    :param task_id: The ID of the task to update.
+    :param changes: dict: The fields to change, a subset of TASK_UPDATABLE_FIELDS.
+    :param expected_version: The version the client last read (If-Match), or None to skip the check.
+    :return: dict: A dictionary containing the updated task's information, or None if not found.
+    :raises ValueError: If `changes` has no updatable field, a malformed date or an unknown status.
+    :raises VersionConflictError: If the task was modified since `expected_version`.
+    """
+    try:
+        values = coerce_values(Task, changes, TASK_UPDATABLE_FIELDS)
+        validate_status(values.get("status"))
+        task = update_returning(Task, task_id, values, expected_version)
+        if task:
+            availability_calendar.record_task(task)
+        if task and "status" in values:
+            publish_status("task", task)
+        return task
+    except SQLAlchemyError as e:
+        logger.error("Error patching task %s: %s", task_id, e)
+        db.session.rollback()
+        raise
 
 def delete_task(task_id):
     """
-    Delete a task by ID.
+    Delete a task by ID with a single DELETE statement.
     :param task_id: The ID of the task to delete.
-    :return: dict: A dictionary containing a success message or an error message.
+    :return: dict: A dictionary containing a success message, or None if the task does not exist.
     """
     try:
-        task = Task.query.get(task_id)
-        if not task:
+        if not delete_by_pk(Task, task_id):
             return None
-        db.session.delete(task)
-        db.session.commit()
+        availability_calendar.forget_tasks(task_id)
         return {"message": "Task successfully deleted"}
     except Exception as e:
-        logger.error(f"Error deleting task {task_id}: {e}")
+        logger.error("Error deleting task %s: %s", task_id, e)
+        db.session.rollback()
+        return {"error": "Internal Server Error"}
+
+def delete_tasks(task_ids):
+    """
+    Delete several tasks with a single DELETE statement in one transaction.
+    :param task_ids: The IDs of the tasks to delete.
+    :return: int: The number of deleted tasks.
+    """
+    try:
+        deleted = delete_by_ids(Task, task_ids)
+        availability_calendar.forget_tasks(*task_ids)
+        return deleted
+    except Exception as e:
+        logger.error("Error deleting tasks %s: %s", task_ids, e)
         db.session.rollback()
-        return {"error": "Internal Server Error"}
\ No newline at end of file
+        raise
\ No newline at end of file
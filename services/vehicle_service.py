@@ -1,16 +1,31 @@
 import logging
+from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
-from utils.database import db
+from sqlalchemy import exists, select
+from utils.database import db, use_replica
+from utils.cache import response_cache
+from utils.queries import coerce_values, count_rows, delete_by_ids, delete_by_pk, select_columns, select_columns_by_pk, update_returning
+from models.invoice import Invoice
+from models.invoice_item import InvoiceItem
+from models.task import Task
 from models.vehicle import Vehicle
+from models.work import Work
 
 logger = logging.getLogger(__name__)
 
-def get_all_vehicles():
+# Fields a client may change through PATCH
+VEHICLE_UPDATABLE_FIELDS = ("brand", "client_id", "license_plate", "model", "year")
+
+@use_replica
+def get_all_vehicles(fields=None):
     """
     Retrieve all vehicles.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: list: A list of dictionaries containing information about all vehicles.
     """
     try:
+        if fields:
+            return select_columns(Vehicle, fields)
         vehicles = Vehicle.query.all()
         return [
             {
@@ -25,16 +40,20 @@ def get_all_vehicles():
             for vehicle in vehicles
         ]
     except Exception as e:
-        logger.error(f"Error fetching vehicles: {e}")
+        logger.error("Error fetching vehicles: %s", e)
         return {"error": "Internal Server Error"}
 
-def get_vehicle(vehicle_id):
+@use_replica
+def get_vehicle(vehicle_id, fields=None):
     """
     Retrieve a vehicle by ID.
     :param vehicle_id: The ID of the vehicle to retrieve.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: dict: A dictionary containing the vehicle's information or an error message.
     """
     try:
+        if fields:
+            return select_columns_by_pk(Vehicle, vehicle_id, fields)
         vehicle = Vehicle.query.get(vehicle_id)
         if not vehicle:
             return None
@@ -48,9 +67,102 @@ def get_vehicle(vehicle_id):
             "year": vehicle.year,
         }
     except Exception as e:
-        logger.error(f"Error fetching vehicle {vehicle_id}: {e}")
+        logger.error("Error fetching vehicle %s: %s", vehicle_id, e)
         return {"error": "Internal Server Error"}
 
+@use_replica
+def count_vehicles():
+    """
+    Count all vehicles without loading them.
+    :return: int: The number of vehicles.
+    """
+    try:
+        return count_rows(Vehicle)
+    except Exception as e:
+        logger.error("Error counting vehicles: %s", e)
+        raise
+
+@use_replica
+def get_vehicle_history(vehicle_id):
+    """
+    Retrieve the works of a vehicle, their tasks and their invoice items in chronological order.
+    A single query joins the four tables through their foreign key indexes, ordered by work start date,
+    then task start date, then invoice issue date, so its cost depends only on the vehicle's own history.
+    The rows are read from the cursor as the returned iterator is consumed.
+    :param vehicle_id: The ID of the vehicle.
+    :return: iterator: Event dictionaries with a "type" of work, task or invoice_item and a "date",
+        or None if the vehicle does not exist.
+    """
+    try:
+        if not db.session.execute(select(exists().where(Vehicle.vehicle_id == vehicle_id))).scalar():
+            return None
+        statement = (
+            select(
+                Work.work_id, Work.description.label("work_description"), Work.status.label("work_status"),
+                Work.cost.label("work_cost"), Work.start_date.label("work_start_date"), Work.end_date.label("work_end_date"),
+                Task.task_id, Task.description.label("task_description"), Task.employee_id,
+                Task.status.label("task_status"), Task.start_date.label("task_start_date"), Task.end_date.label("task_end_date"),
+                InvoiceItem.item_id, InvoiceItem.description.label("item_description"), InvoiceItem.cost.label("item_cost"),
+                InvoiceItem.invoice_id, Invoice.issued_at,
+            )
+            .select_from(Work)
+            .outerjoin(Task, Task.work_id == Work.work_id)
+            .outerjoin(InvoiceItem, InvoiceItem.task_id == Task.task_id)
+            .outerjoin(Invoice, Invoice.invoice_id == InvoiceItem.invoice_id)
+            .where(Work.vehicle_id == vehicle_id)
+            .order_by(Work.start_date, Work.work_id, Task.start_date, Task.task_id, Invoice.issued_at, InvoiceItem.item_id)
+        )
+        # Executed here, so that the query is routed while the replica read is active
+        return _history_events(db.session.execute(statement))
+    except Exception as e:
+        logger.error("Error fetching history of vehicle %s: %s", vehicle_id, e)
+        raise
+
+def _history_events(rows):
+    """
+    Turn the joined history rows into work, task and invoice item events.
+    A work or task spans consecutive rows, one per item below it, and is emitted once.
+    :param rows: The result of the history query.
+    :return: iterator: Event dictionaries.
+    """
+    work_id = task_id = None
+    for row in rows:
+        if row.work_id != work_id:
+            work_id, task_id = row.work_id, None
+            yield {
+                "type": "work",
+                "date": row.work_start_date,
+                "work_id": row.work_id,
+                "description": row.work_description,
+                "status": row.work_status,
+                "cost": row.work_cost,
+                "start_date": row.work_start_date,
+                "end_date": row.work_end_date,
+            }
+        if row.task_id is not None and row.task_id != task_id:
+            task_id = row.task_id
+            yield {
+                "type": "task",
+                "date": row.task_start_date,
+                "task_id": row.task_id,
+                "work_id": row.work_id,
+                "description": row.task_description,
+                "employee_id": row.employee_id,
+                "status": row.task_status,
+                "start_date": row.task_start_date,
+                "end_date": row.task_end_date,
+            }
+        if row.item_id is not None:
+            yield {
+                "type": "invoice_item",
+                "date": row.issued_at,
+                "item_id": row.item_id,
+                "task_id": row.task_id,
+                "invoice_id": row.invoice_id,
+                "description": row.item_description,
+                "cost": row.item_cost,
+            }
+
 def create_vehicle(brand, client_id, license_plate, model, year):
     """
     Create a new vehicle.
@@ -70,6 +182,7 @@ def create_vehicle(brand, client_id, license_plate, model, year):
         db.session.add(vehicle)
         # Commit the transaction
         db.session.commit()
+        response_cache.bump("vehicle")
         # Return the newly created vehicle
         return {
             "vehicle_id": vehicle.vehicle_id,
@@ -82,7 +195,7 @@ def create_vehicle(brand, client_id, license_plate, model, year):
         }
     except Exception as e:
         # If an error occurs, rollback the transaction
-        logger.error(f"Error creating vehicle: {e}")
+        logger.error("Error creating vehicle: %s", e)
         db.session.rollback()
         return {"error": "Internal Server Error"}
 
@@ -106,6 +219,7 @@ def update_vehicle(vehicle_id, client_id, brand, license_plate, model, year):
         vehicle.year = year
         # Commit the transaction
         db.session.commit()
+        response_cache.bump("vehicle")
         return {
             "vehicle_id": vehicle.vehicle_id,
             "brand": vehicle.brand,
@@ -118,26 +232,56 @@ def update_vehicle(vehicle_id, client_id, brand, license_plate, model, year):
     except Exception as e:
         # If an error occurs, rollback the transaction
         db.session.rollback()
-        logger.error(f"Error updating vehicle {vehicle_id}: {e}")
+        logger.error("Error updating vehicle %s: %s", vehicle_id, e)
         return {"error": "Internal Server Error"}
 
+def patch_vehicle(vehicle_id, changes):
+    """
+    Partially update a vehicle with a single UPDATE ... RETURNING statement.
+    Only the fields present in `changes` are written and the row is not read first.
+    :param vehicle_id: The ID of the vehicle to update.
+    :param changes: dict: The fields to change, a subset of VEHICLE_UPDATABLE_FIELDS.
+    :return: dict: A dictionary containing the updated vehicle's information, or None if not found.
+    :raises ValueError: If `changes` has no updatable field or a malformed date.
+    """
+    try:
+        values = coerce_values(Vehicle, changes, VEHICLE_UPDATABLE_FIELDS)
+        vehicle = update_returning(Vehicle, vehicle_id, values)
+        response_cache.bump("vehicle")
+        return vehicle
+    except SQLAlchemyError as e:
+        logger.error("Error patching vehicle %s: %s", vehicle_id, e)
+        db.session.rollback()
+        raise
+
 def delete_vehicle(vehicle_id):
     """
-    Delete a vehicle.
+    Delete a vehicle with a single DELETE statement.
     :param vehicle_id: The ID of the vehicle to delete.
     :return: tuple: A message confirming deletion or an error message and the HTTP status code.
     """
     try:
-        vehicle = Vehicle.query.get(vehicle_id)
-        if not vehicle:
+        if not delete_by_pk(Vehicle, vehicle_id):
             return None
-        # Delete the vehicle
-        db.session.delete(vehicle)
-        # Commit the transaction
-        db.session.commit()
+        response_cache.bump("vehicle")
         return {"message": "Vehicle deleted successfully"}, 204
     except Exception as e:
         # If an error occurs, rollback the transaction
         db.session.rollback()
-        logger.error(f"Error deleting vehicle {vehicle_id}: {e}")
-        return {"error": "Internal Server Error"}
\ No newline at end of file
+        logger.error("Error deleting vehicle %s: %s", vehicle_id, e)
+        return {"error": "Internal Server Error"}
+
+def delete_vehicles(vehicle_ids):
+    """
+    Delete several vehicles with a single DELETE statement in one transaction.
+    :param vehicle_ids: The IDs of the vehicles to delete.
+    :return: int: The number of deleted vehicles.
+    """
+    try:
+        deleted = delete_by_ids(Vehicle, vehicle_ids)
+        response_cache.bump("vehicle")
+        return deleted
+    except Exception as e:
+        logger.error("Error deleting vehicles %s: %s", vehicle_ids, e)
+        db.session.rollback()
+        raise
\ No newline at end of file
@@ -1,17 +1,31 @@
 import logging
+from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 from models.work import Work
-from utils.database import db
+from models.status import validate_status
+from utils.database import db, use_replica
+from utils.queries import coerce_values, count_rows, delete_by_ids, delete_by_pk, select_columns, select_columns_by_pk, update_returning
+from errors.errors import VersionConflictError
+from utils.events import publish_status
 
 logger = logging.getLogger(__name__)
 
-def get_all_works():
+# Fields a client may change through PATCH
+WORK_UPDATABLE_FIELDS = ("cost", "description", "end_date", "start_date", "status", "vehicle_id")
+
+@use_replica
+def get_all_works(fields=None, statuses=None):
     """
-    Retrieve all works.
+    Retrieve all works, optionally only those in the given statuses.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
+    :param statuses: Optional list of status names to filter on, served by the status indexes.
     :return: dict: A list of dictionaries containing work information.
     """
     try:
-        works = Work.query.all()
+        criteria = [Work.status.in_(statuses)] if statuses else []
+        if fields:
+            return select_columns(Work, fields, *criteria)
+        works = Work.query.filter(*criteria).all()
         return [
             {
                 "work_id": work.work_id,
@@ -21,21 +35,27 @@ def get_all_works():
                 "end_date": work.end_date,
                 "start_date": work.start_date,
                 "status": work.status,
-                "vehicle_id": work.vehicle_id
+                "vehicle_id": work.vehicle_id,
+                "version": work.version,
             }
             for work in works
         ]
     except Exception as e:
-        logger.error(f"Error fetching all works: {e}")
+        logger.error("Error fetching all works: %s", e)
         return {"error": "Internal Server Error"}
 
-def get_work(work_id):
+@use_replica
+def get_work(work_id, fields=None):
     """
     Retrieve an work by ID.
     :param work_id: The ID of the work to retrieve.
+    :param fields: Optional list of column names to select; all columns are returned when omitted.
     :return: dict: A dictionary containing the work's information or None if not found.
     """
     try:
+        if fields:
+            # The version is always selected, as the API derives the ETag from it
+            return select_columns_by_pk(Work, work_id, list(dict.fromkeys([*fields, "version"])))
         work = Work.query.get(work_id)
         if not work:
             return None
@@ -47,17 +67,34 @@ def get_work(work_id):
                 "end_date": work.end_date,
                 "start_date": work.start_date,
                 "status": work.status,
-                "vehicle_id": work.vehicle_id
+                "vehicle_id": work.vehicle_id,
+                "version": work.version,
         }
     except Exception as e:
-        logger.error(f"Error fetching work {work_id}: {e}")
+        logger.error("Error fetching work %s: %s", work_id, e)
+        raise
+
+@use_replica
+def count_works(statuses=None):
+    """
+    Count all works without loading them, optionally only those in the given statuses.
+    :param statuses: Optional list of status names to filter on.
+    :return: int: The number of works.
+    """
+    try:
+        if statuses:
+            return count_rows(Work, Work.status.in_(statuses))
+        return count_rows(Work)
+    except Exception as e:
+        logger.error("Error counting works: %s", e)
         raise
 
 def create_work(cost, description, end_date, start_date, status, vehicle_id):
     """
     Create a new work.
-
+    :raises ValueError: If `status` is not one of models.status.STATUSES.
     """
+    validate_status(status)
     try:
         start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
@@ -81,70 +118,95 @@ def create_work(cost, description, end_date, start_date, status, vehicle_id):
                 "end_date": work.end_date,
                 "start_date": work.start_date,
                 "status": work.status,
-                "vehicle_id": work.vehicle_id
+                "vehicle_id": work.vehicle_id,
+                "version": work.version,
         }
     except Exception as e:
-        logger.error(f"Error creating work: {e}")
+        logger.error("Error creating work: %s", e)
         db.session.rollback()
         return {"error": "Internal Server Error"}, 500
 
-def update_work(work_id, cost, description, end_date, start_date, status, vehicle_id):
+def update_work(work_id, cost, description, end_date, start_date, status, vehicle_id, expected_version=None):
     """
-    Update an existing work.
+    Update an existing work with a single UPDATE statement.
+    The committed status is published to the event hub (GET /api/events).
+    :param expected_version: The version the client last read (If-Match), or None to skip the check.
+    :return: dict: A dictionary containing the updated work's information, or None if not found.
+    :raises ValueError: If `status` is not one of models.status.STATUSES or a date is malformed.
+    :raises VersionConflictError: If the work was modified since `expected_version`.
     """
+    validate_status(status)
     try:
-        # Buscar o registro existente
-        work = Work.query.get(work_id)
-        if not work:
-            return {"error": f"Work with ID {work_id} not found."}, 404
-
         if isinstance(start_date, str):
             start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
         if isinstance(end_date, str):
             end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
 
-        work.cost = cost
-        work.description = description
-        work.end_date = end_date
-        work.start_date = start_date
-        work.status = status
-        work.vehicle_id = vehicle_id
+        work = update_returning(Work, work_id, {
+            "cost": cost,
+            "description": description,
+            "end_date": end_date,
+            "start_date": start_date,
+            "status": status,
+            "vehicle_id": vehicle_id,
+        }, expected_version)
+        if work:
+            publish_status("work", work)
+        return work
+    except SQLAlchemyError as e:
+        logger.error("Error updating work %s: %s", work_id, e)
+        db.session.rollback()
+        raise
 
-        db.session.commit()
-        return {
-            "work_id": work.work_id,
-            "cost": work.cost,
-            "created_at": work.created_at,
-            "description": work.description,
-            "end_date": work.end_date,
-            "start_date": work.start_date,
-            "status": work.status,
-            "vehicle_id": work.vehicle_id
-        }
-    except ValueError as ve:
-        logger.error(f"Validation error: {ve}")
-        return {"error": str(ve)}, 400
-    except Exception as e:
-        logger.error(f"Error updating work {work_id}: {e}")
+def patch_work(work_id, changes, expected_version=None):
+    """
+    Partially update a work with a single UPDATE ... RETURNING statement.
+    Only the fields present in `changes` are written and the row is not read first.
+    A changed status is published to the event hub once committed.
+    :param work_id: The ID of the work to update.
+    :param changes: dict: The fields to change, a subset of WORK_UPDATABLE_FIELDS.
+    :param expected_version: The version the client last read (If-Match), or None to skip the check.
+    :return: dict: A dictionary containing the updated work's information, or None if not found.
+    :raises ValueError: If `changes` has no updatable field, a malformed date or an unknown status.
+    :raises VersionConflictError: If the work was modified since `expected_version`.
+    """
+    try:
+        values = coerce_values(Work, changes, WORK_UPDATABLE_FIELDS)
+        validate_status(values.get("status"))
+        work = update_returning(Work, work_id, values, expected_version)
+        if work and "status" in values:
+            publish_status("work", work)
+        return work
+    except SQLAlchemyError as e:
+        logger.error("Error patching work %s: %s", work_id, e)
         db.session.rollback()
-        return {"error": "Internal Server Error"}, 500
+        raise
 
 def delete_work(work_id):
     """
-    Delete an work.
+    Delete a work with a single DELETE statement.
     :param work_id: The ID of the work to delete.
     :return: dict: A dictionary confirming the deletion or an error message.
     """
     try:
-        work = Work.query.get(work_id)
-        if not work:
+        if not delete_by_pk(Work, work_id):
             return {"error": f"Work with ID {work_id} not found."}, 404
 
-        db.session.delete(work)
-        db.session.commit()
-
         return {"message": f"Work {work_id} deleted successfully."}, 200
     except Exception as e:
-        logger.error(f"Error deleting vehicle {work_id}: {e}")
+        logger.error("Error deleting work %s: %s", work_id, e)
+        db.session.rollback()
+        return {"error": "Internal Server Error"}, 500
+
+def delete_works(work_ids):
+    """
+    Delete several works with a single DELETE statement in one transaction.
+    :param work_ids: The IDs of the works to delete.
+    :return: int: The number of deleted works.
+    """
+    try:
+        return delete_by_ids(Work, work_ids)
+    except Exception as e:
+        logger.error("Error deleting works %s: %s", work_ids, e)
         db.session.rollback()
-        return {"error": "Internal Server Error"}, 500
\ No newline at end of file
+        raise
\ No newline at end of file
@@ -0,0 +1,183 @@
+import math
+import threading
+from flask import g, jsonify, request
+
+# Methods admitted under the read budget; every other method uses the write budget
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Namespaces left out of admission control: event streams hold their request open for as long
+# as the client listens, and the metrics must stay readable while the API sheds load
+EXEMPT_NAMESPACES = ("events", "metrics")
+
+# Body of the 503 response, in the format of the other error responses
+OVERLOADED = {"status": "error", "message": "The service is overloaded, retry later."}
+
+
+class Budget:
+    """
+    Bounded number of concurrent requests, with a bounded queue of requests waiting for a slot.
+    Waiting requests are admitted in arrival order.
+    """
+
+    def __init__(self, limit, queue_size):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self._waiting = []  # Events of the queued requests, oldest first
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    def try_acquire(self):
+        """
+        Take a slot if one is free and no request is queued, without waiting.
+
+        :return: True if a slot was taken
+        """
+        with self._lock:
+            if self.in_flight < self.limit and not self._waiting:
+                self.in_flight += 1
+                self.admitted += 1
+                return True
+            return False
+
+    def acquire(self, timeout):
+        """
+        Take a slot, waiting up to `timeout` seconds in the queue for one to be released.
+
+        :return: True if a slot was taken, False if the request is shed
+        """
+        with self._lock:
+            if self.in_flight < self.limit and not self._waiting:
+                self.in_flight += 1
+                self.admitted += 1
+                return True
+            if len(self._waiting) >= self.queue_size:
+                self.shed_queue_full += 1
+                return False
+            turn = threading.Event()
+            self._waiting.append(turn)
+        if turn.wait(timeout):
+            return True
+        with self._lock:
+            if turn.is_set():
+                # The slot was handed over just as the wait timed out
+                return True
+            self._waiting.remove(turn)
+            self.shed_timeout += 1
+            return False
+
+    def release(self):
+        """
+        Release a slot, handing it over to the oldest queued request if there is one.
+        """
+        with self._lock:
+            if self._waiting:
+                self.admitted += 1
+                self._waiting.pop(0).set()
+            else:
+                self.in_flight -= 1
+
+    def stats(self):
+        """
+        Return the in-flight requests, queue depth and admission counts of the budget.
+        """
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiting),
+                "queue_size": self.queue_size,
+                "admitted": self.admitted,
+                "shed_queue_full": self.shed_queue_full,
+                "shed_timeout": self.shed_timeout,
+            }
+
+
+class AdmissionController:
+    """
+    Concurrency limiter around the API resources, with separate budgets for reads and writes.
+    A request over its budget waits in a bounded queue; it is rejected with 503 and Retry-After
+    when the queue is full or when it has waited longer than the deadline, so that under
+    overload the requests that are admitted keep a bounded latency instead of all slowing down.
+    The budgets are per process, so they bound the concurrency of each gunicorn worker.
+    The ASGI entry point takes the read budget for the reads it answers itself, through budget_for().
+    """
+
+    def __init__(self, read_limit=16, write_limit=4, queue_size=32, queue_timeout=1.0):
+        self.queue_timeout = queue_timeout
+        self.budgets = {
+            "read": Budget(read_limit, queue_size),
+            "write": Budget(write_limit, queue_size),
+        }
+
+    def init_app(self, app):
+        """
+        Read the budgets from the application configuration and apply them to every API request.
+
+        :param app: The Flask application
+        """
+        queue_size = app.config["ADMISSION_QUEUE_SIZE"]
+        self.queue_timeout = app.config["ADMISSION_QUEUE_TIMEOUT_MS"] / 1000
+        self.budgets = {
+            "read": Budget(app.config["ADMISSION_READ_LIMIT"], queue_size),
+            "write": Budget(app.config["ADMISSION_WRITE_LIMIT"], queue_size),
+        }
+        app.before_request(self.admit)
+        app.teardown_request(self.release)
+
+    def admit(self):
+        """
+        before_request hook: take a slot for the request, or shed it.
+
+        :return: None to let the request through, or a 503 response
+        """
+        kind = self.budget_for(request.path, request.method)
+        if kind is None:
+            return None
+        if not self.budgets[kind].acquire(self.queue_timeout):
+            response = jsonify(OVERLOADED)
+            response.status_code = 503
+            response.headers["Retry-After"] = self.retry_after()
+            return response
+        g.admission_budget = kind
+        return None
+
+    def budget_for(self, path, method):
+        """
+        Return the budget a request is admitted under.
+
+        :param path: The request path; the namespace is its first segment after /api/
+        :param method: The HTTP method
+        :return: "read", "write", or None if the request is not subject to admission control
+        """
+        if not path.startswith("/api/"):
+            return None
+        if path[len("/api/"):].split("/", 1)[0] in EXEMPT_NAMESPACES:
+            return None
+        return "read" if method in READ_METHODS else "write"
+
+    def retry_after(self):
+        """
+        Return the Retry-After value of a shed request, in seconds.
+        """
+        return str(max(1, math.ceil(self.queue_timeout)))
+
+    def release(self, exc=None):
+        """
+        teardown_request hook: release the slot taken by the request, if any.
+        """
+        kind = g.pop("admission_budget", None)
+        if kind is not None:
+            self.budgets[kind].release()
+
+    def stats(self):
+        """
+        Return the in-flight requests, queue depth and shed counts of each budget.
+        """
+        return {kind: budget.stats() for kind, budget in self.budgets.items()}
+
+
+# Controller installed by the application factory
+admission_controller = AdmissionController()
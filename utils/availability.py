@@ -0,0 +1,237 @@
+import logging
+import threading
+from datetime import date, timedelta
+from sqlalchemy import func, or_, select
+from utils.database import db
+from models.change_log import ChangeLog
+from models.change_log_horizon import ChangeLogHorizon
+from models.task import Task
+
+logger = logging.getLogger(__name__)
+
+# Statuses of the tasks that occupy their employee; completed and cancelled tasks free their days
+BUSY_STATUSES = ("pending", "in_progress")
+
+# Task IDs reloaded per query when catching up with the change log
+RELOAD_CHUNK_SIZE = 500
+
+
+class AvailabilityCalendar:
+    """
+    Per-employee bitmaps of the days taken by open tasks, over a rolling horizon starting today.
+    Bit i of an employee's bitmap is set when one of their pending or in-progress tasks covers
+    the i-th day of the horizon; a task without an end date covers every day from its start.
+    Whether an employee is free over a range of days is then one AND with the mask of the range.
+    The task services record their writes once committed. Before answering, the calendar also
+    applies the task changes of the change log it has not seen, which covers the writes of other
+    gunicorn workers and of the maintenance commands. It is rebuilt from the task table when the
+    day changes, or when the change log has expired entries it had not applied.
+    """
+
+    def __init__(self, horizon_days=180):
+        self.horizon_days = horizon_days
+        self._origin = None  # First day of the horizon, None until the calendar is built
+        self._cursor = 0  # Last change_id applied
+        self._tasks = {}  # task_id -> (employee_id, bitmap of the days of the task)
+        self._employee_tasks = {}  # employee_id -> IDs of their tasks in _tasks
+        self._busy = {}  # employee_id -> OR of the bitmaps of their tasks
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.applied_changes = 0
+
+    def init_app(self, app):
+        """
+        Read the length of the horizon from the application configuration.
+
+        :param app: The Flask application
+        """
+        self.horizon_days = app.config["AVAILABILITY_HORIZON_DAYS"]
+
+    def record_task(self, task):
+        """
+        Set the days of a created or updated task, replacing the days it covered before.
+        Call it after the write has been committed.
+
+        :param task: dict with the task_id, employee_id, start_date, end_date and status of the task
+        """
+        with self._lock:
+            if self._origin is not None:
+                self._set(task)
+
+    def forget_tasks(self, *task_ids):
+        """
+        Free the days of deleted tasks.
+        Call it after the delete has been committed.
+        """
+        with self._lock:
+            for task_id in task_ids:
+                self._remove(task_id)
+
+    def busy_employees(self, start, end):
+        """
+        Return the IDs of the employees with an open task on any day from `start` to `end`, inclusive.
+
+        :param start: date: The first day of the range
+        :param end: date: The last day of the range
+        :return: set of employee IDs
+        :raises ValueError: If the range is empty or not within the horizon
+        """
+        with self._lock:
+            self._sync()
+            last_day = self._origin + timedelta(days=self.horizon_days - 1)
+            if start > end:
+                raise ValueError("The start of the range must not be after its end.")
+            if start < self._origin or end > last_day:
+                raise ValueError(f"Availability is known from {self._origin} to {last_day}.")
+            mask = self._bits(start, end)
+            return {employee_id for employee_id, busy in self._busy.items() if busy & mask}
+
+    def busy_bitmaps(self):
+        """
+        Return a copy of the bitmap of every busy employee, up to date with the change log.
+        Combine it with days_mask() to test many employees against many ranges without locking each time.
+
+        :return: dict of employee ID to bitmap
+        """
+        with self._lock:
+            self._sync()
+            return dict(self._busy)
+
+    def days_mask(self, start, end):
+        """
+        Return the bitmap of the days from `start` to `end`, clipped to the horizon.
+        Days outside the horizon are not tracked, so a range entirely outside it gives 0.
+
+        :param start: date: The first day of the range
+        :param end: date: The last day of the range, or None for the rest of the horizon
+        :return: int: The bitmap of the range
+        """
+        with self._lock:
+            if self._origin is None:
+                self._sync()
+            return self._bits(start, end)
+
+    def stats(self):
+        """
+        Return the size of the calendar and how it has been kept up to date.
+        """
+        with self._lock:
+            return {
+                "origin": self._origin.isoformat() if self._origin else None,
+                "horizon_days": self.horizon_days,
+                "tasks": len(self._tasks),
+                "busy_employees": len(self._busy),
+                "cursor": self._cursor,
+                "rebuilds": self.rebuilds,
+                "applied_changes": self.applied_changes,
+            }
+
+    def _bits(self, start, end):
+        """
+        Return the bitmap of the days from `start` to `end` (or the end of the horizon if None), clipped to the horizon.
+        """
+        first = max((start - self._origin).days, 0)
+        last = self.horizon_days - 1 if end is None else min((end - self._origin).days, self.horizon_days - 1)
+        if last < first:
+            return 0
+        return ((1 << (last - first + 1)) - 1) << first
+
+    def _set(self, task):
+        self._remove(task["task_id"])
+        if task["status"] not in BUSY_STATUSES or task["start_date"] is None:
+            return
+        bits = self._bits(task["start_date"], task["end_date"])
+        if not bits:
+            return
+        employee_id = task["employee_id"]
+        self._tasks[task["task_id"]] = (employee_id, bits)
+        self._employee_tasks.setdefault(employee_id, set()).add(task["task_id"])
+        self._busy[employee_id] = self._busy.get(employee_id, 0) | bits
+
+    def _remove(self, task_id):
+        entry = self._tasks.pop(task_id, None)
+        if entry is None:
+            return
+        employee_id = entry[0]
+        task_ids = self._employee_tasks[employee_id]
+        task_ids.discard(task_id)
+        if not task_ids:
+            del self._employee_tasks[employee_id]
+            del self._busy[employee_id]
+            return
+        # Other tasks of the employee may cover the same days
+        busy = 0
+        for other_id in task_ids:
+            busy |= self._tasks[other_id][1]
+        self._busy[employee_id] = busy
+
+    def _sync(self):
+        """
+        Apply the task changes committed since the last sync, or rebuild the calendar if it cannot be caught up.
+        """
+        today = date.today()
+        if self._origin != today:
+            self._rebuild(today)
+            return
+        horizon = db.session.execute(select(ChangeLogHorizon.change_id)).scalar() or 0
+        if self._cursor < horizon:
+            self._rebuild(today)
+            return
+        latest = db.session.execute(select(func.max(ChangeLog.change_id))).scalar() or 0
+        if latest <= self._cursor:
+            return
+        task_ids = db.session.execute(
+            select(ChangeLog.row_id).where(
+                ChangeLog.change_id > self._cursor,
+                ChangeLog.change_id <= latest,
+                ChangeLog.table_name == Task.__tablename__,
+            )
+        ).scalars().all()
+        self._reload(set(task_ids))
+        self._cursor = latest
+        self.applied_changes += len(task_ids)
+
+    def _rebuild(self, today):
+        """
+        Load the open tasks of the horizon starting `today`.
+        """
+        # Read the cursor first: changes committed after it are applied again by the next sync
+        latest = db.session.execute(select(func.max(ChangeLog.change_id))).scalar() or 0
+        self._origin = today
+        self._tasks.clear()
+        self._employee_tasks.clear()
+        self._busy.clear()
+        last_day = today + timedelta(days=self.horizon_days - 1)
+        rows = db.session.execute(
+            select(Task.task_id, Task.employee_id, Task.start_date, Task.end_date, Task.status).where(
+                Task.status.in_(BUSY_STATUSES),
+                Task.start_date <= last_day,
+                or_(Task.end_date.is_(None), Task.end_date >= today),
+            )
+        ).mappings()
+        for row in rows:
+            self._set(row)
+        self._cursor = latest
+        self.rebuilds += 1
+        logger.info("Built the availability calendar from %s with %s open tasks", today, len(self._tasks))
+
+    def _reload(self, task_ids):
+        """
+        Replace the days of the given tasks with their current state, freeing those of deleted tasks.
+        """
+        task_ids = list(task_ids)
+        for offset in range(0, len(task_ids), RELOAD_CHUNK_SIZE):
+            chunk = task_ids[offset:offset + RELOAD_CHUNK_SIZE]
+            rows = db.session.execute(
+                select(Task.task_id, Task.employee_id, Task.start_date, Task.end_date, Task.status).where(Task.task_id.in_(chunk))
+            ).mappings().all()
+            for row in rows:
+                self._set(row)
+            found = {row["task_id"] for row in rows}
+            for task_id in chunk:
+                if task_id not in found:
+                    self._remove(task_id)
+
+
+# Shared calendar instance, configured in create_app()
+availability_calendar = AvailabilityCalendar()
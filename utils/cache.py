@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from flask import current_app, request
+from flask_restx.representations import output_json
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache of serialized list responses, invalidated by per-table generations.
+    Every create, update and delete service bumps the generation of the tables it writes;
+    an entry stored under an older generation is treated as a miss.
+    The cache and its generations are per process, so each gunicorn worker has its own; entries
+    also expire after `ttl` seconds, which bounds how stale a list can be after another worker's write.
+    """
+
+    def __init__(self, max_entries=256, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (table, generation, expires_at, body, status, headers)
+        self._generations = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        """
+        Read the cache size and entry lifetime from the application configuration.
+
+        :param app: The Flask application
+        """
+        self.max_entries = app.config["RESPONSE_CACHE_MAX_ENTRIES"]
+        self.ttl = app.config["RESPONSE_CACHE_TTL"]
+
+    def generation(self, table):
+        """
+        Return the current generation of a table.
+        """
+        return self._generations[table]
+
+    def bump(self, *tables):
+        """
+        Invalidate every cached response built from the given tables.
+        Call it after the write has been committed.
+        """
+        with self._lock:
+            for table in tables:
+                self._generations[table] += 1
+
+    def get(self, key):
+        """
+        Return the cached (body, status, headers) for `key`, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != self._generations[entry[0]] or entry[2] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3:]
+
+    def set(self, key, table, generation, body, status, headers):
+        """
+        Store a response built while `table` was at `generation`, evicting the least recently used entry if full.
+        """
+        with self._lock:
+            self._entries[key] = (table, generation, time.monotonic() + self.ttl, body, status, headers)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Return the hit/miss statistics of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "generations": dict(self._generations),
+            }
+
+
+# Shared cache instance, configured in create_app()
+response_cache = ResponseCache()
+
+
+def cached_response(table):
+    """
+    Decorator that caches the serialized response of a list endpoint per path, query string and
+    field mask header (X-Fields), since the mask changes the marshalled body.
+    A hit returns the stored JSON body without querying the database or marshalling.
+    Apply it above the marshalling decorators.
+
+    :param table: Name of the table the response is built from
+    :return: The decorator
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (request.path, request.query_string, request.headers.get(current_app.config["RESTX_MASK_HEADER"]))
+            cached = response_cache.get(key)
+            if cached is not None:
+                body, status, headers = cached
+                return current_app.response_class(body, status, headers)
+
+            # Read the generation before the query, so a write committed meanwhile invalidates the entry
+            generation = response_cache.generation(table)
+            data, status, headers = _unpack(func(*args, **kwargs))
+            response = output_json(data, status, headers)
+            response.headers["Content-Type"] = "application/json"
+            if status == 200:
+                response_cache.set(key, table, generation, response.get_data(), status, dict(response.headers))
+            return response
+        return wrapper
+    return decorator
+
+
+def _unpack(result):
+    """
+    Split a resource method return value into its body, status code and headers.
+    """
+    if not isinstance(result, tuple):
+        return result, 200, {}
+    data, status, headers = result + (None,) * (3 - len(result))
+    return data, status or 200, headers or {}
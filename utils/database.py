@@ -1,14 +1,81 @@
 # Import the necessary modules from Flask and SQLAlchemy
-from flask import Flask
+import time
+from contextvars import ContextVar
+from functools import wraps
+from flask import Flask, current_app, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.sql.dml import UpdateBase
 
 # Base class for SQLAlchemy models. All model classes will inherit from this class.
 # This allows SQLAlchemy to recognize them as models and interact with the database.
 class Base(DeclarativeBase):
   pass  # Placeholder for model classes, no extra functionality is added here.
 
+# Bind key of the optional read-only replica (see READ_DATABASE_URI in config.py)
+REPLICA_BIND_KEY = "replica"
+
+# True while a function decorated with use_replica is running
+_replica_reads = ContextVar("replica_reads", default=False)
+
+# Monotonic time of the last write to the primary by this process
+_last_write = 0.0
+
+
+class RoutingSession(Session):
+  """
+  Session that sends the reads of use_replica functions to the replica bind, when one is configured.
+  Everything else, and every read made after the current request has written, goes to the primary,
+  so a request always sees its own writes. Reads made within REPLICA_LAG_SECONDS of a write by this
+  process also go to the primary, so a client reading right after its write does not see a stale replica.
+  """
+
+  def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+    if bind is None:
+      if self._flushing or isinstance(clause, UpdateBase):
+        _mark_written()
+      elif (
+        _replica_reads.get() and not _has_written() and REPLICA_BIND_KEY in self._db.engines
+        and not wrote_recently(current_app.config["REPLICA_LAG_SECONDS"])
+      ):
+        return self._db.engines[REPLICA_BIND_KEY]
+    return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _mark_written():
+  """Remember that the current request (or app context), and this process, have written to the primary."""
+  global _last_write
+  _last_write = time.monotonic()
+  if has_app_context():
+    g.db_written = True
+
+
+def wrote_recently(seconds):
+  """Whether this process has written to the primary in the last `seconds` seconds."""
+  return time.monotonic() - _last_write < seconds
+
+
+def _has_written():
+  """Whether the current request (or app context) has written to the primary."""
+  return has_app_context() and g.get("db_written", False)
+
+
+def use_replica(func):
+  """
+  Decorator for read-only service functions whose queries may be served by the replica.
+  Without a replica bind, or after the request has written, the queries go to the primary.
+  """
+  @wraps(func)
+  def wrapper(*args, **kwargs):
+    token = _replica_reads.set(True)
+    try:
+      return func(*args, **kwargs)
+    finally:
+      _replica_reads.reset(token)
+  return wrapper
+
+
 # Create an instance of SQLAlchemy to manage database interactions
 # The 'model_class=Base' argument tells SQLAlchemy that all models will inherit from the Base class
-db = SQLAlchemy(model_class=Base)
-
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
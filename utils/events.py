@@ -0,0 +1,173 @@
+import asyncio
+import itertools
+import json
+import queue
+import threading
+
+# Sent to a subscriber whose queue overflowed, so it refetches the state it may have missed
+RESYNC_MESSAGE = "event: resync\ndata: {}\n\n"
+
+# Sent when no event arrived for a while, so proxies keep the connection and dead clients are detected
+KEEPALIVE_MESSAGE = ": keepalive\n\n"
+
+
+class Subscription:
+    """
+    Bounded queue of server-sent event messages for one connected client.
+    Subscriptions created with an event loop are fed through that loop, so asyncio consumers
+    can await them; the others use a thread-safe queue for WSGI threads.
+    """
+
+    def __init__(self, hub, max_events, loop=None):
+        self.hub = hub
+        self.loop = loop
+        self.queue = asyncio.Queue(max_events) if loop else queue.Queue(max_events)
+        self.overflowed = False
+
+    def offer(self, message):
+        """
+        Hand a message to the subscriber without blocking the publisher.
+        """
+        if self.loop is None:
+            self._put(message)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The event loop is closed, so the client is gone
+            self.hub.unsubscribe(self)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except (queue.Full, asyncio.QueueFull):
+            self.overflowed = True
+            self.hub.count_drop()
+
+    def take_overflow(self):
+        """
+        Report whether messages were dropped since the last call, discarding the queued ones if so.
+        The client is then sent RESYNC_MESSAGE instead of an incomplete sequence of events.
+        """
+        if not self.overflowed:
+            return False
+        self.overflowed = False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        return True
+
+
+class EventHub:
+    """
+    In-process fan-out of server-sent events to every connected subscriber.
+    Each event is serialized once and offered to each subscriber's bounded queue; a subscriber
+    that falls behind loses events and is told to resync rather than slowing the publisher.
+    The hub is per process, so with several gunicorn workers a client only receives the
+    events committed by the worker it is connected to.
+    A subscriber without an event loop holds a WSGI thread for as long as it listens, so at most
+    `max_thread_subscribers` of them are accepted, leaving the other threads to the API.
+    """
+
+    def __init__(self, max_events=100, keepalive=15, max_thread_subscribers=2):
+        self.max_events = max_events
+        self.keepalive = keepalive
+        self.max_thread_subscribers = max_thread_subscribers
+        self._subscribers = set()
+        self._thread_subscribers = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+        self.refused = 0
+
+    def init_app(self, app):
+        """
+        Read the queue size, keepalive interval and thread subscriber limit from the application configuration.
+
+        :param app: The Flask application
+        """
+        self.max_events = app.config["EVENT_QUEUE_SIZE"]
+        self.keepalive = app.config["EVENT_KEEPALIVE"]
+        self.max_thread_subscribers = app.config["EVENT_MAX_THREAD_SUBSCRIBERS"]
+
+    def subscribe(self, loop=None):
+        """
+        Register a new subscriber.
+
+        :param loop: The event loop of an asyncio consumer, or None for a WSGI thread
+        :return: The Subscription to read messages from, or None if the WSGI threads allowed to
+                 subscribe are all taken
+        """
+        subscription = Subscription(self, self.max_events, loop)
+        with self._lock:
+            if loop is None:
+                if self._thread_subscribers >= self.max_thread_subscribers:
+                    self.refused += 1
+                    return None
+                self._thread_subscribers += 1
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Remove a subscriber, e.g. when its client disconnects.
+        """
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+                if subscription.loop is None:
+                    self._thread_subscribers -= 1
+
+    def publish(self, event, data):
+        """
+        Send an event to every subscriber. Call it after the change has been committed.
+
+        :param event: The event name, e.g. "task"
+        :param data: JSON-serializable event payload
+        """
+        with self._lock:
+            message = f"id: {next(self._ids)}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscription in subscribers:
+            subscription.offer(message)
+
+    def count_drop(self):
+        """
+        Record a message dropped because a subscriber's queue was full.
+        """
+        with self._lock:
+            self.dropped += 1
+
+    def stats(self):
+        """
+        Return the number of subscribers, of published and dropped messages and of refused thread subscribers.
+        """
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "thread_subscribers": self._thread_subscribers,
+                "max_thread_subscribers": self.max_thread_subscribers,
+                "max_events": self.max_events,
+                "published": self.published,
+                "dropped": self.dropped,
+                "refused": self.refused,
+            }
+
+
+# Hub shared by the services that publish and the endpoints that stream
+event_hub = EventHub()
+
+
+def publish_status(table, row):
+    """
+    Publish the status of a task or work row that has just been committed.
+
+    :param table: "task" or "work"
+    :param row: The row as returned by the service, with its primary key, status and version
+    """
+    event_hub.publish(table, {
+        "id": row[f"{table}_id"],
+        "status": row["status"],
+        "version": row["version"],
+    })
@@ -0,0 +1,64 @@
+from functools import wraps
+from http import HTTPStatus
+from flask import current_app, request
+from flask_restx import abort, marshal
+from flask_restx.mask import Mask
+from flask_restx.utils import merge, unpack
+
+
+def requested_fields(model):
+    """
+    Read the sparse fieldset from the `fields` query parameter.
+    Each name must be a field of the Swagger model, e.g. ?fields=task_id,status.
+
+    :param model: Flask-RESTx model built by generate_swagger_model
+    :return: List of unique field names, in model order, or None if the parameter is absent
+    """
+    value = request.args.get("fields")
+    if value is None:
+        return None
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    if not names:
+        abort(400, "fields must name at least one field.")
+    unknown = sorted(names - set(model.keys()))
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(unknown)}. Valid fields are: {', '.join(model.keys())}.")
+    return [name for name in model.keys() if name in names]
+
+
+def marshal_with_fields(ns, model, as_list=False, code=HTTPStatus.OK, description=None):
+    """
+    Decorator equivalent to Namespace.marshal_with that only serializes the fields named in
+    the `fields` query parameter. Without the parameter the X-Fields mask header still applies.
+
+    :param ns: The Namespace the resource belongs to
+    :param model: Flask-RESTx model built by generate_swagger_model
+    :param as_list: Whether the response is a list (for the documentation)
+    :param code: The documented HTTP status code
+    :param description: The documented response description
+    :return: The decorator
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # Validate before the handler runs, so an unknown field is a 400 whatever the handler catches
+            fields = requested_fields(model)
+            data, status, headers = unpack(func(*args, **kwargs))
+            if fields:
+                mask = Mask(",".join(fields))
+            else:
+                mask = request.headers.get(current_app.config["RESTX_MASK_HEADER"])
+            return marshal(data, model, mask=mask, ordered=ns.ordered), status, headers
+
+        wrapper.__apidoc__ = merge(getattr(func, "__apidoc__", {}), {
+            "responses": {str(code): (description, [model] if as_list else model, {})},
+            "params": {"fields": {
+                "in": "query",
+                "type": "string",
+                "description": f"Comma-separated subset of fields to return ({', '.join(model.keys())})",
+            }},
+            "__mask__": True,
+        })
+        return wrapper
+
+    return decorator
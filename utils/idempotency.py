@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from functools import wraps
+from flask import current_app, request
+from flask_restx import abort
+from flask_restx.utils import merge
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from utils.database import db
+from models.idempotency_key import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+# Expired keys are purged every this many new keys, so the table stays compact
+PURGE_EVERY = 100
+_new_keys = 0
+_new_keys_lock = threading.Lock()
+
+
+def idempotent(func):
+    """
+    Decorator that makes a POST handler safe to retry with an Idempotency-Key header.
+    The first request with a key runs the handler and stores its response; a repeat with the
+    same key and body within IDEMPOTENCY_KEY_TTL seconds returns the stored response without
+    calling the handler. Only successful responses are stored; after a failure the key is
+    released, so a retry runs the handler again. Requests without the header are passed through unchanged.
+    Apply it above the marshalling decorators so the marshalled response is stored.
+
+    :param func: The resource method to wrap.
+    :return: The wrapped method.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return func(*args, **kwargs)
+        if len(key) > 255:
+            abort(400, f"{IDEMPOTENCY_HEADER} must be at most 255 characters.")
+
+        request_hash = hashlib.sha256(
+            request.method.encode() + b" " + request.path.encode() + b"\n" + request.get_data()
+        ).hexdigest()
+        now = int(time.time())
+
+        record = db.session.get(IdempotencyKey, key)
+        if record and record.expires_at <= now:
+            db.session.delete(record)
+            db.session.commit()
+            record = None
+        if record:
+            if record.request_hash != request_hash:
+                abort(422, f"{IDEMPOTENCY_HEADER} was already used with a different request.")
+            if record.status_code is None:
+                abort(409, f"A request with this {IDEMPOTENCY_HEADER} is still in progress.")
+            return json.loads(record.response_body), record.status_code, {"Idempotent-Replayed": "true"}
+
+        _reserve_key(key, request_hash, now)
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            # Failed requests are not stored, so the client can retry them
+            _release_key(key)
+            raise
+
+        data, status_code = _unpack(result)
+        if not _succeeded(data, status_code):
+            _release_key(key)
+        else:
+            record = db.session.get(IdempotencyKey, key)
+            record.status_code = status_code
+            record.response_body = json.dumps(data)
+            db.session.commit()
+        return result
+
+    wrapper.__apidoc__ = merge(getattr(func, "__apidoc__", {}), {
+        "params": {
+            IDEMPOTENCY_HEADER: {
+                "in": "header",
+                "type": "string",
+                "description": "Optional key that makes retries of this request return the first response",
+            }
+        }
+    })
+    return wrapper
+
+
+def _reserve_key(key, request_hash, now):
+    """
+    Insert a placeholder for a new key, so concurrent retries see it as in progress.
+    Every PURGE_EVERY new keys, expired keys are deleted through the expires_at index.
+    """
+    global _new_keys
+    ttl = current_app.config["IDEMPOTENCY_KEY_TTL"]
+    db.session.add(IdempotencyKey(key=key, request_hash=request_hash, expires_at=now + ttl))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request inserted the same key between our lookup and insert
+        db.session.rollback()
+        abort(409, f"A request with this {IDEMPOTENCY_HEADER} is still in progress.")
+
+    with _new_keys_lock:
+        _new_keys += 1
+        purge = _new_keys % PURGE_EVERY == 0
+    if purge:
+        result = db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now))
+        db.session.commit()
+        logger.info("Purged %s expired idempotency keys", result.rowcount)
+
+
+def _release_key(key):
+    """
+    Remove the placeholder of a request that did not produce a storable response.
+    """
+    db.session.rollback()
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+    db.session.commit()
+
+
+def _succeeded(data, status_code):
+    """
+    Tell whether a response reports success and can be replayed.
+    Services report some failures as an {"error": ...} body with a 2xx status; once marshalled
+    with the resource model, such a body has no value left, whereas a created row always has its ID.
+    """
+    if status_code >= 400:
+        return False
+    if isinstance(data, dict):
+        return "error" not in data and any(value is not None for value in data.values())
+    return True
+
+
+def _unpack(result):
+    """
+    Split a resource method return value into its body and status code.
+    """
+    if isinstance(result, tuple):
+        data = result[0]
+        status_code = result[1] if len(result) > 1 and isinstance(result[1], int) else 200
+        return data, status_code
+    return result, 200
@@ -0,0 +1,158 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request
+
+# Header carrying the request ID, accepted from the client or proxy and echoed in the response
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Attributes of a LogRecord copied to the JSON output when set, e.g. with extra={"status": 200}
+EXTRA_FIELDS = ("request_id", "method", "path", "status", "duration_ms")
+
+logger = logging.getLogger(__name__)
+
+# Handler of the root logger, whose queue is drained by _listener
+_queue_handler = None
+_listener = None
+_listener_running = False  # Whether _listener was started in this process and not stopped since
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format log records as one JSON object per line.
+    """
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in EXTRA_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamp records with the ID of the request being handled by the logging thread.
+    It runs in the thread that logs, before the record is queued.
+    """
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = g.get("request_id") if has_request_context() else None
+        return True
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves the formatting of records to the listener thread.
+    Only the message arguments are merged in the logging thread, since they may change
+    once the call returns; the traceback is kept apart for the JSON "exception" field.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _start_listener(handler):
+    """
+    Start a listener thread writing the queued records to `handler`, on a new queue.
+    A forked worker calls it again: the parent's listener thread does not exist in the child,
+    and the inherited queue may have been locked by it at the time of the fork.
+    """
+    global _listener, _listener_running
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    _listener_running = True
+
+
+def _stop_listener():
+    """
+    Write out the queued records and stop the listener thread, if it is running.
+    """
+    global _listener_running
+    if _listener_running:
+        _listener_running = False
+        _listener.stop()
+
+
+def configure_logging(app):
+    """
+    Configure the logging system for the application.
+    Records are put on a queue by the logging thread and formatted as JSON and written by a
+    background listener thread, so a slow disk does not add to request latency. Each request
+    gets an ID (from the X-Request-ID header, or generated) that is attached to its log records
+    and echoed in the response, and a completion record with its status and duration.
+    Register it before the other before_request hooks, so rejected requests are logged too.
+
+    :param app: The Flask application
+    """
+    global _queue_handler
+    _stop_listener()
+    log_file = app.config["LOG_FILE"]
+    handler = logging.FileHandler(log_file, mode="a") if log_file else logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    _queue_handler = LogQueueHandler(None)
+    _queue_handler.addFilter(RequestContextFilter())
+    _start_listener(handler)
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(_queue_handler)
+    root.setLevel(app.config["LOG_LEVEL"])
+
+    @app.before_request
+    def start_request_log():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def finish_request_log(response):
+        """
+        Log the completion of the request and return its ID.
+        The duration of a streamed response is the time until its body starts being sent.
+        """
+        if "request_start" not in g:
+            return response
+        duration_ms = round((time.perf_counter() - g.request_start) * 1000, 1)
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        logger.info(
+            "%s %s %s %sms", request.method, request.path, response.status_code, duration_ms,
+            extra={"method": request.method, "path": request.path, "status": response.status_code, "duration_ms": duration_ms},
+        )
+        return response
+
+
+def _restart_listener_after_fork():
+    if _listener is not None:
+        _start_listener(_listener.handlers[0])
+
+
+atexit.register(_stop_listener)
+# gunicorn forks its workers from a master that has already created the application
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
@@ -0,0 +1,148 @@
+from datetime import datetime
+from sqlalchemy import Date, delete, exists, func, select, update
+from utils.database import db
+from errors.errors import VersionConflictError
+from models.row_count import RowCount
+
+
+def primary_key_column(model):
+    """
+    Return the primary key column of a single-key SQLAlchemy model.
+
+    :param model: SQLAlchemy model class
+    :return: The primary key column
+    """
+    return model.__table__.primary_key.columns.values()[0]
+
+
+def coerce_values(model, changes, fields):
+    """
+    Pick the updatable fields present in a partial payload and convert dates to column types.
+
+    :param model: SQLAlchemy model class
+    :param changes: dict of field name to new value, as sent by the client
+    :param fields: Names of the fields the client is allowed to change
+    :return: dict of column name to value, ready for update_returning
+    :raises ValueError: If no updatable field is present or a date is malformed
+    """
+    values = {}
+    for field in fields:
+        if field not in changes:
+            continue
+        value = changes[field]
+        if isinstance(value, str) and isinstance(model.__table__.c[field].type, Date):
+            value = datetime.strptime(value, "%Y-%m-%d").date()
+        values[field] = value
+    if not values:
+        raise ValueError(f"The request contains none of the updatable fields: {', '.join(fields)}.")
+    return values
+
+
+def update_returning(model, pk_value, values, expected_version=None):
+    """
+    Update one row with a single UPDATE ... RETURNING statement and commit.
+    Models with a `version` column get it incremented; when `expected_version` is given
+    the row is only updated if its current version matches.
+
+    :param model: SQLAlchemy model class
+    :param pk_value: Primary key of the row to update
+    :param values: dict of column name to new value
+    :param expected_version: Version the client last read, or None to skip the check
+    :return: dict: The updated row, or None if no row has that primary key
+    :raises VersionConflictError: If the row exists but its version differs from `expected_version`
+    """
+    table = model.__table__
+    pk = primary_key_column(model)
+    statement = update(table).where(pk == pk_value)
+    if "version" in table.c:
+        values = {**values, "version": table.c.version + 1}
+        if expected_version is not None:
+            statement = statement.where(table.c.version == expected_version)
+    statement = statement.values(**values).returning(*table.c)
+
+    row = db.session.execute(statement).first()
+    if row is None:
+        db.session.rollback()
+        # Only pay for the existence check on the failure path
+        if expected_version is not None and db.session.execute(select(exists().where(pk == pk_value))).scalar():
+            raise VersionConflictError(f"{model.__name__} {pk_value} was modified by another request.")
+        return None
+    db.session.commit()
+    return dict(row._mapping)
+
+
+
+def delete_by_pk(model, pk_value):
+    """
+    Delete one row with a single DELETE statement and commit.
+
+    :param model: SQLAlchemy model class
+    :param pk_value: Primary key of the row to delete
+    :return: True if a row was deleted, False if no row has that primary key
+    """
+    result = db.session.execute(delete(model.__table__).where(primary_key_column(model) == pk_value))
+    db.session.commit()
+    return result.rowcount > 0
+
+
+def delete_by_ids(model, pk_values):
+    """
+    Delete every row whose primary key is in `pk_values` with one DELETE statement and commit.
+
+    :param model: SQLAlchemy model class
+    :param pk_values: Primary keys of the rows to delete
+    :return: The number of deleted rows
+    """
+    result = db.session.execute(delete(model.__table__).where(primary_key_column(model).in_(pk_values)))
+    db.session.commit()
+    return result.rowcount
+
+
+def select_columns(model, fields, *criteria):
+    """
+    Select only the given columns of every row, without loading ORM instances.
+
+    :param model: SQLAlchemy model class
+    :param fields: Names of the columns to select
+    :param criteria: Optional filter expressions
+    :return: List of dicts of column name to value
+    """
+    table = model.__table__
+    rows = db.session.execute(select(*(table.c[field] for field in fields)).where(*criteria))
+    return [dict(row._mapping) for row in rows]
+
+
+def select_columns_by_pk(model, pk_value, fields):
+    """
+    Select only the given columns of one row, without loading an ORM instance.
+
+    :param model: SQLAlchemy model class
+    :param pk_value: Primary key of the row to select
+    :param fields: Names of the columns to select
+    :return: dict of column name to value, or None if no row has that primary key
+    """
+    table = model.__table__
+    statement = select(*(table.c[field] for field in fields)).where(primary_key_column(model) == pk_value)
+    row = db.session.execute(statement).first()
+    return dict(row._mapping) if row else None
+
+
+def count_rows(model, *criteria):
+    """
+    Count the rows of a model.
+    Without criteria the count is read from the row_count table, which triggers keep current on
+    every insert and delete, so it costs one primary key lookup whatever the table size.
+    With criteria, or if the table has no counter, a COUNT(*) runs instead.
+
+    :param model: SQLAlchemy model class
+    :param criteria: Optional filter expressions
+    :return: The number of matching rows
+    """
+    table = model.__table__
+    if not criteria:
+        count = db.session.execute(
+            select(RowCount.row_count).where(RowCount.table_name == table.name)
+        ).scalar()
+        if count is not None:
+            return count
+    return db.session.execute(select(func.count()).select_from(table).where(*criteria)).scalar()
@@ -0,0 +1,166 @@
+import math
+import threading
+import time
+from flask import jsonify, request
+
+# Body of the 429 response, in the format of the other error responses
+TOO_MANY_REQUESTS = {"status": "error", "message": "Too many requests, retry later."}
+
+
+def parse_rate_limits(value):
+    """
+    Parse rate limit rules of the form "<namespace>[:<METHOD>]=<requests>/<seconds>", comma-separated.
+    The namespace is the first path segment after /api/ ("*" matches any), e.g.
+    "invoice_item:GET=100/60, *=1000/60" allows 100 invoice item reads per minute and
+    1000 requests per minute to everything else, per client.
+
+    :param value: The rules as a string
+    :return: dict of (namespace, method or None) to (requests per second, burst)
+    :raises ValueError: If a rule is malformed
+    """
+    rules = {}
+    for rule in value.split(","):
+        rule = rule.strip()
+        if not rule:
+            continue
+        try:
+            scope, limit = rule.split("=")
+            requests, seconds = limit.split("/")
+            requests, seconds = int(requests), float(seconds)
+        except ValueError:
+            raise ValueError(f"Invalid rate limit '{rule}', expected <namespace>[:<METHOD>]=<requests>/<seconds>.")
+        if requests < 1 or seconds <= 0:
+            raise ValueError(f"Invalid rate limit '{rule}', requests and seconds must be positive.")
+        namespace, _, method = scope.strip().partition(":")
+        rules[(namespace, method.upper() or None)] = (requests / seconds, requests)
+    return rules
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter applied to every request before it reaches a resource.
+    Each client IP address has a bucket per matching rule, refilled
+    continuously at the rule's rate up to its burst size; a request takes one token, and is
+    rejected with 429 and Retry-After when none is left. Checking a request is O(1).
+    Buckets idle long enough to be full again are indistinguishable from new ones, and are
+    dropped by a sweep that runs at most every `compact_interval` seconds.
+    Buckets are per process, so with several gunicorn workers a client gets the limit per worker.
+    Clients are not identified by a header such as X-API-Key: the API does not authenticate them,
+    so a client could send a new key with every request to escape its limit.
+    """
+
+    def __init__(self, rules=None, compact_interval=60):
+        self.rules = rules or {}
+        self.compact_interval = compact_interval
+        self._buckets = {}  # (namespace, method, client) -> [tokens, last refill time]
+        self._lock = threading.Lock()
+        self._next_compaction = time.monotonic() + compact_interval
+        self.limited = 0
+        self.compacted = 0
+
+    def init_app(self, app):
+        """
+        Read the rules from the application configuration and check every request against them.
+
+        :param app: The Flask application
+        """
+        self.rules = parse_rate_limits(app.config["RATE_LIMITS"])
+        self.compact_interval = app.config["RATE_LIMIT_COMPACT_INTERVAL"]
+        app.before_request(self.check)
+
+    def rule_for(self, namespace, method):
+        """
+        Return the most specific rule for a request: namespace and method, namespace, any namespace
+        with that method, then any request.
+
+        :return: The rule key, or None if no rule applies
+        """
+        for key in ((namespace, method), (namespace, None), ("*", method), ("*", None)):
+            if key in self.rules:
+                return key
+        return None
+
+    def check(self):
+        """
+        before_request hook: take a token for the request, or reject it.
+
+        :return: None to let the request through, or a 429 response
+        """
+        retry_after = self.limit(request.path, request.method, request.remote_addr)
+        if retry_after is None:
+            return None
+        response = jsonify(TOO_MANY_REQUESTS)
+        response.status_code = 429
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+
+    def limit(self, path, method, client):
+        """
+        Take a token for a request from the bucket of the rule that applies to it, if any.
+
+        :param path: The request path; the namespace is its first segment after /api/
+        :param method: The HTTP method
+        :param client: The IP address of the client
+        :return: None to let the request through, else the number of seconds to wait
+        """
+        if not self.rules or not path.startswith("/api/"):
+            return None
+        rule = self.rule_for(path[len("/api/"):].split("/", 1)[0], method)
+        if rule is None:
+            return None
+        return self.take(rule, client)
+
+    def take(self, rule, client):
+        """
+        Take a token from the client's bucket for a rule.
+
+        :param rule: The rule key returned by rule_for
+        :param client: The IP address of the client
+        :return: None if a token was taken, else the number of seconds until one is available
+        """
+        rate, burst = self.rules[rule]
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_compaction:
+                self._compact(now)
+            bucket = self._buckets.get((*rule, client))
+            if bucket is None:
+                bucket = self._buckets[(*rule, client)] = [burst, now]
+            else:
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return None
+            self.limited += 1
+            return max(1, math.ceil((1 - bucket[0]) / rate))
+
+    def _compact(self, now):
+        """
+        Drop the buckets that have refilled completely. Called with the lock held.
+        """
+        full = []
+        for key, (tokens, last) in self._buckets.items():
+            rate, burst = self.rules[key[:2]]
+            if tokens + (now - last) * rate >= burst:
+                full.append(key)
+        for key in full:
+            del self._buckets[key]
+        self.compacted += len(full)
+        self._next_compaction = now + self.compact_interval
+
+    def stats(self):
+        """
+        Return the number of live buckets and of rejected requests.
+        """
+        with self._lock:
+            return {
+                "rules": {f"{namespace}:{method or '*'}": f"{burst}/{burst / rate:g}s" for (namespace, method), (rate, burst) in self.rules.items()},
+                "buckets": len(self._buckets),
+                "limited": self.limited,
+                "compacted": self.compacted,
+            }
+
+
+# Limiter installed by the application factory
+rate_limiter = RateLimiter()
@@ -1,7 +1,7 @@
 # utils/swagger.py
-from flask_restx import fields
+from flask import request
+from flask_restx import abort, fields
 from sqlalchemy import Integer, String, Text, Date, DateTime, Boolean, Float, Numeric
-import logging
 
 def generate_swagger_model(api, model, exclude_fields=None, readonly_fields=None):
     """
@@ -39,7 +39,11 @@ def generate_swagger_model(api, model, exclude_fields=None, readonly_fields=None
             # Default to String for unsupported types
             field_type = fields.String
 
-        swagger_field = field_type(description=column.comment or column.name)
+        if getattr(column.type, "enums", None):
+            # Enumerated types (e.g. StatusType) are documented and validated by their allowed values
+            swagger_field = fields.String(description=column.comment or column.name, enum=list(column.type.enums))
+        else:
+            swagger_field = field_type(description=column.comment or column.name)
         if column.name in readonly_fields or column.primary_key:
             swagger_field.readonly = True
 
@@ -47,16 +51,58 @@ def generate_swagger_model(api, model, exclude_fields=None, readonly_fields=None
 
     return api.model(model.__name__, swagger_model)
 
-def configure_logging():
+def parse_if_match():
+    """
+    Read the row version from the If-Match request header.
+    Accepts the ETag format returned by the API ("3"), including weak tags (W/"3").
+
+    :return: The expected version as an int, or None if the header is absent
+    """
+    header = request.headers.get("If-Match")
+    if not header or header.strip() == "*":
+        return None
+    tag = header.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        abort(400, "If-Match must be the ETag of the resource.")
+
+
+# Upper bound on the IDs accepted by bulk operations, to keep statements within SQLite's parameter limit
+MAX_BULK_IDS = 1000
+
+
+def id_list(value):
     """
-    Configure the logging system for the application.
-    Logs messages to both the console and a log file.
+    Parse a comma-separated list of IDs, for use as a request parser type.
+
+    :param value: The raw query string value, e.g. "1,2,3"
+    :return: List of unique IDs, in the order given
+    :raises ValueError: If an ID is not a positive integer or too many IDs are given
+    """
+    ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if not part.isdigit():
+            raise ValueError(f"'{part}' is not a valid ID.")
+        ids.append(int(part))
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ValueError("At least one ID is required.")
+    if len(ids) > MAX_BULK_IDS:
+        raise ValueError(f"At most {MAX_BULK_IDS} IDs can be given at once.")
+    return ids
+
+
+def version_etag(version):
+    """
+    Build the ETag header value for a row version.
+
+    :param version: The row version
+    :return: The quoted ETag value
     """
-    logging.basicConfig(
-        level=logging.DEBUG,  # You can adjust the level (DEBUG, INFO, etc.)
-        format='%(asctime)s - %(levelname)s - %(message)s',  # Log message format
-        handlers=[
-            #logging.StreamHandler(),  # Logs to console
-            logging.FileHandler('app.log', mode='a')  # Logs to file (app.log)
-        ]
-    )
+    return f'"{version}"'
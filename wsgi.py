@@ -0,0 +1,19 @@
+from app import create_app  # Import the Flask application factory
+from api import api  # Import the Flask-RESTx Api instance
+
+
+def preload(app):
+    """
+    Compute the Swagger specification once, in the process that imports this module.
+    With gunicorn's preload_app the imported modules, the Swagger models and this
+    specification are then shared copy-on-write by every forked worker.
+
+    :param app: The Flask application
+    """
+    with app.test_request_context():
+        api.__schema__  # Cached by Flask-RESTx on first access
+
+
+# Create the application instance served by gunicorn (see gunicorn.conf.py)
+app = create_app()
+preload(app)